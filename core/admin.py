@@ -1,3 +1,8 @@
 from django.contrib import admin
+from .models import DashboardCounter
 
-# Register your models here.
+
+@admin.register(DashboardCounter)
+class DashboardCounterAdmin(admin.ModelAdmin):
+    list_display = ("date", "total_customers", "orders_today", "pending_orders", "low_stock_products", "revenue_today")
+    readonly_fields = ("date", "total_customers", "orders_today", "pending_orders", "low_stock_products", "revenue_today")
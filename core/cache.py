@@ -0,0 +1,132 @@
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+
+
+# Version namespaces
+CATALOGUE = "catalogue"
+
+
+def _version_key(name):
+    return f"version:{name}"
+
+
+def get_version(name):
+    """
+    Current version of a cached data set. Cache keys embed it, so bumping
+    the version retires every entry built from older data at once.
+    """
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted counter never restarts at a
+        # value whose entries may still be cached.
+        cache.add(key, time.time_ns() // 1000, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump(name):
+    key = _version_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Missing (never read or evicted): any fresh seed is newer
+        get_version(name)
+
+
+def bump_version(name):
+    """
+    Invalidate a data set once the current transaction commits, so no
+    reader can cache pre-commit rows under the new version.
+    """
+    transaction.on_commit(lambda: _bump(name))
+
+
+def versioned_key(name, prefix, params):
+    """
+    Cache key for `params` (a JSON-serialisable dict) under the current version of `name`.
+    """
+    digest = hashlib.md5(json.dumps(params, sort_keys=True).encode(), usedforsecurity=False).hexdigest()
+    return f"{prefix}:{get_version(name)}:{digest}"
+
+
+# Detail pages cached per object; entries also expire on their own
+OBJECT_CACHE_TIMEOUT = 60 * 60
+
+
+def cache_timeout(timeout):
+    """
+    `timeout` capped by settings.CACHE_MAX_AGE. Set under the per-process
+    locmem backend, where versions bumped by other processes are never seen.
+    """
+    max_age = getattr(settings, "CACHE_MAX_AGE", None)
+    return timeout if max_age is None else min(timeout, max_age)
+
+# Hit/miss counts per namespace since this process started
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def record_access(namespace, hit):
+    with _stats_lock:
+        _stats[(namespace, hit)] += 1
+
+
+def cache_stats():
+    """
+    [(namespace, hits, misses)] for the read-through caches in this process.
+    """
+    with _stats_lock:
+        namespaces = sorted({namespace for namespace, _ in _stats})
+        return [(namespace, _stats[(namespace, True)], _stats[(namespace, False)]) for namespace in namespaces]
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+def object_version_name(model, pk):
+    return f"{model._meta.label_lower}:{pk}"
+
+
+def bump_object_versions(model, pks):
+    """
+    Invalidate cached copies of the given rows after commit.
+    """
+    names = [object_version_name(model, pk) for pk in pks]
+
+    def bump():
+        for name in names:
+            _bump(name)
+    transaction.on_commit(bump)
+
+
+def cached_object(model, pk, queryset=None, timeout=OBJECT_CACHE_TIMEOUT):
+    """
+    Read-through cache for one row: returns (instance, version) or raises
+    Http404. The key combines the row's version (bumped by its post_save /
+    post_delete) with the model's version (bumped by bulk writes that skip
+    signals); `version` changes with either and keys template fragments.
+    """
+    label = model._meta.label_lower
+    names = [label, object_version_name(model, pk)]
+    stored = cache.get_many([_version_key(name) for name in names])
+    versions = [stored.get(_version_key(name)) or get_version(name) for name in names]
+    version = "{}.{}".format(*versions)
+
+    key = f"object:{label}:{pk}:{version}"
+    instance = cache.get(key)
+    record_access(label, instance is not None)
+    if instance is None:
+        instance = get_object_or_404(queryset if queryset is not None else model, pk=pk)
+        cache.set(key, instance, cache_timeout(timeout))
+    return instance, version
@@ -0,0 +1,92 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import DashboardCounter
+
+
+def compute_counters(day):
+    """
+    Count every dashboard figure from the source tables.
+    """
+    from customers.models import Customer
+    from orders.models import SalesOrder
+    from products.models import LOW_STOCK_THRESHOLD, Product
+
+    orders_today = SalesOrder.objects.filter(order_date=day)
+    return {
+        'total_customers': Customer.objects.count(),
+        'low_stock_products': Product.objects.filter(stock_quantity__lt=LOW_STOCK_THRESHOLD).count(),
+        'pending_orders': SalesOrder.objects.filter(status='pending').count(),
+        'orders_today': orders_today.count(),
+        'revenue_today': orders_today.filter(status='confirmed').aggregate(
+            total=Sum('total_amount'))['total'] or 0,
+    }
+
+
+def _create_day(day):
+    """
+    Create the row for a day from freshly computed totals.
+    Returns None if another request created it first.
+    """
+    try:
+        with transaction.atomic():
+            return DashboardCounter.objects.create(date=day, **compute_counters(day))
+    except IntegrityError:
+        return None
+
+
+def get_counters():
+    """
+    Return today's counters, creating the row on the first read of the day.
+    """
+    day = timezone.now().date()
+    counters = DashboardCounter.objects.filter(date=day).first()
+    if counters is None:
+        counters = _create_day(day) or DashboardCounter.objects.get(date=day)
+    return counters
+
+
+def bump(**deltas):
+    """
+    Apply counter deltas to today's row with one UPDATE.
+    Call after the change itself has been written: if today's row does not
+    exist yet it is computed from the tables and already includes it.
+    """
+    updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not updates:
+        return
+    day = timezone.now().date()
+    if not DashboardCounter.objects.filter(date=day).update(**updates):
+        if _create_day(day) is None:
+            DashboardCounter.objects.filter(date=day).update(**updates)
+
+
+def reconcile():
+    """
+    Recompute today's counters from the source tables and store them.
+    Returns (counters, drift) where drift maps field -> (stored, actual).
+    """
+    day = timezone.now().date()
+    actual = compute_counters(day)
+    with transaction.atomic():
+        counters, created = DashboardCounter.objects.select_for_update().get_or_create(
+            date=day, defaults=actual)
+        drift = {}
+        if not created:
+            for field, value in actual.items():
+                if getattr(counters, field) != value:
+                    drift[field] = (getattr(counters, field), value)
+                    setattr(counters, field, value)
+            if drift:
+                counters.save(update_fields=list(drift))
+    return counters, drift
+
+
+def low_stock_delta(before, after):
+    """
+    +1 when a quantity drops below the low-stock threshold, -1 when it recovers.
+    """
+    from products.models import LOW_STOCK_THRESHOLD
+
+    return int(after < LOW_STOCK_THRESHOLD) - int(before < LOW_STOCK_THRESHOLD)
@@ -0,0 +1,10 @@
+import datetime
+
+from django.utils import timezone
+
+
+def end_of_day(date):
+    """
+    First aware moment after `date` in the current time zone.
+    """
+    return timezone.make_aware(datetime.datetime.combine(date + datetime.timedelta(days=1), datetime.time.min))
@@ -0,0 +1,99 @@
+import csv
+import datetime
+import tempfile
+
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.utils import timezone
+
+try:
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+except ImportError:  # XLSX export is optional
+    openpyxl = None
+
+
+# Rows fetched per database round trip while streaming
+EXPORT_CHUNK_SIZE = 2000
+# Text starting with these is run as a formula when the file is opened in a
+# spreadsheet (names and addresses are user input)
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class Echo:
+    """
+    File-like object whose write() returns the value, so csv.writer
+    produces lines that can be yielded straight to the response.
+    """
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    # A leading quote makes spreadsheets read the cell as text
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def stream_csv(filename, header, rows):
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow([_csv_value(value) for value in row])
+
+    response = StreamingHttpResponse(lines(), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def _excel_value(sheet, value):
+    # Excel has no time zones: write local wall-clock time
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None)
+    # openpyxl would store "=..." as a formula; keep it a string cell
+    if isinstance(value, str) and value.startswith("="):
+        cell = WriteOnlyCell(sheet, value)
+        cell.data_type = "s"
+        return cell
+    return value
+
+
+def xlsx_file(filename, header, rows):
+    """
+    Write rows with openpyxl's write-only mode (rows go straight to disk,
+    not into an in-memory workbook) and send the finished file.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=filename[:31])
+    sheet.append(header)
+    for row in rows:
+        sheet.append([_excel_value(sheet, value) for value in row])
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(output, as_attachment=True, filename=f"{filename}.xlsx")
+
+
+def export_response(request, filename, columns, queryset):
+    """
+    Export a queryset as CSV (streamed) or XLSX, chosen by ?format=.
+    `columns` is a list of (header, field lookup) pairs; rows are read with
+    values_list().iterator() so no model instances are built.
+    """
+    header = [title for title, _ in columns]
+    rows = queryset.values_list(*[field for _, field in columns]).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return export_rows(request, filename, header, rows)
+
+
+def export_rows(request, filename, header, rows):
+    """
+    Export already computed rows (an iterable of sequences) as CSV or XLSX, chosen by ?format=.
+    """
+    if request.GET.get("format") == "xlsx":
+        if openpyxl is None:
+            raise Http404("XLSX export requires the openpyxl package")
+        return xlsx_file(filename, header, rows)
+    return stream_csv(filename, header, rows)
@@ -0,0 +1,144 @@
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+
+from core import counters
+from customers.models import Customer
+from inventory.services import apply_stock_deltas
+from inventory.sharding import MAX_SLOTS, merge_stock, split_stock
+from orders.models import SalesOrder
+from orders.services import add_order_items
+from products.models import Product
+from reports.models import DailyCategorySales
+
+
+BENCH_SKU = 'BENCH-CONTENTION'
+BENCH_CUSTOMER = 'BENCH-CONTENTION'
+BENCH_CATEGORY = 'Contention benchmark'
+BENCH_STOCK = 100_000_000
+
+
+def parse_counts(value, minimum):
+    try:
+        counts = [int(part) for part in value.split(',')]
+    except ValueError:
+        raise CommandError(f'Expected comma separated numbers: {value}')
+    if any(count < minimum for count in counts):
+        raise CommandError(f'Expected numbers of at least {minimum}: {value}')
+    return counts
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure stock deductions (or order confirmations) per second on one hot product as worker '
+        'threads are added, with its stock in one row and split across slots. Writes to the database: '
+        'run it against a scratch PostgreSQL database (POSTGRES_DB=...)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', default='1,2,4,8,16', help='Thread counts to try (default 1,2,4,8,16)')
+        parser.add_argument('--slots', default='0,16', help='Slot counts to try, 0 for a single row (default 0,16)')
+        parser.add_argument('--seconds', type=float, default=5, help='Duration of each run')
+        parser.add_argument('--confirm', action='store_true',
+                            help='Confirm single-line pending orders, holding their stock like orders '
+                                 'entered through the UI, instead of bare stock deductions')
+        parser.add_argument('--orders', type=int, default=2000,
+                            help='Pending orders prepared per worker with --confirm')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stderr.write(self.style.WARNING(
+                'SQLite lets one transaction write at a time, so throughput cannot scale; '
+                'use PostgreSQL for meaningful numbers'
+            ))
+        workers, slot_counts = parse_counts(options['workers'], 1), parse_counts(options['slots'], 0)
+        if any(slots == 1 or slots > MAX_SLOTS for slots in slot_counts):
+            raise CommandError(f'Slot counts are 0 (a single row) or 2 to {MAX_SLOTS}')
+        if options['seconds'] <= 0 or options['orders'] < 1:
+            raise CommandError('--seconds and --orders must be positive')
+        if Product.objects.filter(sku=BENCH_SKU).exists():
+            raise CommandError(f'{BENCH_SKU} already exists: remove the leftovers of an interrupted run first')
+
+        product = Product.objects.create(
+            sku=BENCH_SKU, name='Contention benchmark', category=BENCH_CATEGORY,
+            cost_price=1, selling_price=1, stock_quantity=BENCH_STOCK,
+        )
+        customer = Customer.objects.create(
+            customer_id=BENCH_CUSTOMER, name='Contention benchmark', phone='0',
+            address='-', email='bench-contention@example.com',
+        ) if options['confirm'] else None
+        mode = 'confirmations' if options['confirm'] else 'deductions'
+        self.stdout.write(f'{"slots":>5} {"workers":>7} {mode + "/s":>16} {"per worker":>10} {"errors":>6}')
+        try:
+            for slots in slot_counts:
+                if slots:
+                    split_stock(product.pk, slots)
+                else:
+                    merge_stock(product.pk)
+                for count in workers:
+                    done, errors = self.run(product, customer, count, options)
+                    rate = done / options['seconds']
+                    self.stdout.write(f'{slots:>5} {count:>7} {rate:>16.0f} {rate / count:>10.0f} {errors:>6}')
+        finally:
+            # Deleting the customer and product takes their orders and rollup rows with them
+            if customer is not None:
+                customer.delete()
+                DailyCategorySales.objects.filter(category=BENCH_CATEGORY).delete()
+            product.delete()
+            counters.reconcile()
+        self.stdout.write(self.style.SUCCESS('Done'))
+
+    def prepare_orders(self, customer, count):
+        """
+        Pending orders with one line each, added through add_order_items
+        so each holds its unit the way orders entered through the UI do.
+        """
+        orders = SalesOrder.objects.bulk_create([
+            SalesOrder(order_number=f'{BENCH_SKU}-{time.monotonic_ns()}-{n}', customer=customer, total_amount=0)
+            for n in range(count)
+        ])
+        for order in orders:
+            add_order_items(order, [(BENCH_SKU, 1)])
+        return orders
+
+    def run(self, product, customer, count, options):
+        """
+        Let `count` threads hammer the product for the configured time.
+        Returns (operations completed, operations failed).
+        """
+        batches = [
+            self.prepare_orders(customer, options['orders']) if customer else None for _ in range(count)
+        ]
+        results = [[0, 0] for _ in range(count)]
+        start = threading.Barrier(count + 1)
+        deadline = []
+
+        def work(index):
+            orders = batches[index]
+            try:
+                start.wait()
+                while time.monotonic() < deadline[0]:
+                    try:
+                        if orders is None:
+                            apply_stock_deltas({product.pk: -1})
+                        elif orders:
+                            orders.pop().confirm()
+                        else:
+                            break
+                        results[index][0] += 1
+                    except (DatabaseError, ValueError):
+                        results[index][1] += 1
+            finally:
+                # Each thread opened its own connection
+                connection.close()
+
+        threads = [threading.Thread(target=work, args=(index,)) for index in range(count)]
+        for thread in threads:
+            thread.start()
+        deadline.append(time.monotonic() + options['seconds'])
+        start.wait()
+        for thread in threads:
+            thread.join()
+        return sum(done for done, _ in results), sum(errors for _, errors in results)
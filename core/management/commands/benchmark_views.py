@@ -0,0 +1,125 @@
+import math
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+from accounts.models import User
+from customers.models import Customer
+from orders.models import SalesOrderItem
+from products.models import Product
+
+
+# GET on these would change data or end the session
+UNSAFE_WORDS = ('delete', 'remove', 'confirm', 'cancel', 'logout')
+
+
+def iter_named_patterns(patterns):
+    """
+    Yield (name, url kwargs, view module) for every named URL, skipping the admin.
+    """
+    for entry in patterns:
+        if isinstance(entry, URLResolver):
+            if entry.app_name == 'admin':
+                continue
+            yield from iter_named_patterns(entry.url_patterns)
+        elif isinstance(entry, URLPattern) and entry.name:
+            yield entry.name, list(entry.pattern.converters), entry.callback.__module__
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = 'Time every GET view through the test client and report p50/p95 latency and query counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per URL')
+        parser.add_argument('--warmup', type=int, default=2, help='Untimed requests per URL first')
+        parser.add_argument('--path', action='append', default=[],
+                          help='Extra URL to benchmark, e.g. "/orders/?page=500" (repeatable)')
+        parser.add_argument('--filter', help='Only benchmark URL names containing this text')
+        parser.add_argument('--username', help='User to log in as (default: the first active admin)')
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True)
+        if options['username']:
+            user = users.filter(username=options['username']).first()
+        else:
+            user = users.filter(role=User.Roles.ADMIN).order_by('id').first()
+        if user is None:
+            raise CommandError('No user to log in as: create an admin user or pass --username')
+        client = Client()
+        client.force_login(user)
+
+        urls = self.collect_urls(options['filter']) + [(path, path) for path in options['path']]
+        if not urls:
+            raise CommandError('Nothing to benchmark')
+
+        header = f'{"view":<28} {"status":>6} {"p50 ms":>9} {"p95 ms":>9} {"max ms":>9} {"queries":>8}'
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        with override_settings(ALLOWED_HOSTS=['*'], DEBUG=False):
+            for label, url in urls:
+                self.benchmark(client, label, url, options['iterations'], options['warmup'])
+
+    def collect_urls(self, name_filter):
+        # One sample row per model; the newest rows sit where a large dataset is busiest
+        item = SalesOrderItem.objects.order_by('-id').values('id', 'sales_order_id').first()
+        samples = {
+            'products.views': Product.objects.order_by('-id').values_list('id', flat=True).first(),
+            'customers.views': Customer.objects.order_by('-id').values_list('id', flat=True).first(),
+            'orders.views': item and item['sales_order_id'],
+        }
+
+        urls = []
+        for name, params, module in iter_named_patterns(get_resolver().url_patterns):
+            if any(word in name for word in UNSAFE_WORDS):
+                continue
+            if name_filter and name_filter not in name:
+                continue
+            kwargs = {}
+            for param in params:
+                if param == 'item_pk':
+                    kwargs[param] = item and item['id']
+                else:
+                    kwargs[param] = samples.get(module)
+            if None in kwargs.values():
+                self.stdout.write(self.style.WARNING(f'Skipping {name}: no sample data'))
+                continue
+            urls.append((name, reverse(name, kwargs=kwargs)))
+        return urls
+
+    def benchmark(self, client, label, url, iterations, warmup):
+        for _ in range(warmup):
+            self.consume(client.get(url))
+
+        timings, queries = [], []
+        status = None
+        for _ in range(max(1, iterations)):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = client.get(url)
+                # Streaming exports only do their work while being read
+                self.consume(response)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(context.captured_queries))
+            status = response.status_code
+
+        self.stdout.write(
+            f'{label:<28} {status:>6} {percentile(timings, 0.5):>9.1f} '
+            f'{percentile(timings, 0.95):>9.1f} {max(timings):>9.1f} {max(queries):>8}'
+        )
+
+    @staticmethod
+    def consume(response):
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        response.close()
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from customers.models import Customer
+from inventory.models import StockMovement
+from orders.models import SalesOrder
+from products.models import LOW_STOCK_THRESHOLD, Product
+
+
+class Command(BaseCommand):
+    help = 'Print the database query plan for each list/dashboard hot path'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true',
+                          help='Execute the queries and include actual timings (PostgreSQL only)')
+
+    def hot_paths(self):
+        today = timezone.now().date()
+        return [
+            ('Order list (first page)', SalesOrder.objects.order_by('-order_date', '-id')[:10]),
+            ('Dashboard: orders today', SalesOrder.objects.filter(order_date=today).order_by().values('pk')),
+            ('Dashboard: low stock products',
+             Product.objects.filter(stock_quantity__lt=LOW_STOCK_THRESHOLD).order_by().values('pk')),
+            ('Stock movement log (first page)', StockMovement.objects.order_by('-timestamp', '-id')[:10]),
+            ('Product list (first page)', Product.objects.order_by('name', 'id')[:10]),
+            ('Customer list (first page)', Customer.objects.order_by('name', 'id')[:10]),
+        ]
+
+    def handle(self, *args, **options):
+        explain_options = {}
+        if options['analyze']:
+            if connection.vendor != 'postgresql':
+                self.stdout.write(self.style.WARNING('--analyze is only supported on PostgreSQL; ignoring'))
+            else:
+                explain_options = {'analyze': True, 'buffers': True}
+
+        self.stdout.write(f'Database backend: {connection.vendor}\n')
+        for title, queryset in self.hot_paths():
+            self.stdout.write(self.style.SUCCESS(title))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
@@ -0,0 +1,253 @@
+import itertools
+import random
+import uuid
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, IntegerField, When
+from django.utils import timezone
+
+from accounts.models import User
+from core import counters
+from core.cache import CATALOGUE, bump_version
+from customers.ledger import rebuild_ledger
+from customers.models import Customer
+from inventory.models import StockMovement
+from orders.models import OrderNumberSequence, SalesOrder, SalesOrderItem
+from products.models import Product
+from reports.rollups import rebuild_rollups
+
+
+CATEGORIES = [
+    'Gold Rings', 'Gold Necklaces', 'Gold Bracelets', 'Gold Earrings', 'Diamond Rings',
+    'Diamond Necklaces', 'Diamond Earrings', 'Diamond Pendants', 'Silver Rings',
+    'Silver Necklaces', 'Silver Bracelets', 'Pearl Jewelry', 'Wedding Sets',
+]
+MATERIALS = ['Gold 18K', 'Gold 21K', 'Gold 22K', 'Silver 925', 'Platinum', 'Rose Gold', 'White Gold']
+STYLES = ['Classic', 'Twisted', 'Solitaire', 'Halo', 'Vintage', 'Minimal', 'Royal', 'Chain', 'Hoop', 'Charm']
+FIRST_NAMES = [
+    'Ahmed', 'Fatima', 'Mohamed', 'Mona', 'Omar', 'Noha', 'Amr', 'Laila', 'Khaled', 'Sara',
+    'Youssef', 'Heba', 'Mostafa', 'Nour', 'Karim', 'Salma', 'Tarek', 'Dina', 'Hany', 'Rana',
+]
+LAST_NAMES = [
+    'Hassan', 'Khalil', 'Ali', 'Ibrahim', 'Mostafa', 'Samir', 'Abdel Rahman', 'Mahmoud',
+    'Youssef', 'Gamal', 'Nabil', 'Fouad', 'Saleh', 'Farouk', 'Adel', 'Zaki',
+]
+CITIES = ['Cairo', 'Giza', 'Alexandria', 'Mansoura', 'Tanta', 'Aswan', 'Luxor', 'Port Said']
+
+# Share of generated orders per final status
+STATUS_WEIGHTS = {'pending': 15, 'confirmed': 75, 'canceled': 10}
+
+
+def zipf_weights(size, exponent=1.1):
+    """
+    Cumulative weights giving rank r a share proportional to 1 / r**exponent:
+    a few best sellers / regulars and a long tail.
+    """
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, size + 1)))
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+class Command(BaseCommand):
+    help = 'Generate a large synthetic dataset (products, customers, orders, items, stock movements)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--customers', type=int, default=10000)
+        parser.add_argument('--orders', type=int, default=100000)
+        parser.add_argument('--max-lines', type=int, default=6, help='Maximum lines per order')
+        parser.add_argument('--users', type=int, default=5, help='Sales users the orders are spread across')
+        parser.add_argument('--days', type=int, default=365, help='Spread orders over this many past days')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, help='Random seed for a reproducible dataset')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        # Keeps unique keys of repeated runs apart
+        self.run = uuid.UUID(int=self.rng.getrandbits(128)).hex[:6].upper()
+
+        users = self.create_users(options['users'])
+        products = self.create_products(options['products'])
+        customers = self.create_customers(options['customers'])
+        # {product_id: units taken by confirmed orders}
+        self.sold = {}
+        if options['orders'] and (not products or not customers):
+            self.stdout.write(self.style.ERROR('Orders need at least one product and one customer'))
+            return
+        if options['orders']:
+            self.create_orders(options['orders'], options['max_lines'], options['days'],
+                               users, products, customers)
+        self.receive_stock(products, options['days'])
+        if options['orders']:
+            # A subquery: a million ids would overflow the query's parameter limit
+            rebuild_ledger(Customer.objects.filter(customer_id__startswith=f'GEN-{self.run}-').values('pk'))
+            today = timezone.now().date()
+            rebuild_rollups(today - timedelta(days=options['days']), today, chunk_days=31)
+
+        # bulk_create skips the signals behind the ledger, counters and cached lookups
+        counters.reconcile()
+        for name in (CATALOGUE, Product._meta.label_lower, Customer._meta.label_lower):
+            bump_version(name)
+        self.stdout.write(self.style.SUCCESS(f'Dataset {self.run} generated'))
+
+    def log(self, message):
+        self.stdout.write(f'[{timezone.now():%H:%M:%S}] {message}')
+
+    def create_users(self, count):
+        users = []
+        for i in range(1, count + 1):
+            user, created = User.objects.get_or_create(
+                username=f'dataset_sales_{i}', defaults={'role': User.Roles.SALES}
+            )
+            if created:
+                user.set_unusable_password()
+                user.save(update_fields=['password'])
+            users.append(user.pk)
+        return users
+
+    def create_products(self, count):
+        rng = self.rng
+        prefix = f'GEN-{self.run}-'
+
+        def rows():
+            for i in range(count):
+                category = rng.choice(CATEGORIES)
+                selling = Decimal(f'{rng.lognormvariate(6.5, 1.0):.2f}') + 1
+                yield Product(
+                    sku=f'{prefix}{i:07d}',
+                    name=f'{rng.choice(STYLES)} {rng.choice(MATERIALS)} {category.split()[-1].rstrip("s")} {i}',
+                    category=category,
+                    cost_price=(selling * Decimal(rng.uniform(0.5, 0.8))).quantize(Decimal('0.01')),
+                    selling_price=selling,
+                    # Set by receive_stock() once the orders are known
+                    stock_quantity=0,
+                )
+
+        for done, batch in enumerate(batched(rows(), self.batch_size), start=1):
+            Product.objects.bulk_create(batch)
+            self.log(f'products: {min(done * self.batch_size, count)}/{count}')
+        products = list(Product.objects.filter(sku__startswith=prefix).values_list('id', 'selling_price'))
+        rng.shuffle(products)
+        return products
+
+    def create_customers(self, count):
+        rng = self.rng
+        prefix = f'GEN-{self.run}-'
+
+        def rows():
+            for i in range(count):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                yield Customer(
+                    customer_id=f'{prefix}{i:08d}',
+                    name=f'{first} {last}',
+                    phone=f'01{rng.randint(0, 2)}-{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}',
+                    address=f'{rng.randint(1, 200)} Street {rng.randint(1, 99)}, {rng.choice(CITIES)}',
+                    email=f'{first}.{last}.{self.run}.{i}@example.com'.lower().replace(' ', ''),
+                    opening_balance=Decimal(rng.choice([0, 0, 0, 500, 1000, 2000])),
+                )
+
+        for done, batch in enumerate(batched(rows(), self.batch_size), start=1):
+            Customer.objects.bulk_create(batch)
+            self.log(f'customers: {min(done * self.batch_size, count)}/{count}')
+        customers = list(Customer.objects.filter(customer_id__startswith=prefix).values_list('id', flat=True))
+        rng.shuffle(customers)
+        return customers
+
+    def create_orders(self, count, max_lines, days, users, products, customers):
+        rng = self.rng
+        product_weights = zipf_weights(len(products))
+        customer_weights = zipf_weights(len(customers), exponent=0.6)
+        statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+        today = timezone.now().date()
+        tz = timezone.get_current_timezone()
+
+        created = 0
+        for batch_count in (min(self.batch_size, count - start) for start in range(0, count, self.batch_size)):
+            # Recent days are busier than old ones
+            dates = sorted(today - timedelta(days=int(days * rng.random() ** 1.5)) for _ in range(batch_count))
+            numbers = []
+            for day, group in itertools.groupby(dates):
+                size = len(list(group))
+                first, _ = OrderNumberSequence.reserve_block(f'SO-{day:%Y%m%d}', size)
+                numbers.extend(f'SO-{day:%Y%m%d}-{n:04d}' for n in range(first, first + size))
+
+            orders, lines = [], []
+            for day, number in zip(dates, numbers):
+                order_lines = []
+                for _ in range(min(max_lines, 1 + int(rng.expovariate(0.7)))):
+                    product_id, price = rng.choices(products, cum_weights=product_weights)[0]
+                    order_lines.append((product_id, rng.choice((1, 1, 1, 2, 3)), price))
+                orders.append(SalesOrder(
+                    order_number=number,
+                    order_date=day,
+                    customer_id=rng.choices(customers, cum_weights=customer_weights)[0],
+                    created_by_id=rng.choice(users),
+                    status=rng.choices(statuses, weights=status_weights)[0],
+                    total_amount=sum(quantity * price for _, quantity, price in order_lines),
+                ))
+                lines.append(order_lines)
+
+            with transaction.atomic():
+                # auto_now_add overrides the dates on insert; put them back afterwards
+                SalesOrder.objects.bulk_create(orders)
+                for day, group in itertools.groupby(zip(dates, orders), key=lambda pair: pair[0]):
+                    SalesOrder.objects.filter(pk__in=[order.pk for _, order in group]).update(order_date=day)
+                items, movements = [], []
+                for day, order, order_lines in zip(dates, orders, lines):
+                    moment = datetime.combine(day, time(9), tzinfo=tz) + timedelta(seconds=rng.randint(0, 10 * 3600))
+                    for product_id, quantity, price in order_lines:
+                        items.append(SalesOrderItem(
+                            sales_order_id=order.pk, product_id=product_id, quantity=quantity,
+                            unit_price=price, total_price=quantity * price,
+                        ))
+                        if order.status == 'confirmed':
+                            movements.append((moment, StockMovement(
+                                product_id=product_id, quantity=-quantity, created_by_id=order.created_by_id,
+                            )))
+                            self.sold[product_id] = self.sold.get(product_id, 0) + quantity
+                SalesOrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+                self.create_movements(movements)
+
+            created += batch_count
+            self.log(f'orders: {created}/{count}')
+
+    def create_movements(self, movements):
+        """
+        Insert (timestamp, StockMovement) pairs with the given timestamps,
+        which auto_now_add replaces on insert.
+        """
+        rows = [movement for _, movement in movements]
+        StockMovement.objects.bulk_create(rows, batch_size=self.batch_size)
+        for moment, movement in movements:
+            movement.timestamp = moment
+        StockMovement.objects.bulk_update(rows, ['timestamp'], batch_size=500)
+
+    def receive_stock(self, products, days):
+        """
+        Give each product an opening receipt the day before the generated
+        period, large enough for what its confirmed orders took plus what is
+        left on hand, so the stock movements add up to stock_quantity.
+        """
+        rng = self.rng
+        tz = timezone.get_current_timezone()
+        moment = datetime.combine(timezone.now().date() - timedelta(days=days + 1), time(8), tzinfo=tz)
+        # Mostly healthy stock with a tail of low/empty shelves
+        stock = {product_id: int(rng.expovariate(1 / 60)) for product_id, _ in products}
+        for done, batch in enumerate(batched(sorted(stock), self.batch_size), start=1):
+            with transaction.atomic():
+                self.create_movements([
+                    (moment, StockMovement(product_id=pk, quantity=stock[pk] + self.sold.get(pk, 0)))
+                    for pk in batch if stock[pk] + self.sold.get(pk, 0)
+                ])
+                Product.objects.filter(pk__in=batch).update(stock_quantity=Case(
+                    *[When(pk=pk, then=stock[pk]) for pk in batch], output_field=IntegerField(),
+                ))
+            self.log(f'stock: {min(done * self.batch_size, len(stock))}/{len(stock)}')
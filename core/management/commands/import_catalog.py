@@ -0,0 +1,280 @@
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DataError, IntegrityError, transaction
+
+from core import counters
+from core.cache import CATALOGUE, bump_version
+from customers.models import Customer
+from inventory.services import record_stock_adjustments
+from inventory.sharding import respread_stock, slot_levels
+from products.models import Product
+
+
+class RowError(ValueError):
+    pass
+
+
+def _raw(row, field):
+    # JSON rows may carry numbers, including 0
+    value = row.get(field)
+    return '' if value is None else str(value).strip()
+
+
+def _text(row, field, model, required=True):
+    value = _raw(row, field)
+    if required and not value:
+        raise RowError(f'{field}: required')
+    max_length = model._meta.get_field(field).max_length
+    if max_length and len(value) > max_length:
+        raise RowError(f'{field}: longer than {max_length} characters')
+    return value
+
+
+def _clean(value, field, model):
+    """
+    Run the model field's own validation (digits, decimal places, the
+    column's integer range), so rows the database would refuse or corrupt
+    are rejected like any other bad row.
+    """
+    try:
+        return model._meta.get_field(field).clean(value, None)
+    except ValidationError as e:
+        raise RowError(f'{field}: {" ".join(e.messages)}')
+
+
+def _decimal(row, field, model, default=None, allow_negative=False):
+    raw = _raw(row, field)
+    if not raw:
+        if default is None:
+            raise RowError(f'{field}: required')
+        return default
+    try:
+        value = Decimal(raw)
+        if not value.is_finite():
+            raise InvalidOperation
+        value = value.quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise RowError(f'{field}: invalid number {raw!r}')
+    if value < 0 and not allow_negative:
+        raise RowError(f'{field}: cannot be negative')
+    return _clean(value, field, model)
+
+
+def _integer(row, field, model, default=0):
+    raw = _raw(row, field)
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise RowError(f'{field}: invalid integer {raw!r}')
+    if value < 0:
+        raise RowError(f'{field}: cannot be negative')
+    return _clean(value, field, model)
+
+
+def build_product(row):
+    return Product(
+        sku=_text(row, 'sku', Product),
+        name=_text(row, 'name', Product),
+        category=_text(row, 'category', Product),
+        cost_price=_decimal(row, 'cost_price', Product),
+        selling_price=_decimal(row, 'selling_price', Product),
+        stock_quantity=_integer(row, 'stock_quantity', Product),
+    )
+
+
+def build_customer(row):
+    email = _text(row, 'email', Customer)
+    if '@' not in email or '.' not in email:
+        raise RowError(f'email: invalid format {email!r}')
+    return Customer(
+        customer_id=_text(row, 'customer_id', Customer),
+        name=_text(row, 'name', Customer),
+        phone=_text(row, 'phone', Customer),
+        address=_text(row, 'address', Customer),
+        email=email.lower(),
+        opening_balance=_decimal(row, 'opening_balance', Customer, default=Decimal('0.00'), allow_negative=True),
+    )
+
+
+# kind -> (model, unique key, builder)
+CATALOGS = {
+    'products': (Product, 'sku', build_product),
+    'customers': (Customer, 'customer_id', build_customer),
+}
+
+# Columns an import never overwrites: maintained by inventory.reservations
+NOT_IMPORTED = {'reserved_quantity'}
+# Optional columns: a missing column or blank cell keeps the current value
+# of an existing record (new records get the default)
+KEPT_IF_BLANK = {'stock_quantity', 'opening_balance'}
+
+
+def read_rows(path, file_format):
+    """
+    Yield (row_number, dict) pairs from a CSV or JSON Lines file without loading it whole.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        if file_format == 'csv':
+            # Row 1 is the header
+            for number, row in enumerate(csv.DictReader(handle), start=2):
+                yield number, row
+        else:
+            for number, line in enumerate(handle, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield number, e
+                    continue
+                yield number, row if isinstance(row, dict) else RowError('expected a JSON object')
+
+
+class Command(BaseCommand):
+    help = 'Bulk import (upsert) products by SKU or customers by customer ID from CSV or JSON Lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(CATALOGS), help='What the file contains')
+        parser.add_argument('path', type=str, help='CSV (with header) or .jsonl file')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                          help='File format (default: guessed from the extension)')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows written per bulk upsert')
+        parser.add_argument('--max-errors', type=int, default=100,
+                          help='Stop printing row errors after this many (they are still counted)')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'File not found: {path}')
+        file_format = options['format'] or ('jsonl' if path.suffix.lower() in ('.jsonl', '.ndjson') else 'csv')
+        self.model, self.key, build = CATALOGS[options['kind']]
+        self.update_fields = [
+            f.name for f in self.model._meta.concrete_fields
+            if not f.primary_key and f.name != self.key and f.name not in NOT_IMPORTED
+        ]
+        self.max_errors = options['max_errors']
+        self.errors = self.created = self.updated = 0
+
+        chunk = {}
+        for number, row in read_rows(path, file_format):
+            if isinstance(row, Exception):
+                self.report_error(number, str(row))
+                continue
+            try:
+                obj = build(row)
+            except RowError as e:
+                self.report_error(number, str(e))
+                continue
+            kept = frozenset(f for f in KEPT_IF_BLANK if f in self.update_fields and not _raw(row, f))
+            # A key repeated within one chunk: the last row wins
+            chunk[getattr(obj, self.key)] = (number, obj, kept)
+            if len(chunk) >= options['chunk_size']:
+                self.write_chunk(chunk)
+                chunk = {}
+        if chunk:
+            self.write_chunk(chunk)
+
+        # bulk_create skips the signals that maintain the dashboard counters
+        # and invalidate cached lookups and detail pages
+        counters.reconcile()
+        bump_version(self.model._meta.label_lower)
+        if self.model is Product:
+            bump_version(CATALOGUE)
+
+        summary = f'{self.created} created, {self.updated} updated, {self.errors} rejected'
+        style = self.style.WARNING if self.errors else self.style.SUCCESS
+        self.stdout.write(style(f'Imported {options["kind"]}: {summary}'))
+
+    def report_error(self, number, message):
+        self.errors += 1
+        if self.errors <= self.max_errors:
+            self.stderr.write(f'Row {number}: {message}')
+        elif self.errors == self.max_errors + 1:
+            self.stderr.write('Too many errors, no longer printing them')
+
+    def upsert(self, objects, kept=frozenset()):
+        self.model.objects.bulk_create(
+            objects,
+            update_conflicts=True,
+            unique_fields=[self.key],
+            update_fields=[f for f in self.update_fields if f not in kept],
+        )
+
+    def lock_stock(self, chunk):
+        """
+        Lock the chunk's existing products in primary-key order and return
+        {sku: (pk, stock on hand)}. Rows that would leave less stock than
+        pending orders hold are rejected and dropped from the chunk; rows
+        without a stock_quantity keep the stock as it is.
+        """
+        rows = list(
+            Product.objects.select_for_update().filter(sku__in=list(chunk)).order_by('pk')
+            .values_list('sku', 'pk', 'stock_quantity', 'reserved_quantity')
+        )
+        # Sharded stock lives in its slots; the stored totals may lag behind
+        levels = slot_levels([pk for _, pk, _, _ in rows])
+        stock = {}
+        for sku, pk, quantity, reserved in rows:
+            quantity, reserved = levels.get(pk, (quantity, reserved))
+            number, obj, kept = chunk[sku]
+            if 'stock_quantity' not in kept and obj.stock_quantity < reserved:
+                del chunk[sku]
+                self.report_error(number, f'stock_quantity: {reserved} unit(s) are held for pending orders')
+            else:
+                stock[sku] = (pk, quantity)
+        return stock
+
+    def log_stock(self, chunk, keys, stock):
+        """
+        Log the change of every imported product's stock as a movement, so
+        the movement history still adds up to the stock on hand.
+        """
+        imported = [sku for sku in keys if 'stock_quantity' not in chunk[sku][2] or sku not in stock]
+        pks = dict(Product.objects.filter(sku__in=imported).values_list('sku', 'pk'))
+        record_stock_adjustments({
+            pks[sku]: chunk[sku][1].stock_quantity - stock.get(sku, (None, 0))[1] for sku in imported
+        })
+        # Imported stock of sharded products replaces what their slots held
+        respread_stock([stock[sku][0] for sku in imported if sku in stock])
+
+    def write_chunk(self, chunk):
+        with transaction.atomic():
+            if self.model is Product:
+                stock = self.lock_stock(chunk)
+                existing = set(stock)
+            else:
+                existing = set(
+                    self.model.objects.filter(**{f'{self.key}__in': list(chunk)}).values_list(self.key, flat=True)
+                )
+            keys = list(chunk)
+            # One upsert per set of kept columns
+            groups = {}
+            for _, obj, kept in chunk.values():
+                groups.setdefault(kept, []).append(obj)
+            try:
+                with transaction.atomic():
+                    for kept, objects in groups.items():
+                        self.upsert(objects, kept)
+            except (IntegrityError, DataError):
+                # Another unique column (e.g. customer email) clashed or a value
+                # did not fit: retry row by row so only the offending rows are rejected.
+                for key, (number, obj, kept) in chunk.items():
+                    try:
+                        with transaction.atomic():
+                            self.upsert([obj], kept)
+                    except (IntegrityError, DataError) as e:
+                        existing.discard(key)
+                        keys.remove(key)
+                        reason = 'conflicts with an existing record' if isinstance(e, IntegrityError) else 'does not fit'
+                        self.report_error(number, f'{reason} ({e})')
+            if self.model is Product:
+                self.log_stock(chunk, keys, stock)
+        self.updated += len(existing)
+        self.created += len(keys) - len(existing)
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from products.models import Product
 from customers.models import Customer
+from inventory.services import record_stock_adjustment
 
 
 class Command(BaseCommand):
@@ -45,8 +46,9 @@ class Command(BaseCommand):
 
         created_products = 0
         for data in products_data:
-            _, created = Product.objects.get_or_create(sku=data['sku'], defaults=data)
+            product, created = Product.objects.get_or_create(sku=data['sku'], defaults=data)
             if created:
+                record_stock_adjustment(product.pk, product.stock_quantity)
                 created_products += 1
         
         self.stdout.write(self.style.SUCCESS(f'Created {created_products} new products ({len(products_data)} total)'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from customers.ledger import ledger_drift, rebuild_ledger
+
+
+class Command(BaseCommand):
+    help = 'Check customer ledger balances against confirmed orders and rebuild the ledger of drifted customers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report drift')
+        parser.add_argument('--all', action='store_true', help='Rebuild every customer, not only drifted ones')
+
+    def handle(self, *args, **options):
+        if options['all'] and not options['dry_run']:
+            written = rebuild_ledger()
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt the ledger with {written} entries'))
+            return
+
+        drift = ledger_drift()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Customer ledgers match confirmed orders'))
+            return
+        for customer_id, (balance, expected) in drift.items():
+            self.stdout.write(self.style.WARNING(f'Customer {customer_id}: ledger {balance}, orders {expected}'))
+        if options['dry_run']:
+            return
+        written = rebuild_ledger(list(drift))
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {len(drift)} ledger(s) with {written} entries'))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils.dateparse import parse_date
+
+from orders.models import SalesOrder
+from reports.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily sales rollups from confirmed order lines, in parallel date chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First order date (YYYY-MM-DD), default the oldest order')
+        parser.add_argument('--end', help='Last order date (YYYY-MM-DD), default the newest order')
+        parser.add_argument('--chunk-days', type=int, default=7, help='Days aggregated per chunk')
+        parser.add_argument('--workers', type=int, default=4, help='Threads aggregating chunks in parallel')
+
+    def parse(self, value):
+        date = parse_date(value)
+        if date is None:
+            raise CommandError(f'Invalid date: {value}')
+        return date
+
+    def handle(self, *args, **options):
+        if options['chunk_days'] < 1 or options['workers'] < 1:
+            raise CommandError('--chunk-days and --workers must be at least 1')
+        bounds = SalesOrder.objects.aggregate(first=Min('order_date'), last=Max('order_date'))
+        start = self.parse(options['start']) if options['start'] else bounds['first']
+        end = self.parse(options['end']) if options['end'] else bounds['last']
+        if start is None or end is None:
+            self.stdout.write(self.style.SUCCESS('No orders to roll up'))
+            return
+
+        written = rebuild_rollups(
+            start, end, chunk_days=options['chunk_days'], workers=options['workers'],
+            progress=lambda first, last: self.stdout.write(f'{first} .. {last}'),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt sales rollups for {start} .. {end}: {written} rows'))
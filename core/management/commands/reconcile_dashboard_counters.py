@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard counters from the source tables and fix any drift'
+
+    def handle(self, *args, **options):
+        counters, drift = reconcile()
+        if not drift:
+            self.stdout.write(self.style.SUCCESS(f'Dashboard counters for {counters.date} are up to date'))
+            return
+        for field, (stored, actual) in drift.items():
+            self.stdout.write(self.style.WARNING(f'{field}: {stored} -> {actual}'))
+        self.stdout.write(self.style.SUCCESS(f'Repaired {len(drift)} counter(s) for {counters.date}'))
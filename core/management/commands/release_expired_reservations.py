@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory.reservations import SWEEP_BATCH_SIZE, release_expired
+
+
+class Command(BaseCommand):
+    help = 'Release stock reservations of pending orders that have expired; schedule it every few minutes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE, help='Reservations released per transaction')
+
+    def handle(self, *args, **options):
+        count, units = release_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Released {count} expired reservation(s), {units} unit(s)'))
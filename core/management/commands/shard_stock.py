@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum
+
+from inventory.sharding import merge_stock, split_stock, sync_stock_totals
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Split hot products\' stock across counter slots, merge it back, or sync the cached totals'
+
+    def add_arguments(self, parser):
+        parser.add_argument('skus', nargs='*', help='Products to split or merge')
+        parser.add_argument('--slots', type=int, help='Split the products\' stock across this many slots')
+        parser.add_argument('--merge', action='store_true', help='Fold the products\' slots back into one row')
+        parser.add_argument('--sync', action='store_true', help='Refresh the cached stock totals of sharded products; schedule it every minute')
+
+    def handle(self, *args, **options):
+        if options['sync']:
+            changed = sync_stock_totals()
+            self.stdout.write(self.style.SUCCESS(f'Synced stock totals, {changed} changed'))
+            return
+        if not options['skus']:
+            self.list_sharded()
+            return
+        if bool(options['slots']) == options['merge']:
+            raise CommandError('Give either --slots or --merge')
+
+        products = dict(Product.objects.filter(sku__in=options['skus']).values_list('sku', 'pk'))
+        for sku in options['skus']:
+            if sku not in products:
+                raise CommandError(f'Unknown SKU: {sku}')
+        for sku in options['skus']:
+            if options['merge']:
+                total = merge_stock(products[sku])
+                self.stdout.write(f'{sku}: merged, {total} in stock')
+            else:
+                try:
+                    total = split_stock(products[sku], options['slots'])
+                except ValueError as e:
+                    raise CommandError(str(e))
+                self.stdout.write(f'{sku}: {total} in stock over {options["slots"]} slots')
+        self.stdout.write(self.style.SUCCESS(f'Updated {len(options["skus"])} product(s)'))
+
+    def list_sharded(self):
+        rows = (
+            Product.objects.filter(stock_slots__isnull=False)
+            .order_by('sku')
+            .values('sku', 'stock_quantity')
+            .annotate(slots=Count('stock_slots'), total=Sum('stock_slots__quantity'), held=Sum('stock_slots__reserved'))
+        )
+        for row in rows:
+            self.stdout.write(
+                f"{row['sku']}: {row['slots']} slots, {row['total']} in stock, {row['held']} reserved "
+                f"(cached {row['stock_quantity']})"
+            )
+        if not rows:
+            self.stdout.write('No sharded products')
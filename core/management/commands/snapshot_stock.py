@@ -0,0 +1,35 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from inventory.snapshots import snapshot_dates, take_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Store stock on hand per product for each day since the last snapshot (through yesterday by default)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Snapshot only this date (YYYY-MM-DD), replacing an existing snapshot')
+        parser.add_argument('--through', help='Last date to snapshot (YYYY-MM-DD), default yesterday')
+
+    def parse(self, value):
+        date = parse_date(value)
+        if date is None:
+            raise CommandError(f'Invalid date: {value}')
+        return date
+
+    def handle(self, *args, **options):
+        if options['date']:
+            dates = [self.parse(options['date'])]
+        else:
+            through = self.parse(options['through']) if options['through'] else timezone.localdate() - datetime.timedelta(days=1)
+            dates = snapshot_dates(through)
+        if not dates:
+            self.stdout.write(self.style.SUCCESS('Stock snapshots are up to date'))
+            return
+        for date in dates:
+            written = take_snapshot(date)
+            self.stdout.write(f'{date}: {written} product(s)')
+        self.stdout.write(self.style.SUCCESS(f'Stored {len(dates)} stock snapshot(s)'))
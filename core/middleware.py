@@ -0,0 +1,184 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger("erp.profiling")
+
+# Wall times kept per view for the p50/p95 figures on the stats page
+RECENT_SAMPLES = 200
+
+# The profile of the request being handled, if it was sampled
+_current = ContextVar("erp_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.signatures = Counter()
+        self.template_seconds = 0.0
+        self.template_depth = 0
+
+    def duplicates(self):
+        """
+        Statements run more than once in the request, most repeated first.
+        The SQL is parameterised, so a loop issuing the same query per row
+        (N+1) shows up as one signature with a high count.
+        """
+        return [(sql, count) for sql, count in self.signatures.most_common() if count > 1]
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed with connection.execute_wrapper()
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_seconds += time.perf_counter() - start
+            self.queries += 1
+            self.signatures[sql] += 1
+
+
+_original_render = Template.render
+
+
+def _profiled_render(self, context):
+    profile = _current.get()
+    # Only the outermost template is timed; includes and parents are part of it
+    if profile is None or profile.template_depth:
+        return _original_render(self, context)
+    profile.template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        profile.template_seconds += time.perf_counter() - start
+        profile.template_depth -= 1
+
+
+class ViewStats:
+    def __init__(self):
+        self.requests = 0
+        self.wall = 0.0
+        self.sql = 0.0
+        self.template = 0.0
+        self.queries = 0
+        self.max_queries = 0
+        self.duplicate_requests = 0
+        self.worst_duplicate = ("", 0)
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def add(self, record):
+        self.requests += 1
+        self.wall += record["wall_ms"]
+        self.sql += record["sql_ms"]
+        self.template += record["template_ms"]
+        self.queries += record["queries"]
+        self.max_queries = max(self.max_queries, record["queries"])
+        self.recent.append(record["wall_ms"])
+        if record["duplicates"]:
+            self.duplicate_requests += 1
+            sql, count = record["duplicates"][0]
+            if count > self.worst_duplicate[1]:
+                self.worst_duplicate = (sql, count)
+
+    def summary(self, view):
+        recent = sorted(self.recent)
+        return {
+            "view": view,
+            "requests": self.requests,
+            "avg_ms": self.wall / self.requests,
+            "p50_ms": recent[len(recent) // 2],
+            "p95_ms": recent[min(len(recent) - 1, int(len(recent) * 0.95))],
+            "avg_sql_ms": self.sql / self.requests,
+            "avg_template_ms": self.template / self.requests,
+            "avg_queries": self.queries / self.requests,
+            "max_queries": self.max_queries,
+            "duplicate_requests": self.duplicate_requests,
+            "worst_duplicate_sql": self.worst_duplicate[0],
+            "worst_duplicate_count": self.worst_duplicate[1],
+        }
+
+
+# Aggregated per process: each worker keeps its own figures
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def get_stats():
+    """
+    Per-view summaries of the sampled requests, slowest in total first.
+    """
+    with _stats_lock:
+        rows = [stats.summary(view) for view, stats in _stats.items()]
+    return sorted(rows, key=lambda row: row["avg_ms"] * row["requests"], reverse=True)
+
+
+def reset_stats():
+    with _stats_lock:
+        _stats.clear()
+
+
+class ProfilingMiddleware:
+    """
+    Record wall time, SQL count/time, repeated queries and template render
+    time for a sample of requests (PROFILING_SAMPLE_RATE, 0 to 1).
+
+    Each sampled request is aggregated for the stats page, logged as one
+    JSON line on the `erp.profiling` logger and reported in a Server-Timing
+    header. Unsampled requests only pay for one random() call.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        Template.render = _profiled_render
+
+    def __call__(self, request):
+        rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0)
+        if rate <= 0 or random.random() >= rate:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        wall = time.perf_counter() - start
+
+        match = getattr(request, "resolver_match", None)
+        record = {
+            "view": match.view_name if match else "<unresolved>",
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "wall_ms": round(wall * 1000, 2),
+            "queries": profile.queries,
+            "sql_ms": round(profile.sql_seconds * 1000, 2),
+            "template_ms": round(profile.template_seconds * 1000, 2),
+            "duplicates": profile.duplicates(),
+        }
+        with _stats_lock:
+            _stats.setdefault(record["view"], ViewStats()).add(record)
+
+        log_record = dict(record, duplicates=[
+            {"sql": sql, "count": count} for sql, count in record["duplicates"][:3]
+        ])
+        logger.info(json.dumps(log_record, separators=(",", ":")))
+        response["Server-Timing"] = (
+            f'total;dur={record["wall_ms"]}, sql;dur={record["sql_ms"]};desc="{profile.queries} queries", '
+            f'templates;dur={record["template_ms"]}'
+        )
+        return response
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="DashboardCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True)),
+                ("total_customers", models.IntegerField(default=0)),
+                ("low_stock_products", models.IntegerField(default=0)),
+                ("pending_orders", models.IntegerField(default=0)),
+                ("orders_today", models.IntegerField(default=0)),
+                (
+                    "revenue_today",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+            ],
+            options={
+                "verbose_name": "Dashboard Counter",
+                "verbose_name_plural": "Dashboard Counters",
+                "ordering": ["-date"],
+            },
+        ),
+    ]
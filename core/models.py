@@ -1,3 +1,25 @@
 from django.db import models
 
-# Create your models here.
+
+class DashboardCounter(models.Model):
+    """
+    Dashboard figures for one day, kept up to date incrementally so the
+    home page is a single row read. Totals are recomputed once when a
+    day's row is first created and by `reconcile_dashboard_counters`.
+    """
+    date = models.DateField(unique=True)
+    total_customers = models.IntegerField(default=0)
+    low_stock_products = models.IntegerField(default=0)
+    pending_orders = models.IntegerField(default=0)
+    orders_today = models.IntegerField(default=0)
+    revenue_today = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+
+    def __str__(self):
+        return f"Dashboard counters for {self.date}"
+
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name = 'Dashboard Counter'
+        verbose_name_plural = 'Dashboard Counters'
@@ -0,0 +1,175 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.functional import cached_property
+
+
+class CursorPage:
+    """
+    One page of a keyset-paginated queryset.
+    Exposes the parts of Django's Page API that the list templates use.
+    """
+    cursor_mode = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next:
+            return self.paginator.encode_cursor(self.object_list[-1], "next")
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous:
+            return self.paginator.encode_cursor(self.object_list[0], "previous")
+        return None
+
+
+class CursorPaginator:
+    """
+    Keyset paginator: each page is a `WHERE (key) > (last key seen) LIMIT n`
+    range read on the ordering index, so deep pages cost the same as page 1.
+
+    `ordering` must be unique (end it with 'id' / '-id') and should match
+    an index, e.g. ('-timestamp', '-id').
+    """
+
+    def __init__(self, queryset, per_page, ordering):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.ordering = tuple(ordering)
+        self.fields = [
+            (name.lstrip("-"), name.startswith("-")) for name in self.ordering
+        ]
+
+    def encode_cursor(self, obj, direction):
+        values = []
+        for name, _ in self.fields:
+            value = getattr(obj, name)
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                value = value.isoformat()
+            values.append(value)
+        payload = json.dumps({"d": direction, "v": values}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, token):
+        """
+        Return (direction, values) for a token, or None if it is invalid.
+        """
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            direction, raw_values = payload["d"], payload["v"]
+            if direction not in ("next", "previous") or len(raw_values) != len(self.fields):
+                return None
+            model = self.queryset.model
+            values = [
+                model._meta.get_field(name).to_python(value)
+                for (name, _), value in zip(self.fields, raw_values)
+            ]
+        except (binascii.Error, ValueError, TypeError, KeyError, ValidationError):
+            return None
+        return direction, values
+
+    def _seek(self, values, forward):
+        """
+        Build `(f1, f2, ...) after/before (v1, v2, ...)` honouring each field's direction.
+        """
+        condition = Q()
+        for i, (name, descending) in enumerate(self.fields):
+            # Moving forward through a descending column means smaller values
+            lookup = "lt" if descending == forward else "gt"
+            term = Q(**{f"{name}__{lookup}": values[i]})
+            for j, (prev_name, _) in enumerate(self.fields[:i]):
+                term &= Q(**{prev_name: values[j]})
+            condition |= term
+        return condition
+
+    def get_page(self, cursor=None):
+        decoded = self.decode_cursor(cursor) if cursor else None
+        if decoded is None:
+            rows = list(self.queryset.order_by(*self.ordering)[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], self, len(rows) > self.per_page, False)
+
+        direction, values = decoded
+        if direction == "next":
+            rows = list(
+                self.queryset.filter(self._seek(values, forward=True))
+                .order_by(*self.ordering)[:self.per_page + 1]
+            )
+            return CursorPage(rows[:self.per_page], self, len(rows) > self.per_page, True)
+
+        reverse_ordering = [
+            name[1:] if name.startswith("-") else f"-{name}" for name in self.ordering
+        ]
+        rows = list(
+            self.queryset.filter(self._seek(values, forward=False))
+            .order_by(*reverse_ordering)[:self.per_page + 1]
+        )
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        rows.reverse()
+        return CursorPage(rows, self, True, has_previous)
+
+    @cached_property
+    def approximate_count(self):
+        """
+        Cheap row estimate for unfiltered querysets, or None.
+        Uses planner statistics on PostgreSQL and the highest id elsewhere.
+        """
+        if self.queryset.query.where:
+            return None
+        model = self.queryset.model
+        connection = connections[self.queryset.db]
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None
+        return model._default_manager.using(self.queryset.db).aggregate(n=Max("pk"))["n"] or 0
+
+
+def paginate(request, queryset, per_page, ordering):
+    """
+    Paginate a list view.
+    Keyset (cursor) mode is used when the request carries a `cursor`
+    parameter or CURSOR_PAGINATION is enabled; otherwise numbered pages.
+    """
+    cursor = request.GET.get("cursor")
+    if cursor is not None or getattr(settings, "CURSOR_PAGINATION", False):
+        return CursorPaginator(queryset, per_page, ordering).get_page(cursor)
+    paginator = Paginator(queryset.order_by(*ordering), per_page)
+    return paginator.get_page(request.GET.get("page"))
@@ -0,0 +1,67 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from customers.models import Customer
+from orders.models import SalesOrder
+from orders.signals import order_status_changed
+from products.models import LOW_STOCK_THRESHOLD, Product
+from . import counters
+
+
+@receiver(post_save, sender=Customer)
+def count_customer_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(total_customers=1)
+
+
+@receiver(post_delete, sender=Customer)
+def count_customer_deleted(sender, instance, **kwargs):
+    counters.bump(total_customers=-1)
+
+
+@receiver(post_save, sender=Product)
+def count_product_stock(sender, instance, created, **kwargs):
+    """
+    Track products crossing the low-stock threshold.
+    """
+    if created:
+        counters.bump(low_stock_products=int(instance.stock_quantity < LOW_STOCK_THRESHOLD))
+    elif getattr(instance, '_loaded_stock_quantity', None) is not None:
+        counters.bump(low_stock_products=counters.low_stock_delta(
+            instance._loaded_stock_quantity, instance.stock_quantity))
+    instance._loaded_stock_quantity = instance.stock_quantity
+
+
+@receiver(post_delete, sender=Product)
+def count_product_deleted(sender, instance, **kwargs):
+    counters.bump(low_stock_products=-int(instance.stock_quantity < LOW_STOCK_THRESHOLD))
+
+
+@receiver(post_save, sender=SalesOrder)
+def count_order_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump(
+            orders_today=int(instance.order_date == timezone.now().date()),
+            pending_orders=int(instance.status == 'pending'),
+        )
+
+
+@receiver(post_delete, sender=SalesOrder)
+def count_order_deleted(sender, instance, **kwargs):
+    today = instance.order_date == timezone.now().date()
+    counters.bump(
+        orders_today=-int(today),
+        pending_orders=-int(instance.status == 'pending'),
+        revenue_today=-instance.total_amount if today and instance.status == 'confirmed' else 0,
+    )
+
+
+@receiver(order_status_changed)
+def count_order_status_change(sender, orders, old_status, new_status, **kwargs):
+    confirmed = int(new_status == 'confirmed') - int(old_status == 'confirmed')
+    today = timezone.now().date()
+    counters.bump(
+        pending_orders=(int(new_status == 'pending') - int(old_status == 'pending')) * len(orders),
+        revenue_today=sum(order.total_amount for order in orders if order.order_date == today) * confirmed,
+    )
@@ -0,0 +1,94 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import User
+from customers.models import Customer
+from orders.models import SalesOrder, SalesOrderItem
+from products.models import Product
+
+
+class QueryCountMixin:
+    """
+    TestCase mixin that locks in a view's query count: the data is grown
+    through several sizes and the count must stay the same (no N+1) and
+    match the documented figure.
+
+        self.assertConstantQueries(
+            lambda: reverse("order_list"), grow=lambda size: make_orders(size), expected=4,
+        )
+    """
+
+    # Rows present when each measurement is taken
+    SIZES = (1, 5, 25)
+
+    def count_queries(self, url, method="get", data=None, status=200):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data or {})
+            # Streamed responses (exports) only query while being read
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertEqual(response.status_code, status, f"{method.upper()} {url}")
+        return len(context.captured_queries), context
+
+    def assertConstantQueries(self, url, grow, expected, method="get", data=None, status=200):
+        """
+        Call `grow(size)` for each of SIZES and then request `url()`
+        (posting `data`, or `data()` if callable); the query count must
+        equal `expected` every time. `grow` only needs to add rows on top
+        of what earlier sizes created.
+        """
+        counts = {}
+        for size in self.SIZES:
+            grow(size)
+            count, context = self.count_queries(url(), method, data() if callable(data) else data, status)
+            counts[size] = count
+            if count != expected:
+                queries = "\n".join(q["sql"] for q in context.captured_queries)
+                self.fail(
+                    f"{method.upper()} {url()} ran {count} queries with {size} rows, expected {expected} "
+                    f"(counts by size so far: {counts})\n{queries}"
+                )
+
+
+def make_user(username="admin", role=User.Roles.ADMIN):
+    return User.objects.create_user(username, password="password", role=role)
+
+
+def make_products(count, stock_quantity=100, **fields):
+    start = Product.objects.count()
+    return [
+        Product.objects.create(
+            sku=f"SKU-{start + i}", name=f"Product {start + i}", category="Rings",
+            cost_price=1, selling_price=2, stock_quantity=stock_quantity, **fields,
+        )
+        for i in range(count)
+    ]
+
+
+def make_customers(count):
+    start = Customer.objects.count()
+    return [
+        Customer.objects.create(
+            customer_id=f"C{start + i:04d}", name=f"Customer {start + i}", phone="0100",
+            address="Cairo", email=f"customer{start + i}@example.com",
+        )
+        for i in range(count)
+    ]
+
+
+def make_order(customer, user, lines=0):
+    order = SalesOrder.objects.create(customer=customer, total_amount=0, created_by=user)
+    for product in make_products(lines):
+        SalesOrderItem.objects.create(sales_order=order, product=product, quantity=1, unit_price=2)
+    return order
+
+
+def grow_to(factory):
+    """
+    `grow` callback that tops rows made by `factory(count)` up to the requested size.
+    """
+    created = []
+
+    def grow(size):
+        created.extend(factory(size - len(created)))
+    return grow
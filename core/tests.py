@@ -1,3 +1,305 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from customers.models import Customer
+from inventory.models import StockMovement
+from orders.models import SalesOrder, SalesOrderItem
+from products.models import Product
+from . import counters
+from .middleware import RequestProfile, get_stats, reset_stats
+from .pagination import CursorPaginator, paginate
+from .testing import QueryCountMixin, make_customers, make_order, make_products, make_user
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("admin", password="password", role=User.Roles.ADMIN)
+        cls.product = Product.objects.create(
+            sku="GR001", name="Gold Ring", category="Rings", cost_price=1, selling_price=2, stock_quantity=5
+        )
+        StockMovement.objects.bulk_create([
+            StockMovement(product=cls.product, quantity=i, created_by=cls.user) for i in range(1, 26)
+        ])
+        # Shared timestamps exercise the id tie-breaker
+        StockMovement.objects.filter(quantity__lte=10).update(timestamp=StockMovement.objects.first().timestamp)
+
+    def expected(self):
+        return list(StockMovement.objects.order_by("-timestamp", "-id").values_list("pk", flat=True))
+
+    def test_walks_forward_and_back(self):
+        paginator = CursorPaginator(StockMovement.objects.all(), 10, ("-timestamp", "-id"))
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        seen = [m.pk for page in pages for m in page]
+        self.assertEqual(seen, self.expected())
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertFalse(pages[0].has_previous())
+
+        back = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual([m.pk for m in back], [m.pk for m in pages[1]])
+        self.assertTrue(back.has_previous())
+        first = paginator.get_page(back.previous_cursor)
+        self.assertEqual([m.pk for m in first], [m.pk for m in pages[0]])
+        self.assertFalse(first.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        paginator = CursorPaginator(StockMovement.objects.all(), 10, ("-timestamp", "-id"))
+        page = paginator.get_page("not-a-cursor")
+        self.assertEqual([m.pk for m in page], self.expected()[:10])
+
+    def test_paginate_opt_in(self):
+        request = RequestFactory().get("/", {"cursor": ""})
+        page = paginate(request, StockMovement.objects.all(), 10, ("-timestamp", "-id"))
+        self.assertTrue(page.cursor_mode)
+        request = RequestFactory().get("/", {"page": "2"})
+        page = paginate(request, StockMovement.objects.all(), 10, ("-timestamp", "-id"))
+        self.assertEqual(page.number, 2)
+
+    def test_list_view_renders_cursor_links(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("stock_movement_list"), {"cursor": ""})
+        self.assertContains(response, "cursor=")
+        self.assertContains(response, "~25 records")
+
+
+class DashboardCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("admin", password="password", role=User.Roles.ADMIN)
+
+    def assertNoDrift(self):
+        _, drift = counters.reconcile()
+        self.assertEqual(drift, {})
+
+    def test_counters_follow_writes(self):
+        counters.get_counters()
+        customer = Customer.objects.create(
+            customer_id="C001", name="Customer", phone="0100", address="Cairo", email="c@example.com"
+        )
+        ring = Product.objects.create(
+            sku="GR001", name="Gold Ring", category="Rings", cost_price=1, selling_price=2, stock_quantity=12
+        )
+        self.assertEqual(counters.get_counters().low_stock_products, 0)
+        order = SalesOrder.objects.create(customer=customer, total_amount=0, created_by=self.user)
+        SalesOrderItem.objects.create(sales_order=order, product=ring, quantity=3, unit_price=2)
+        self.assertNoDrift()
+
+        order.confirm()
+        current = counters.get_counters()
+        self.assertEqual((current.low_stock_products, current.pending_orders, current.revenue_today), (1, 0, 6))
+        self.assertNoDrift()
+
+        ring.refresh_from_db()
+        ring.stock_quantity = 40
+        ring.save()
+        self.assertEqual(counters.get_counters().low_stock_products, 0)
+        customer.delete()
+        self.assertNoDrift()
+
+
+
+class CoreViewQueryCountTests(QueryCountMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_home_reads_a_single_row(self):
+        counters.get_counters()
+        [customer] = make_customers(1)
+
+        def grow(size):
+            make_products(size, stock_quantity=1)
+            for _ in range(size):
+                make_order(customer, self.user, lines=1)
+
+        # session, user, counter row
+        self.assertConstantQueries(lambda: reverse("home"), grow, expected=3)
+
+    def test_profiling_stats(self):
+        # session, user
+        self.assertConstantQueries(lambda: reverse("profiling_stats"), lambda size: None, expected=2)
+
+
+class GenerateDatasetTests(TestCase):
+    def test_generates_consistent_orders(self):
+        call_command(
+            "generate_dataset", products=20, customers=15, orders=40, users=2,
+            batch_size=16, seed=7, stdout=StringIO(),
+        )
+        self.assertEqual(Product.objects.count(), 20)
+        self.assertEqual(Customer.objects.count(), 15)
+        self.assertEqual(SalesOrder.objects.count(), 40)
+        self.assertEqual(SalesOrder.objects.values("order_number").distinct().count(), 40)
+        out = StringIO()
+        call_command("verify_order_totals", dry_run=True, stdout=out)
+        self.assertIn("found 0 with drifted totals", out.getvalue())
+        confirmed_lines = SalesOrderItem.objects.filter(sales_order__status="confirmed")
+        sales = StockMovement.objects.filter(quantity__lt=0)
+        self.assertEqual(sales.count(), confirmed_lines.count())
+        # Opening receipts plus sales add up to the stock on hand
+        logged = dict(StockMovement.objects.values("product").annotate(total=Sum("quantity")).values_list("product", "total"))
+        for pk, stock in Product.objects.values_list("pk", "stock_quantity"):
+            self.assertEqual(logged.get(pk, 0), stock)
+        # Generated dates survive auto_now_add
+        today = timezone.now().date()
+        self.assertTrue(SalesOrder.objects.exclude(order_date=today).exists())
+        self.assertTrue(sales.exclude(timestamp__date=today).exists())
+        self.assertEqual(counters.get_counters().total_customers, 15)
+
+
+class ImportCatalogTests(TestCase):
+    def import_file(self, kind, content, suffix=".csv"):
+        with tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False, encoding="utf-8") as handle:
+            handle.write(content)
+        self.addCleanup(os.unlink, handle.name)
+        out, err = StringIO(), StringIO()
+        call_command("import_catalog", kind, handle.name, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_csv_upsert_logs_stock_changes(self):
+        [ring] = make_products(1, stock_quantity=7)
+        out, err = self.import_file("products", (
+            "sku,name,category,cost_price,selling_price,stock_quantity\n"
+            f"{ring.sku},Gold ring,Rings,10,20,50\n"
+            "NEW-1,Silver chain,Chains,5,9.5,3\n"
+        ))
+        self.assertIn("1 created, 1 updated, 0 rejected", out)
+        ring.refresh_from_db()
+        self.assertEqual((ring.name, ring.stock_quantity), ("Gold ring", 50))
+        movements = dict(StockMovement.objects.values_list("product__sku", "quantity"))
+        self.assertEqual(movements, {ring.sku: 43, "NEW-1": 3})
+
+    def test_invalid_rows_are_reported_not_fatal(self):
+        out, err = self.import_file("products", (
+            "sku,name,category,cost_price,selling_price,stock_quantity\n"
+            "BAD-1,Ring,Rings,NaN,2,1\n"
+            "BAD-2,Ring,Rings,123456789012,2,1\n"
+            "BAD-3,Ring,Rings,1,2,-4\n"
+            "BAD-4,Ring,Rings,1,2,99999999999999999999\n"
+            ",Ring,Rings,1,2,1\n"
+            "OK-1,Ring,Rings,1,2,1\n"
+        ))
+        self.assertIn("1 created, 0 updated, 5 rejected", out)
+        self.assertIn("Row 2: cost_price: invalid number 'NaN'", err)
+        self.assertIn("Row 3: cost_price:", err)
+        self.assertEqual(list(Product.objects.values_list("sku", flat=True)), ["OK-1"])
+
+    def test_jsonl_customers_retry_duplicate_emails(self):
+        [existing] = make_customers(1)
+        rows = [
+            {"customer_id": "C-NEW-1", "name": "Ana", "phone": "1", "address": "x", "email": existing.email},
+            {"customer_id": "C-NEW-2", "name": "Ben", "phone": "2", "address": "y", "email": "ben@example.com"},
+            {"customer_id": existing.customer_id, "name": "Renamed", "phone": "3", "address": "z",
+             "email": existing.email, "opening_balance": "-12.50"},
+        ]
+        out, err = self.import_file("customers", "".join(json.dumps(row) + "\n" for row in rows) + "[1]\n", ".jsonl")
+        self.assertIn("1 created, 1 updated, 2 rejected", out)
+        self.assertIn("Row 1: conflicts with an existing record", err)
+        self.assertIn("Row 4: expected a JSON object", err)
+        existing.refresh_from_db()
+        self.assertEqual(existing.name, "Renamed")
+        self.assertTrue(Customer.objects.filter(customer_id="C-NEW-2").exists())
+
+    def test_missing_or_blank_optional_columns_keep_current_values(self):
+        [ring, chain] = make_products(2, stock_quantity=50)
+        out, err = self.import_file("products", (
+            "sku,name,category,cost_price,selling_price\n"
+            f"{ring.sku},Ring,Rings,1,9.50\n"
+            "NEW-1,Bangle,Bangles,1,2\n"
+        ))
+        self.assertIn("1 created, 1 updated, 0 rejected", out)
+        self.assertEqual(Product.objects.values_list("stock_quantity", "selling_price").get(pk=ring.pk), (50, Decimal("9.50")))
+        self.assertEqual(Product.objects.get(sku="NEW-1").stock_quantity, 0)
+        self.import_file("products", (
+            "sku,name,category,cost_price,selling_price,stock_quantity\n"
+            f"{chain.sku},Chain,Chains,1,2,\n"
+        ))
+        self.assertEqual(Product.objects.get(pk=chain.pk).stock_quantity, 50)
+        self.assertFalse(StockMovement.objects.exists())
+
+        [customer] = make_customers(1)
+        Customer.objects.filter(pk=customer.pk).update(opening_balance=Decimal("250.00"))
+        row = {"customer_id": customer.customer_id, "name": "Renamed", "phone": "1", "address": "x", "email": customer.email}
+        self.import_file("customers", json.dumps(row) + "\n", ".jsonl")
+        customer.refresh_from_db()
+        self.assertEqual((customer.name, customer.opening_balance), ("Renamed", Decimal("250.00")))
+
+    def test_reserved_quantity_is_kept(self):
+        [ring] = make_products(1, stock_quantity=10)
+        Product.objects.filter(pk=ring.pk).update(reserved_quantity=4)
+        out, err = self.import_file("products", (
+            "sku,name,category,cost_price,selling_price,stock_quantity\n"
+            f"{ring.sku},Ring,Rings,1,2,8\n"
+        ))
+        self.assertIn("0 created, 1 updated", out)
+        self.assertEqual(Product.objects.values_list("stock_quantity", "reserved_quantity").get(pk=ring.pk), (8, 4))
+
+        out, err = self.import_file("products", (
+            "sku,name,category,cost_price,selling_price,stock_quantity\n"
+            f"{ring.sku},Ring,Rings,1,2,3\n"
+        ))
+        self.assertIn("Row 2: stock_quantity: 4 unit(s) are held", err)
+        self.assertEqual(Product.objects.values_list("stock_quantity", flat=True).get(pk=ring.pk), 8)
+
+
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="password", role=User.Roles.ADMIN)
+        cls.sales = User.objects.create_user("sales", password="password", role=User.Roles.SALES)
+
+    def setUp(self):
+        reset_stats()
+        self.client.force_login(self.admin)
+
+    def test_sampled_request_is_recorded_and_logged(self):
+        # Creates today's counter row
+        self.client.get(reverse("home"))
+        with override_settings(PROFILING_SAMPLE_RATE=1), self.assertLogs("erp.profiling", "INFO") as logs:
+            response = self.client.get(reverse("home"))
+        self.assertIn("sql;dur=", response["Server-Timing"])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record["view"], "home")
+        self.assertEqual(record["queries"], 3)
+        self.assertGreater(record["template_ms"], 0)
+        [row] = get_stats()
+        self.assertEqual((row["view"], row["requests"], row["max_queries"]), ("home", 1, 3))
+
+    def test_unsampled_request_is_untouched(self):
+        response = self.client.get(reverse("home"))
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(get_stats(), [])
+
+    def test_repeated_queries_are_flagged(self):
+        product = Product.objects.create(
+            sku="GR001", name="Gold Ring", category="Rings", cost_price=1, selling_price=2, stock_quantity=5
+        )
+        profile = RequestProfile()
+        with connection.execute_wrapper(profile):
+            for _ in range(3):
+                Product.objects.get(pk=product.pk)
+            Customer.objects.count()
+        [(sql, count)] = profile.duplicates()
+        self.assertEqual(count, 3)
+        self.assertIn("products_product", sql)
+
+    def test_stats_page_is_admin_only(self):
+        self.assertEqual(self.client.get(reverse("profiling_stats")).status_code, 200)
+        self.client.force_login(self.sales)
+        self.assertEqual(self.client.get(reverse("profiling_stats")).status_code, 403)
@@ -4,4 +4,5 @@ from . import views
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('profiling/', views.profiling_stats, name='profiling_stats'),
 ]
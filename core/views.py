@@ -1,21 +1,41 @@
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render
-from django.utils import timezone
+from django.shortcuts import redirect, render
 
-from customers.models import Customer
-from orders.models import SalesOrder
-from products.models import Product
+from accounts.decorators import admin_required
+from .cache import cache_stats, reset_cache_stats
+from .counters import get_counters
+from .middleware import get_stats, reset_stats
 
 
 @login_required
 def home(request):
+    counters = get_counters()
     context = {
-        'total_customers': Customer.objects.count(),
-        'total_orders_today': SalesOrder.objects.filter(
-            order_date=timezone.now().date()
-        ).count(),
-        'low_stock_products': Product.objects.filter(
-            stock_quantity__lt=10
-        ).count(),
+        'total_customers': counters.total_customers,
+        'total_orders_today': counters.orders_today,
+        'low_stock_products': counters.low_stock_products,
+        'pending_orders': counters.pending_orders,
+        'revenue_today': counters.revenue_today,
     }
     return render(request, 'home.html', context)
+
+
+@admin_required
+def profiling_stats(request):
+    """
+    Per-view timings collected by ProfilingMiddleware and read-through cache
+    hit rates in this process (admin only).
+    """
+    if request.method == 'POST':
+        reset_stats()
+        reset_cache_stats()
+        messages.success(request, 'Profiling statistics reset.')
+        return redirect('profiling_stats')
+    context = {
+        'stats': get_stats(),
+        'cache_stats': cache_stats(),
+        'sample_rate': getattr(settings, 'PROFILING_SAMPLE_RATE', 0),
+    }
+    return render(request, 'profiling_stats.html', context)
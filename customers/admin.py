@@ -1,9 +1,21 @@
 from django.contrib import admin
-from .models import Customer
+from .models import Customer, LedgerEntry
 
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
     list_display = ("customer_id", "name", "phone", "email", "opening_balance")
     search_fields = ("customer_id", "name", "phone", "email")
-    
\ No newline at end of file
+
+
+@admin.register(LedgerEntry)
+class LedgerEntryAdmin(admin.ModelAdmin):
+    list_display = ("customer", "posted_at", "kind", "order", "amount", "balance")
+    list_filter = ("kind",)
+    list_select_related = ("customer", "order")
+    raw_id_fields = ("customer", "order")
+    # Running balances depend on every earlier entry; write through orders only
+    readonly_fields = ("customer", "order", "kind", "amount", "balance", "posted_at")
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,139 @@
+import datetime
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from core.dates import end_of_day
+from orders.models import SalesOrder
+from .models import Customer, LedgerEntry
+
+
+STATEMENT_PAGE_SIZE = 25
+CENT = Decimal('0.01')
+
+
+def _latest_balance(entries):
+    return entries.order_by('-posted_at', '-id').values_list('balance', flat=True).first() or Decimal('0.00')
+
+
+def _latest_balances():
+    return LedgerEntry.objects.filter(customer=OuterRef('pk')).order_by('-posted_at', '-id').values('balance')[:1]
+
+
+def post_entry(customer_id, kind, amount, order=None):
+    """
+    Append an entry to a customer's ledger and return it (None if the
+    customer no longer exists).
+    """
+    entries = post_entries([(customer_id, kind, amount, order)])
+    return entries[0] if entries else None
+
+
+def post_entries(postings):
+    """
+    Append (customer_id, kind, amount, order) postings to the ledgers in
+    one INSERT and return the entries; postings for customers that no
+    longer exist are dropped. The customer rows are locked in primary-key
+    order so concurrent postings read each other's running balance in turn.
+    """
+    with transaction.atomic(savepoint=False):
+        balances = dict(
+            Customer.objects.select_for_update()
+            .filter(pk__in={posting[0] for posting in postings})
+            .order_by('pk')
+            .annotate(ledger_balance=Subquery(_latest_balances()))
+            .values_list('pk', 'ledger_balance')
+        )
+        entries = []
+        for customer_id, kind, amount, order in postings:
+            if customer_id not in balances:
+                continue
+            balances[customer_id] = (balances[customer_id] or Decimal('0.00')) + amount
+            entries.append(LedgerEntry(
+                customer_id=customer_id, order=order, kind=kind, amount=amount, balance=balances[customer_id]
+            ))
+        return LedgerEntry.objects.bulk_create(entries)
+
+
+def balance_as_of(customer, date=None):
+    """
+    What `customer` owes at the end of `date` (default: now): the opening
+    balance plus the running balance of the last entry posted by then.
+    """
+    entries = LedgerEntry.objects.filter(customer=customer)
+    if date is not None:
+        entries = entries.filter(posted_at__lt=end_of_day(date))
+    return customer.opening_balance + _latest_balance(entries)
+
+
+def statement_entries(customer, start, end):
+    """
+    The customer's entries posted from the start of `start` to the end of `end`.
+    """
+    return LedgerEntry.objects.filter(
+        customer=customer,
+        posted_at__gte=end_of_day(start - datetime.timedelta(days=1)),
+        posted_at__lt=end_of_day(end),
+    ).select_related('order')
+
+
+def rebuild_ledger(customer_ids=None):
+    """
+    Replace ledger entries with one charge per confirmed order, dated by
+    the order date. Used to backfill or repair the ledger; reversal
+    history of canceled orders is not reconstructed.
+    Returns the number of entries written.
+    """
+    orders = SalesOrder.objects.filter(status='confirmed')
+    entries = LedgerEntry.objects.all()
+    if customer_ids is not None:
+        orders = orders.filter(customer_id__in=customer_ids)
+        entries = entries.filter(customer_id__in=customer_ids)
+
+    rows = orders.order_by('customer_id', 'order_date', 'id').values_list(
+        'pk', 'customer_id', 'order_date', 'total_amount'
+    )
+    written, batch, customer_id, balance = 0, [], None, Decimal('0.00')
+    with transaction.atomic():
+        entries.delete()
+        for order_id, order_customer_id, order_date, total in rows.iterator(chunk_size=2000):
+            if order_customer_id != customer_id:
+                customer_id, balance = order_customer_id, Decimal('0.00')
+            balance += total
+            batch.append(LedgerEntry(
+                customer_id=customer_id, order_id=order_id, kind=LedgerEntry.Kinds.CHARGE, amount=total,
+                balance=balance, posted_at=timezone.make_aware(datetime.datetime.combine(order_date, datetime.time.min)),
+            ))
+            if len(batch) >= 1000:
+                LedgerEntry.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        LedgerEntry.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def ledger_drift(customer_ids=None):
+    """
+    {customer_id: (ledger balance, confirmed order total)} for customers
+    whose current ledger balance disagrees with their confirmed orders.
+    Full scan; meant for the maintenance command, not for pages.
+    """
+    orders = SalesOrder.objects.filter(status='confirmed')
+    customers = Customer.objects.all()
+    if customer_ids is not None:
+        orders = orders.filter(customer_id__in=customer_ids)
+        customers = customers.filter(pk__in=customer_ids)
+    expected = dict(orders.order_by().values('customer_id').annotate(total=Sum('total_amount')).values_list(
+        'customer_id', 'total'
+    ))
+    drift = {}
+    for pk, balance in customers.annotate(ledger_balance=Subquery(_latest_balances())).values_list('pk', 'ledger_balance'):
+        # SQLite sums decimals as floats
+        balance = (balance or Decimal('0.00')).quantize(CENT)
+        total = (expected.get(pk) or Decimal('0.00')).quantize(CENT)
+        if balance != total:
+            drift[pk] = (balance, total)
+    return drift
@@ -0,0 +1,125 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.functions import Lower, Upper
+
+from core.cache import record_access
+from .models import Customer
+
+
+LOOKUP_LIMIT = 10
+LOOKUP_FIELDS = ("id", "customer_id", "name", "phone", "email")
+
+# Hot prefixes ("a", "ah", "ahm" ...) are answered from memory. Entries are
+# dropped when a customer changes in this process and expire after the TTL,
+# which bounds how stale other worker processes can be.
+CACHE_SIZE = 512
+CACHE_TTL = 30
+
+# Sorts after every character, closing the range of strings with a prefix
+_MAX_CHAR = "\U0010ffff"
+_PHONE = re.compile(r"^[\d\s()+-]+$")
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _startswith(lookup, prefix, vendor):
+    """
+    Index-friendly prefix filter. PostgreSQL uses LIKE 'prefix%' on a
+    pattern_ops index; SQLite's LIKE never uses an index, but a
+    `>= prefix AND < prefix + max char` range on a plain one does.
+    """
+    if vendor == "postgresql":
+        return Q(**{f"{lookup}__startswith": prefix})
+    return Q(**{f"{lookup}__gte": prefix, f"{lookup}__lt": prefix + _MAX_CHAR})
+
+
+def _id_prefix(customers, term, vendor):
+    # Stored IDs may be in either case; match them case-insensitively
+    return (
+        customers.annotate(customer_id_upper=Upper("customer_id"))
+        .filter(_startswith("customer_id_upper", term.upper(), vendor))
+        .order_by("customer_id_upper", "id")
+    )
+
+
+def _email_prefix(customers, term, vendor):
+    # Emails are stored as typed
+    return (
+        customers.annotate(email_lower=Lower("email"))
+        .filter(_startswith("email_lower", term.lower(), vendor))
+        .order_by("email_lower", "id")
+    )
+
+
+def _query_customers(term, limit):
+    vendor = connections[Customer.objects.db].vendor
+    customers = Customer.objects.values(*LOOKUP_FIELDS)
+    # Each query is a short range scan on one index, read in index order
+    queries = []
+    if "@" in term:
+        queries.append(_email_prefix(customers, term, vendor))
+    elif _PHONE.match(term):
+        queries.append(customers.filter(_startswith("phone", term, vendor)).order_by("phone"))
+        queries.append(_id_prefix(customers, term, vendor))
+    else:
+        queries.append(_id_prefix(customers, term, vendor))
+        queries.append(
+            customers.annotate(name_upper=Upper("name"))
+            .filter(_startswith("name_upper", term.upper(), vendor))
+            .order_by("name_upper", "id")
+        )
+        queries.append(_email_prefix(customers, term, vendor))
+
+    results, seen = [], set()
+    for query in queries:
+        for row in query[:limit]:
+            if row["id"] not in seen and len(results) < limit:
+                seen.add(row["id"])
+                row.pop("name_upper", None)
+                row.pop("customer_id_upper", None)
+                row.pop("email_lower", None)
+                row["label"] = f"{row['name']} ({row['customer_id']})"
+                results.append(row)
+        if len(results) >= limit:
+            break
+    return results
+
+
+def lookup_customers(query, limit=LOOKUP_LIMIT):
+    """
+    Customers whose customer ID, name, email (all case-insensitive) or
+    phone start with `query`, as dicts of LOOKUP_FIELDS plus a display label.
+    ID matches come first, then names, then emails.
+    """
+    term = " ".join(query.split())
+    if not term:
+        return []
+    key = (term, limit)
+    now = time.monotonic()
+    with _cache_lock:
+        hit = _cache.get(key)
+        fresh = hit is not None and hit[0] > now
+        if fresh:
+            _cache.move_to_end(key)
+    record_access("customer_lookup", fresh)
+    if fresh:
+        return hit[1]
+
+    results = _query_customers(term, limit)
+    with _cache_lock:
+        _cache[key] = (now + CACHE_TTL, results)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return results
+
+
+def clear_lookup_cache():
+    with _cache_lock:
+        _cache.clear()
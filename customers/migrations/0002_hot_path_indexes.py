@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customers", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="customer",
+            options={
+                "ordering": ["name", "id"],
+                "verbose_name": "Customer",
+                "verbose_name_plural": "Customers",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="customer",
+            index=models.Index(fields=["name", "id"], name="customer_name_id_idx"),
+        ),
+    ]
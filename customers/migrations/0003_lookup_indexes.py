@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:13
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+# PostgreSQL only uses an index for LIKE 'prefix%' with a pattern opclass;
+# other backends run the range queries on the expression indexes below.
+PATTERN_INDEXES = {
+    "customer_name_upper_like_idx": "UPPER(name)",
+    "customer_id_upper_like_idx": "UPPER(customer_id)",
+    "customer_email_lower_like_idx": "LOWER(email)",
+}
+
+
+def create_pattern_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        for name, expression in PATTERN_INDEXES.items():
+            schema_editor.execute(
+                f"CREATE INDEX IF NOT EXISTS {name} ON customers_customer ({expression} varchar_pattern_ops)"
+            )
+
+
+def drop_pattern_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        for name in PATTERN_INDEXES:
+            schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customers", "0002_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="customer",
+            name="phone",
+            field=models.CharField(db_index=True, max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name="customer",
+            index=models.Index(
+                django.db.models.functions.text.Upper("name"),
+                models.F("id"),
+                name="customer_name_upper_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="customer",
+            index=models.Index(
+                django.db.models.functions.text.Upper("customer_id"),
+                models.F("id"),
+                name="customer_id_upper_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="customer",
+            index=models.Index(
+                django.db.models.functions.text.Lower("email"),
+                models.F("id"),
+                name="customer_email_lower_idx",
+            ),
+        ),
+        migrations.RunPython(create_pattern_index, drop_pattern_index),
+    ]
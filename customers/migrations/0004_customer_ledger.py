@@ -0,0 +1,110 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:21
+
+import datetime
+from decimal import Decimal
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_ledger(apps, schema_editor):
+    """
+    One charge per existing confirmed order, with running balances per customer.
+    """
+    SalesOrder = apps.get_model("orders", "SalesOrder")
+    LedgerEntry = apps.get_model("customers", "LedgerEntry")
+    rows = (
+        SalesOrder.objects.filter(status="confirmed")
+        .order_by("customer_id", "order_date", "id")
+        .values_list("pk", "customer_id", "order_date", "total_amount")
+    )
+    batch, customer_id, balance = [], None, Decimal("0.00")
+    for order_id, order_customer_id, order_date, total in rows.iterator(chunk_size=2000):
+        if order_customer_id != customer_id:
+            customer_id, balance = order_customer_id, Decimal("0.00")
+        balance += total
+        posted_at = datetime.datetime.combine(order_date, datetime.time.min)
+        batch.append(
+            LedgerEntry(
+                customer_id=customer_id,
+                order_id=order_id,
+                kind="charge",
+                amount=total,
+                balance=balance,
+                posted_at=timezone.make_aware(posted_at),
+            )
+        )
+        if len(batch) >= 1000:
+            LedgerEntry.objects.bulk_create(batch)
+            batch = []
+    LedgerEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customers", "0003_lookup_indexes"),
+        ("orders", "0004_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("charge", "Order charge"),
+                            ("reversal", "Order reversal"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=14)),
+                ("balance", models.DecimalField(decimal_places=2, max_digits=14)),
+                ("posted_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "customer",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ledger_entries",
+                        to="customers.customer",
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="ledger_entries",
+                        to="orders.salesorder",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Ledger Entry",
+                "verbose_name_plural": "Ledger Entries",
+                "ordering": ["customer", "posted_at", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["customer", "posted_at", "id"],
+                        name="ledger_customer_posted_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,7 @@
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Lower, Upper
+from django.utils import timezone
 
 
 
@@ -6,7 +9,7 @@ from django.db import models
 class Customer(models.Model):
     customer_id = models.CharField(max_length=100, unique=True)
     name = models.CharField(max_length=255)
-    phone = models.CharField(max_length=20)
+    phone = models.CharField(max_length=20, db_index=True)
     address = models.TextField()
     email = models.EmailField(unique=True)
     opening_balance = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
@@ -17,6 +20,48 @@ class Customer(models.Model):
     
 
     class Meta:
-        ordering = ['name']
+        ordering = ['name', 'id']
         verbose_name = 'Customer'
-        verbose_name_plural = 'Customers'
\ No newline at end of file
+        verbose_name_plural = 'Customers'
+        indexes = [
+            # Customer list: ORDER BY name, id
+            models.Index(fields=['name', 'id'], name='customer_name_id_idx'),
+            # Case-insensitive name prefix lookups (customers.lookup)
+            models.Index(Upper('name'), F('id'), name='customer_name_upper_idx'),
+            # Case-insensitive customer ID prefix lookups (customers.lookup)
+            models.Index(Upper('customer_id'), F('id'), name='customer_id_upper_idx'),
+            # Case-insensitive email prefix lookups (customers.lookup)
+            models.Index(Lower('email'), F('id'), name='customer_email_lower_idx'),
+        ]
+
+
+class LedgerEntry(models.Model):
+    """
+    One movement on a customer's account. `balance` is the running total of
+    the customer's entries up to and including this one, so the amount owed
+    at any moment is opening_balance + the balance of the last earlier entry.
+    """
+    class Kinds(models.TextChoices):
+        CHARGE = 'charge', 'Order charge'
+        REVERSAL = 'reversal', 'Order reversal'
+
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='ledger_entries')
+    order = models.ForeignKey(
+        'orders.SalesOrder', on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries'
+    )
+    kind = models.CharField(max_length=20, choices=Kinds.choices)
+    amount = models.DecimalField(max_digits=14, decimal_places=2)
+    balance = models.DecimalField(max_digits=14, decimal_places=2)
+    posted_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.amount} ({self.customer_id})"
+
+    class Meta:
+        ordering = ['customer', 'posted_at', 'id']
+        verbose_name = 'Ledger Entry'
+        verbose_name_plural = 'Ledger Entries'
+        indexes = [
+            # Balance as of a date and statements: one range scan per customer
+            models.Index(fields=['customer', 'posted_at', 'id'], name='ledger_customer_posted_idx'),
+        ]
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import bump_object_versions
+from orders.models import SalesOrder
+from orders.signals import order_status_changed
+from .ledger import post_entries, post_entry
+from .lookup import clear_lookup_cache
+from .models import Customer, LedgerEntry
+
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def invalidate_customer_caches(sender, instance, **kwargs):
+    clear_lookup_cache()
+    bump_object_versions(Customer, [instance.pk])
+
+
+@receiver(order_status_changed)
+def post_orders_to_ledger(sender, orders, old_status, new_status, **kwargs):
+    """
+    Confirming an order charges the customer; leaving the confirmed state
+    (e.g. canceling) reverses the charge.
+    """
+    if new_status == 'confirmed':
+        post_entries([(order.customer_id, LedgerEntry.Kinds.CHARGE, order.total_amount, order) for order in orders])
+    elif old_status == 'confirmed':
+        post_entries([(order.customer_id, LedgerEntry.Kinds.REVERSAL, -order.total_amount, order) for order in orders])
+
+
+@receiver(post_delete, sender=SalesOrder)
+def reverse_deleted_order(sender, instance, origin=None, **kwargs):
+    """
+    Deleting a confirmed order takes its charge off the customer's balance.
+    Skipped when the customer itself is being deleted.
+    """
+    # origin is the instance or queryset whose delete() started the cascade
+    if getattr(origin, 'model', type(origin)) is Customer:
+        return
+    if instance.status == 'confirmed':
+        post_entry(instance.customer_id, LedgerEntry.Kinds.REVERSAL, -instance.total_amount)
@@ -1,3 +1,227 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import QueryCountMixin, grow_to, make_customers, make_order, make_user
+from orders.models import SalesOrder
+from .ledger import balance_as_of, ledger_drift, post_entry
+from .lookup import clear_lookup_cache, lookup_customers
+from .models import Customer, LedgerEntry
+
+
+class CustomerViewQueryCountTests(QueryCountMixin, TestCase):
+    """
+    Page query counts must not grow with the number of customers.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        [cls.customer] = make_customers(1)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.customers = grow_to(make_customers)
+
+    def test_customer_list(self):
+        # session, user, page count, page rows
+        self.assertConstantQueries(lambda: reverse("customer_list"), self.customers, expected=4)
+        self.assertConstantQueries(lambda: reverse("customer_list") + "?cursor=", self.customers, expected=4)
+
+    def test_customer_pages(self):
+        cache.clear()
+        self.client.get(reverse("customer_detail", args=[self.customer.pk]))
+        # session, user, recent ledger entries (customer served from the cache)
+        self.assertConstantQueries(
+            lambda: reverse("customer_detail", args=[self.customer.pk]), self.customers, expected=3
+        )
+        # session, user, customer
+        self.assertConstantQueries(
+            lambda: reverse("customer_edit", args=[self.customer.pk]), self.customers, expected=3
+        )
+        # session, user
+        self.assertConstantQueries(lambda: reverse("customer_create"), self.customers, expected=2)
+
+    def test_customer_export(self):
+        # session, user, rows
+        self.assertConstantQueries(lambda: reverse("customer_export"), self.customers, expected=3)
+
+
+class CustomerLookupTests(QueryCountMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        cls.ahmed = Customer.objects.create(
+            customer_id="CUST001", name="Ahmed Hassan", phone="010-1234-5678",
+            address="Cairo", email="ahmed.hassan@example.com",
+        )
+        cls.amal = Customer.objects.create(
+            customer_id="CUST002", name="amal Saleh", phone="012-9999-0000",
+            address="Giza", email="amal@example.com",
+        )
+        cls.mona = Customer.objects.create(
+            customer_id="VIP001", name="Mona Ahmed", phone="011-5555-1234",
+            address="Alexandria", email="mona@example.com",
+        )
+
+    def setUp(self):
+        clear_lookup_cache()
+        self.client.force_login(self.user)
+
+    def ids(self, query):
+        return [row["id"] for row in lookup_customers(query)]
+
+    def test_prefix_matches_by_field(self):
+        self.assertEqual(self.ids("a"), [self.ahmed.pk, self.amal.pk])
+        self.assertEqual(self.ids("AM"), [self.amal.pk])
+        self.assertEqual(self.ids("cust"), [self.ahmed.pk, self.amal.pk])
+        self.assertEqual(self.ids("vip"), [self.mona.pk])
+        self.assertEqual(self.ids("mona@"), [self.mona.pk])
+        self.assertEqual(self.ids("011-55"), [self.mona.pk])
+        self.assertEqual(self.ids("hassan"), [])
+        self.assertEqual(self.ids("  "), [])
+
+    def test_lower_case_ids_match_in_any_case(self):
+        walkin = Customer.objects.create(
+            customer_id="walk-in-7", name="Zeinab Fathy", phone="015", address="Cairo", email="z@example.com"
+        )
+        self.assertEqual(self.ids("walk"), [walkin.pk])
+        self.assertEqual(self.ids("WALK-IN"), [walkin.pk])
+        self.assertEqual(self.ids("Walk-In-7"), [walkin.pk])
+
+    def test_mixed_case_emails_match_in_any_case(self):
+        zed = Customer.objects.create(
+            customer_id="CUST009", name="Zed Person", phone="016", address="Cairo", email="Zed.Person@Example.com"
+        )
+        self.assertEqual(self.ids("zed.person@"), [zed.pk])
+        self.assertEqual(self.ids("Zed.Person@"), [zed.pk])
+        self.assertEqual(self.ids("ZED.PERSON@EXAMPLE"), [zed.pk])
+
+    def test_cache_is_cleared_by_customer_writes(self):
+        self.assertEqual(self.ids("mo"), [self.mona.pk])
+        with self.assertNumQueries(0):
+            self.ids("mo")
+        mohamed = Customer.objects.create(
+            customer_id="CUST003", name="Mohamed Ali", phone="010", address="Cairo", email="m@example.com"
+        )
+        self.assertEqual(self.ids("mo"), [mohamed.pk, self.mona.pk])
+
+    def test_lookup_endpoint(self):
+        response = self.client.get(reverse("customer_lookup"), {"q": "ahm"})
+        [result] = response.json()["results"]
+        self.assertEqual(result["label"], "Ahmed Hassan (CUST001)")
+        self.assertEqual(set(result), {"id", "customer_id", "name", "phone", "email", "label"})
+
+    def test_lookup_query_count(self):
+        def grow(size):
+            make_customers(size)
+            clear_lookup_cache()
+
+        # session, user, customer ID / name / email prefix ranges
+        self.assertConstantQueries(lambda: reverse("customer_lookup") + "?q=ahm", grow, expected=5)
+
+
+class CustomerDetailCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        [cls.customer] = make_customers(1)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.url = reverse("customer_detail", args=[self.customer.pk])
+
+    def test_edit_invalidates_cached_page(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("customer_edit", args=[self.customer.pk]), {
+                "customer_id": "C0000", "name": "Renamed Customer", "phone": "0100",
+                "address": "Cairo", "email": "customer0@example.com", "opening_balance": "0",
+            })
+        with self.assertNumQueries(4):
+            self.assertContains(self.client.get(self.url), "Renamed Customer")
+
+
+class CustomerLedgerTests(QueryCountMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        [cls.customer] = make_customers(1)
+        cls.customer.opening_balance = Decimal("100.00")
+        cls.customer.save()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def confirmed_order(self, lines=2):
+        order = make_order(self.customer, self.user, lines=lines)
+        self.client.get(reverse("order_confirm", args=[order.pk]))
+        order.refresh_from_db()
+        self.assertEqual(order.status, "confirmed")
+        return order
+
+    def test_confirm_and_cancel_post_entries(self):
+        order = self.confirmed_order()
+        self.assertEqual(balance_as_of(self.customer), Decimal("104.00"))
+
+        self.client.get(reverse("order_cancel", args=[order.pk]))
+        entries = list(LedgerEntry.objects.filter(customer=self.customer).values_list("kind", "amount", "balance"))
+        self.assertEqual(entries, [
+            ("charge", Decimal("4.00"), Decimal("4.00")),
+            ("reversal", Decimal("-4.00"), Decimal("0.00")),
+        ])
+        self.assertEqual(balance_as_of(self.customer), Decimal("100.00"))
+        self.assertEqual(ledger_drift(), {})
+
+    def test_confirmed_order_stays_with_its_customer(self):
+        [other] = make_customers(1)
+        order = self.confirmed_order()
+        response = self.client.post(reverse("order_edit", args=[order.pk]), {"customer_id": other.pk}, follow=True)
+        self.assertContains(response, "Only pending orders can be moved")
+        self.client.get(reverse("order_cancel", args=[order.pk]))
+        order.refresh_from_db()
+        self.assertEqual(order.customer_id, self.customer.pk)
+        self.assertFalse(LedgerEntry.objects.filter(customer=other).exists())
+        self.assertEqual(ledger_drift(), {})
+
+        pending = make_order(self.customer, self.user)
+        self.client.post(reverse("order_edit", args=[pending.pk]), {"customer_id": other.pk})
+        self.assertEqual(SalesOrder.objects.get(pk=pending.pk).customer_id, other.pk)
+
+    def test_balance_as_of_date(self):
+        today = timezone.localdate()
+        entry = post_entry(self.customer.pk, LedgerEntry.Kinds.CHARGE, Decimal("10.00"))
+        LedgerEntry.objects.filter(pk=entry.pk).update(posted_at=entry.posted_at - datetime.timedelta(days=3))
+        post_entry(self.customer.pk, LedgerEntry.Kinds.CHARGE, Decimal("5.00"))
+
+        self.assertEqual(balance_as_of(self.customer, today - datetime.timedelta(days=4)), Decimal("100.00"))
+        self.assertEqual(balance_as_of(self.customer, today - datetime.timedelta(days=1)), Decimal("110.00"))
+        self.assertEqual(balance_as_of(self.customer, today), Decimal("115.00"))
+
+    def test_rebuild_repairs_drift(self):
+        self.confirmed_order()
+        LedgerEntry.objects.all().delete()
+        self.assertEqual(ledger_drift(), {self.customer.pk: (Decimal("0.00"), Decimal("4.00"))})
+        out = StringIO()
+        call_command("rebuild_customer_ledger", stdout=out)
+        self.assertIn("Rebuilt 1 ledger(s)", out.getvalue())
+        self.assertEqual(ledger_drift(), {})
+
+    def test_statement_queries_do_not_grow(self):
+        def grow(size):
+            for _ in range(size - LedgerEntry.objects.count()):
+                post_entry(self.customer.pk, LedgerEntry.Kinds.CHARGE, Decimal("1.00"))
 
-# Create your tests here.
+        # session, user, customer, page count, page rows, opening and closing balances
+        self.assertConstantQueries(
+            lambda: reverse("customer_statement", args=[self.customer.pk]), grow, expected=7
+        )
+        response = self.client.get(reverse("customer_statement", args=[self.customer.pk]))
+        self.assertEqual(response.context["closing"], Decimal("125.00"))
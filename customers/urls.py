@@ -6,6 +6,9 @@ urlpatterns = [
     path('', views.customer_list, name='customer_list'),
     path('<int:pk>/', views.customer_detail, name='customer_detail'),
     path('create/', views.customer_create, name='customer_create'),
+    path('export/', views.customer_export, name='customer_export'),
+    path('lookup/', views.customer_lookup, name='customer_lookup'),
+    path('<int:pk>/statement/', views.customer_statement, name='customer_statement'),
     path('<int:pk>/edit/', views.customer_edit, name='customer_edit'),
     path('<int:pk>/delete/', views.customer_delete, name='customer_delete'),
 ]
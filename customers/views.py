@@ -1,8 +1,16 @@
+from datetime import timedelta
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from accounts.decorators import admin_required
-from django.core.paginator import Paginator
+from core.cache import OBJECT_CACHE_TIMEOUT, cache_timeout, cached_object
+from core.exports import export_response
+from core.pagination import paginate
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from .ledger import STATEMENT_PAGE_SIZE, balance_as_of, statement_entries
+from .lookup import lookup_customers
 from .models import Customer
 
 
@@ -12,19 +20,75 @@ def customer_list(request):
     """
     Display a list of all customers.
     """
-    customers = Customer.objects.all()
-    paginator = Paginator(customers, 10)  # Show 10 customers per page
-    page_number = request.GET.get('page')
-    customers = paginator.get_page(page_number)
+    customers = paginate(request, Customer.objects.all(), 10, ('name', 'id'))  # Show 10 customers per page
     return render(request, "customers/customer_list.html", {"customers": customers})
 
+@login_required
+def customer_export(request):
+    """
+    Export all customers as CSV or XLSX.
+    """
+    columns = [
+        ("Customer ID", "customer_id"),
+        ("Name", "name"),
+        ("Phone", "phone"),
+        ("Email", "email"),
+        ("Address", "address"),
+        ("Opening Balance", "opening_balance"),
+    ]
+    return export_response(request, "customers", columns, Customer.objects.order_by('name', 'id'))
+
+@login_required
+def customer_lookup(request):
+    """
+    JSON typeahead: customers whose ID, name, email or phone start with ?q=.
+    """
+    return JsonResponse({"results": lookup_customers(request.GET.get("q", ""))})
+
 @login_required
 def customer_detail(request, pk):
     """
     Display details of a specific customer.
     """
+    customer, version = cached_object(Customer, pk)
+    # Latest entries first; the newest one carries the current running balance
+    recent_entries = list(customer.ledger_entries.select_related('order').order_by('-posted_at', '-id')[:10])
+    for entry in recent_entries:
+        entry.balance_due = customer.opening_balance + entry.balance
+    return render(request, "customers/customer_detail.html", {
+        "customer": customer,
+        "cache_version": version,
+        "cache_timeout": cache_timeout(OBJECT_CACHE_TIMEOUT),
+        "recent_entries": recent_entries,
+        "balance": recent_entries[0].balance_due if recent_entries else customer.opening_balance,
+    })
+
+@login_required
+def customer_statement(request, pk):
+    """
+    Account statement for a date range (?start=&end=, default: this month):
+    the balance brought forward, the entries in the range and the closing balance.
+    """
     customer = get_object_or_404(Customer, pk=pk)
-    return render(request, "customers/customer_detail.html", {"customer": customer})
+    today = timezone.localdate()
+    start = parse_date(request.GET.get("start") or "") or today.replace(day=1)
+    end = parse_date(request.GET.get("end") or "") or today
+    if start > end:
+        start, end = end, start
+
+    entries = paginate(
+        request, statement_entries(customer, start, end), STATEMENT_PAGE_SIZE, ('posted_at', 'id')
+    )
+    for entry in entries:
+        entry.balance_due = customer.opening_balance + entry.balance
+    return render(request, "customers/customer_statement.html", {
+        "customer": customer,
+        "start": start,
+        "end": end,
+        "entries": entries,
+        "opening": balance_as_of(customer, start - timedelta(days=1)),
+        "closing": balance_as_of(customer, end),
+    })
 
 @login_required
 def customer_create(request):
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     "customers",
     "orders",
     "inventory",
+    "reports",
     "django.contrib.admin",
     "django.contrib.auth",
     "django.contrib.contenttypes",
@@ -58,6 +59,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "erp_system.urls"
@@ -90,6 +92,53 @@ DATABASES = {
     }
 }
 
+# Set POSTGRES_DB (plus the optional connection variables) to run against a
+# local PostgreSQL instead, e.g. for large-dataset benchmarks.
+if os.getenv("POSTGRES_DB"):
+    DATABASES["default"] = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.getenv("POSTGRES_DB"),
+        "USER": os.getenv("POSTGRES_USER", ""),
+        "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
+        "HOST": os.getenv("POSTGRES_HOST", ""),
+        "PORT": os.getenv("POSTGRES_PORT", ""),
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# CACHE_BACKEND: "locmem" (per process, default), "file" (shared by the
+# processes of one host) or "redis" (needs the redis package and a server).
+#
+# The versions that invalidate cached pages and reports live in the cache
+# too, so under locmem a write in one worker process never reaches the
+# entries of another. Run more than one worker with "file" or "redis";
+# under locmem the versioned caches keep entries at most CACHE_MAX_AGE seconds.
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "locmem")
+CACHE_MAX_AGE = int(os.getenv("CACHE_MAX_AGE", "30")) if CACHE_BACKEND == "locmem" else None
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_LOCATION", "redis://127.0.0.1:6379/1"),
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_LOCATION", str(BASE_DIR / ".cache")),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "OPTIONS": {"MAX_ENTRIES": 10000},
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -134,6 +183,37 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "accounts.User"
 
+# Covering indexes (Index.include) are PostgreSQL-only; SQLite builds the
+# same index without the non-key columns.
+SILENCED_SYSTEM_CHECKS = ["models.W040"]
+
+# Serve every list view with keyset (cursor) pagination instead of numbered
+# pages. Individual requests can opt in with a `?cursor=` parameter.
+CURSOR_PAGINATION = os.getenv("CURSOR_PAGINATION", "False") == "True"
+
+# Sales order numbers reserved per process in one database round trip.
+# Values above 1 trade strictly consecutive numbers for fewer writes.
+ORDER_NUMBER_BLOCK_SIZE = int(os.getenv("ORDER_NUMBER_BLOCK_SIZE", "1"))
+
+# Share of requests (0 to 1) timed by core.middleware.ProfilingMiddleware.
+# Keep it low in production (e.g. 0.01); 0 disables profiling.
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "erp.profiling": {
+            "handlers": ["console"],
+            "level": os.getenv("PROFILING_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
 LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "home"
 LOGOUT_REDIRECT_URL = "login"
\ No newline at end of file
@@ -26,4 +26,5 @@ urlpatterns = [
     path("customers/", include("customers.urls")),
     path("orders/", include("orders.urls")),
     path("inventory/", include("inventory.urls")),
+    path("reports/", include("reports.urls")),
 ]
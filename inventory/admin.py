@@ -1,9 +1,35 @@
 from django.contrib import admin
-from .models import StockMovement
+from .models import StockMovement, StockReservation, StockSnapshot
 
 @admin.register(StockMovement)
 class StockMovementAdmin(admin.ModelAdmin):
     list_display = ("product", "created_by", "quantity", "timestamp",)
     list_filter = ("created_by", "timestamp",)
     search_fields = ("product__name", "product__sku", "created_by__username",)
-    readonly_fields = ("product", "quantity", "created_by", "timestamp")
\ No newline at end of file
+    readonly_fields = ("product", "quantity", "created_by", "timestamp")
+    list_select_related = ("product", "created_by")
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("product", "date", "quantity")
+    list_filter = ("date",)
+    search_fields = ("product__sku", "product__name")
+    readonly_fields = ("product", "date", "quantity")
+    list_select_related = ("product",)
+
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ("product", "order", "quantity", "expires_at")
+    list_filter = ("expires_at",)
+    search_fields = ("product__sku", "product__name", "order__order_number")
+    # Changed through inventory.reservations, which keeps Product.reserved_quantity in step
+    readonly_fields = ("product", "order", "quantity", "expires_at")
+    list_select_related = ("product", "order")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
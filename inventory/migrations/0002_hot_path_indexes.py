@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0001_initial"),
+        ("products", "0003_hot_path_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="stockmovement",
+            options={
+                "ordering": ["-timestamp", "-id"],
+                "verbose_name": "Stock Movement",
+                "verbose_name_plural": "Stock Movements",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="stockmovement",
+            index=models.Index(
+                fields=["-timestamp", "-id"], name="stockmovement_ts_id_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stockmovement",
+            index=models.Index(
+                fields=["product", "-timestamp"], name="stockmovement_product_ts_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0002_hot_path_indexes"),
+        ("products", "0004_product_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("quantity", models.IntegerField()),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_snapshots",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Stock Snapshot",
+                "verbose_name_plural": "Stock Snapshots",
+                "ordering": ["-date", "product"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "product"),
+                        name="stocksnapshot_date_product_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0004_stock_reservations"),
+        ("products", "0005_product_reserved_quantity"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockSlot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("slot", models.PositiveSmallIntegerField()),
+                ("quantity", models.PositiveIntegerField(default=0)),
+                ("reserved", models.PositiveIntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stock_slots",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Stock Slot",
+                "verbose_name_plural": "Stock Slots",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "slot"), name="stockslot_product_slot_uniq"
+                    )
+                ],
+            },
+        ),
+    ]
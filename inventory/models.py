@@ -14,6 +14,78 @@ class StockMovement(models.Model):
 
 
     class Meta:
-        ordering = ['-timestamp']
+        ordering = ['-timestamp', '-id']
         verbose_name = 'Stock Movement'
-        verbose_name_plural = 'Stock Movements'
\ No newline at end of file
+        verbose_name_plural = 'Stock Movements'
+        indexes = [
+            # Movement log: ORDER BY timestamp DESC, id DESC
+            models.Index(fields=['-timestamp', '-id'], name='stockmovement_ts_id_idx'),
+            # Per-product history
+            models.Index(fields=['product', '-timestamp'], name='stockmovement_product_ts_idx'),
+        ]
+
+class StockSnapshot(models.Model):
+    """
+    A product's stock on hand at the end of a day, written by the
+    snapshot_stock command. Point-in-time stock starts from the latest
+    snapshot and replays only the movements after it.
+    """
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='stock_snapshots')
+    date = models.DateField()
+    quantity = models.IntegerField()
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.date}: {self.quantity}"
+
+    class Meta:
+        ordering = ['-date', 'product']
+        verbose_name = 'Stock Snapshot'
+        verbose_name_plural = 'Stock Snapshots'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='stocksnapshot_date_product_uniq'),
+        ]
+
+
+# Units of a product held for a pending order until `expires_at`.
+# Product.reserved_quantity holds the sum per product; change both through
+# inventory.reservations only.
+class StockReservation(models.Model):
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE)
+    order = models.ForeignKey('orders.SalesOrder', on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.product} x {self.quantity} for {self.order_id}"
+
+    class Meta:
+        verbose_name = 'Stock Reservation'
+        verbose_name_plural = 'Stock Reservations'
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'product'], name='reservation_order_product_uniq'),
+        ]
+        indexes = [
+            # Expiry sweep: oldest first
+            models.Index(fields=['expires_at', 'id'], name='reservation_expires_idx'),
+        ]
+
+
+# One of the counters a hot product's stock is split across (inventory.sharding).
+# While a product has slots they hold its stock on hand and the units pending
+# orders reserve (never more than the slot's quantity), and
+# Product.stock_quantity / reserved_quantity are their totals as of the last sync.
+class StockSlot(models.Model):
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='stock_slots')
+    slot = models.PositiveSmallIntegerField()
+    quantity = models.PositiveIntegerField(default=0)
+    reserved = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.product_id} #{self.slot}: {self.quantity} ({self.reserved} reserved)"
+
+    class Meta:
+        verbose_name = 'Stock Slot'
+        verbose_name_plural = 'Stock Slots'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'slot'], name='stockslot_product_slot_uniq'),
+        ]
@@ -0,0 +1,208 @@
+import datetime
+
+from django.db import models, transaction
+from django.db.models import Case, F, When
+from django.utils import timezone
+
+from core.cache import CATALOGUE, bump_object_versions, bump_version
+from products.models import Product
+from .models import StockReservation
+from .services import UPDATE_BATCH_SIZE
+from .sharding import is_sharded, release_slot_stock, reserve_slot_stock, sharded_products
+
+
+# How long a pending order holds stock after its last line was added
+RESERVATION_TTL = datetime.timedelta(hours=24)
+SWEEP_BATCH_SIZE = 1000
+
+
+def _lock_products(product_ids, *fields):
+    """
+    Lock unsharded products in primary-key order, batch by batch, and
+    return them. Every path that changes reservations locks the products
+    first, so the reservation counter of a product only ever changes under
+    its lock. (Sharded products keep theirs in their slots.)
+    """
+    products = {}
+    for start in range(0, len(product_ids), UPDATE_BATCH_SIZE):
+        batch = product_ids[start:start + UPDATE_BATCH_SIZE]
+        products.update(
+            (product.pk, product)
+            for product in Product.objects.select_for_update().filter(pk__in=batch).order_by('pk')
+            .only('id', *fields).annotate(sharded=is_sharded())
+        )
+    if any(product.sharded for product in products.values()):
+        raise ValueError("Stock changed while the order was being processed. Please try again.")
+    return products
+
+
+def _change_reserved(deltas):
+    """
+    Add signed deltas ({product_id: delta}) to the reserved counters with a
+    guarded conditional UPDATE per batch: stock on hand must still cover
+    every hold after an increase. Raises ValueError if it does not.
+    """
+    product_ids = sorted(deltas)
+    for start in range(0, len(product_ids), UPDATE_BATCH_SIZE):
+        batch = product_ids[start:start + UPDATE_BATCH_SIZE]
+        new_reserved = Case(
+            *[When(pk=pk, then=F('reserved_quantity') + deltas[pk]) for pk in batch],
+            output_field=models.IntegerField(),
+        )
+        ceiling = Case(
+            *[When(pk=pk, then=F('reserved_quantity') + deltas[pk]) for pk in batch if deltas[pk] > 0],
+            default=0,
+            output_field=models.IntegerField(),
+        )
+        updated = Product.objects.filter(pk__in=batch, stock_quantity__gte=ceiling).update(
+            reserved_quantity=new_reserved
+        )
+        if updated != len(batch):
+            raise ValueError("Stock changed while the order was being processed. Please try again.")
+    # Availability is shown on cached product lookups and detail pages
+    bump_version(CATALOGUE)
+    bump_object_versions(Product, product_ids)
+
+
+def reserve_stock(order_id, quantities):
+    """
+    Hold {product_id: quantity} for a pending order, on top of what it
+    already holds, and push its expiry RESERVATION_TTL out.
+
+    Products are locked in primary-key order and checked against their
+    available-to-promise quantity (on hand minus reserved), so two orders
+    can never be promised the same unit; sharded products are held in
+    their slots instead, checked against the slots' exact free stock.
+    Raises ValueError (and rolls back) listing every product that is short.
+    """
+    product_ids = sorted(pk for pk, quantity in quantities.items() if quantity)
+    if not product_ids:
+        return
+
+    with transaction.atomic(savepoint=False):
+        sharded = sharded_products(product_ids)
+        plain = [pk for pk in product_ids if pk not in sharded]
+        products = _lock_products(plain, 'name', 'stock_quantity', 'reserved_quantity')
+        available = {
+            pk: product.available_quantity for pk, product in products.items()
+            if product.available_quantity < quantities[pk]
+        }
+        if sharded:
+            available.update(reserve_slot_stock({pk: quantities[pk] for pk in sharded}))
+        if available:
+            names = dict(Product.objects.filter(pk__in=available).values_list('pk', 'name'))
+            raise ValueError("; ".join(
+                f"Insufficient stock for {names[pk]}. Only {available[pk]} units available." for pk in sorted(available)
+            ))
+        if plain:
+            _change_reserved({pk: quantities[pk] for pk in plain})
+
+        held = dict(
+            StockReservation.objects.select_for_update()
+            .filter(order_id=order_id, product_id__in=product_ids)
+            .values_list('product_id', 'quantity')
+        )
+        expires_at = timezone.now() + RESERVATION_TTL
+        StockReservation.objects.bulk_create(
+            [
+                StockReservation(
+                    order_id=order_id, product_id=pk, quantity=held.get(pk, 0) + quantities[pk], expires_at=expires_at
+                )
+                for pk in product_ids
+            ],
+            update_conflicts=True,
+            unique_fields=['order', 'product'],
+            update_fields=['quantity', 'expires_at'],
+        )
+
+
+def held_quantities(order_ids):
+    """
+    {order_id: {product_id: quantity}} currently held for `order_ids`.
+    """
+    held = {}
+    rows = StockReservation.objects.filter(order_id__in=order_ids).values_list('order_id', 'product_id', 'quantity')
+    for order_id, product_id, quantity in rows:
+        held.setdefault(order_id, {})[product_id] = quantity
+    return held
+
+
+def _release(reservations, limits=None, consume=False):
+    """
+    Delete `reservations` (a queryset) and take them off the reserved
+    counters, or with `limits` ({product_id: quantity}, a single order's
+    holds) only release up to that much per product. With `consume` the
+    holds of sharded products stay counted in their slots, for the
+    confirmation's deduction to use up.
+    Returns (reservations touched, units released, {product_id: units}
+    left counted in slots).
+    """
+    product_ids = sorted(set(reservations.values_list('product_id', flat=True)))
+    if not product_ids:
+        return 0, 0, {}
+    with transaction.atomic(savepoint=False):
+        sharded = sharded_products(product_ids)
+        _lock_products([pk for pk in product_ids if pk not in sharded])
+        # Re-read under the product locks; sharded products' holds are
+        # only guarded by the reservation rows' own locks
+        rows = list(
+            reservations.select_for_update().filter(product_id__in=product_ids).values_list('pk', 'product_id', 'quantity')
+        )
+
+        released, emptied = {}, []
+        for pk, product_id, quantity in rows:
+            take = quantity if limits is None else min(quantity, limits[product_id])
+            released[product_id] = released.get(product_id, 0) + take
+            if take == quantity:
+                emptied.append(pk)
+            else:
+                StockReservation.objects.filter(pk=pk).update(quantity=quantity - take)
+        StockReservation.objects.filter(pk__in=emptied).delete()
+        in_slots = {pk: quantity for pk, quantity in released.items() if pk in sharded}
+        plain = {pk: -quantity for pk, quantity in released.items() if pk not in sharded}
+        if plain:
+            _change_reserved(plain)
+        if in_slots and not consume:
+            release_slot_stock(in_slots)
+        return len(rows), sum(released.values()), in_slots if consume else {}
+
+
+def release_reservations(order_ids, limits=None):
+    """
+    Give back the stock held for `order_ids`: all of it (cancellation,
+    deletion), or at most {product_id: quantity} of a single order's holds
+    (removing a line). Returns the number of units released.
+    """
+    reservations = StockReservation.objects.filter(order_id__in=order_ids)
+    if limits is not None:
+        reservations = reservations.filter(product_id__in=limits)
+    return _release(reservations, limits)[1]
+
+
+def consume_reservations(order_ids):
+    """
+    Drop the holds of orders being confirmed. Unsharded products' holds
+    are released, for the deduction to take from stock on hand; sharded
+    products' holds are returned as {product_id: units} for
+    apply_stock_deltas(held=...) to use up in the same slot UPDATE.
+    """
+    return _release(StockReservation.objects.filter(order_id__in=order_ids), consume=True)[2]
+
+
+def release_expired(batch_size=SWEEP_BATCH_SIZE, now=None):
+    """
+    Release every reservation that expired by `now`, oldest first,
+    `batch_size` reservations per transaction so the sweep never holds
+    product locks for long. Returns (reservations, units) released.
+    """
+    now = now or timezone.now()
+    expired = StockReservation.objects.filter(expires_at__lte=now)
+    count = units = 0
+    while True:
+        batch = list(expired.order_by('expires_at', 'id').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return count, units
+        # Holds refreshed since the batch was read no longer match `expired`
+        released, released_units, _ = _release(expired.filter(pk__in=batch))
+        count += released
+        units += released_units
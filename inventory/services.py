@@ -0,0 +1,137 @@
+from django.db import models, transaction
+from django.db.models import Case, F, Sum, When
+
+from core import counters
+from core.cache import CATALOGUE, bump_object_versions, bump_version
+from products.models import Product
+from .models import StockMovement
+from .sharding import apply_slot_deltas, is_sharded, sharded_products
+
+
+# Keep CASE expressions and IN lists well below backend parameter limits.
+UPDATE_BATCH_SIZE = 500
+
+
+def order_quantities(order):
+    """
+    Return {product_id: quantity} for an order, summed in the database
+    so duplicate lines for the same product collapse into one delta.
+    """
+    rows = (
+        order.items.order_by()
+        .values('product_id')
+        .annotate(total=Sum('quantity'))
+    )
+    return {row['product_id']: row['total'] for row in rows}
+
+
+def apply_stock_deltas(deltas, created_by_id=None, held=None):
+    """
+    Apply signed stock deltas ({product_id: delta}) and log one movement per product.
+
+    Rows are locked in primary-key order, validated, then updated with a single
+    conditional UPDATE per batch. Deductions may only take stock no pending
+    order holds (release the order's own reservations first); the UPDATE
+    re-checks `stock_quantity >= reserved + needed` so stock can never go
+    negative or under the reservations even on backends without row locks.
+    Sharded products (inventory.sharding) are updated in their slots instead,
+    leaving their Product rows unlocked; there a deduction may also use the
+    confirming orders' holds, `held` (from consume_reservations()).
+    Raises ValueError (and rolls back) if any product lacks stock.
+    """
+    product_ids = sorted(pk for pk, delta in deltas.items() if delta)
+    if not product_ids:
+        return
+    sharded = sharded_products(product_ids)
+    locked_ids = [pk for pk in product_ids if pk not in sharded]
+
+    with transaction.atomic():
+        low_stock_change = 0
+        for start in range(0, len(locked_ids), UPDATE_BATCH_SIZE):
+            batch = locked_ids[start:start + UPDATE_BATCH_SIZE]
+            products = (
+                Product.objects.select_for_update()
+                .filter(pk__in=batch)
+                .order_by('pk')
+                .only('id', 'name', 'stock_quantity', 'reserved_quantity')
+                .annotate(sharded=is_sharded())
+            )
+            for product in products:
+                if product.sharded:
+                    # Split since it was classified
+                    raise ValueError("Stock changed while the order was being processed. Please try again.")
+                required = -deltas[product.pk]
+                if required > 0 and product.available_quantity < required:
+                    raise ValueError(
+                        f"Insufficient stock for {product.name}. "
+                        f"Available: {product.available_quantity}, Required: {required}"
+                    )
+                low_stock_change += counters.low_stock_delta(
+                    product.stock_quantity, product.stock_quantity + deltas[product.pk])
+
+            new_quantity = Case(
+                *[When(pk=pk, then=F('stock_quantity') + deltas[pk]) for pk in batch],
+                output_field=models.IntegerField(),
+            )
+            required = Case(
+                *[When(pk=pk, then=F('reserved_quantity') - deltas[pk]) for pk in batch if deltas[pk] < 0],
+                default=0,
+                output_field=models.IntegerField(),
+            )
+            updated = Product.objects.filter(
+                pk__in=batch, stock_quantity__gte=required
+            ).update(stock_quantity=new_quantity)
+            if updated != len(batch):
+                raise ValueError("Stock changed while the order was being processed. Please try again.")
+        if sharded:
+            # Their low-stock changes are counted when the totals are synced
+            apply_slot_deltas({pk: deltas[pk] for pk in sharded}, held)
+
+        StockMovement.objects.bulk_create([
+            StockMovement(product_id=pk, quantity=deltas[pk], created_by_id=created_by_id)
+            for pk in product_ids
+        ])
+        counters.bump(low_stock_products=low_stock_change)
+        if locked_ids:
+            # Stock levels are part of cached product lookups and detail pages
+            bump_version(CATALOGUE)
+            bump_object_versions(Product, locked_ids)
+
+
+def deduct_order_stock(order, held=None):
+    """
+    Reduce stock for every line of an order in one transaction, using up
+    the order's sharded holds `held` (from consume_reservations()).
+    """
+    deltas = {pk: -quantity for pk, quantity in order_quantities(order).items()}
+    apply_stock_deltas(deltas, created_by_id=order.created_by_id, held=held)
+
+
+def restore_order_stock(order):
+    """
+    Put back the stock taken by a previously confirmed order.
+    """
+    apply_stock_deltas(order_quantities(order), created_by_id=order.created_by_id)
+
+
+def record_stock_adjustment(product_id, delta, created_by_id=None):
+    """
+    Log a stock level set by hand (product forms) as a movement, so the
+    movement history adds up to the stock on hand.
+    """
+    if delta:
+        StockMovement.objects.create(product_id=product_id, quantity=delta, created_by_id=created_by_id)
+
+
+def record_stock_adjustments(deltas, created_by_id=None):
+    """
+    Log stock levels set in bulk (catalogue imports) as one movement per
+    changed product ({product_id: delta}).
+    """
+    StockMovement.objects.bulk_create(
+        [
+            StockMovement(product_id=pk, quantity=delta, created_by_id=created_by_id)
+            for pk, delta in sorted(deltas.items()) if delta
+        ],
+        batch_size=UPDATE_BATCH_SIZE,
+    )
@@ -0,0 +1,337 @@
+from django.db import connections, models, transaction
+from django.db.models import Case, Exists, F, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Coalesce
+
+from core import counters
+from core.cache import CATALOGUE, bump_object_versions, bump_version
+from products.models import Product
+from .models import StockSlot
+
+
+# Hot products (promotions, bestsellers) can have their stock split across
+# slots so concurrent orders update different rows instead of all queueing
+# on the product's. The slots count both the stock on hand and what pending
+# orders reserve, so neither confirmations nor reservations write the
+# Product row. Reads use Product.stock_quantity / reserved_quantity,
+# refreshed from the slots by sync_stock_totals().
+MAX_SLOTS = 64
+SYNC_BATCH_SIZE = 500
+
+
+def sharded_products(product_ids):
+    """
+    The subset of `product_ids` whose stock is split across slots.
+    """
+    return set(
+        StockSlot.objects.filter(product_id__in=product_ids).order_by().values_list('product_id', flat=True).distinct()
+    )
+
+
+def is_sharded():
+    """
+    Expression for whether a product has slots. Paths that lock Product
+    rows annotate it, so a product split after they classified it is
+    refused rather than written through its stale counters.
+    """
+    return Exists(StockSlot.objects.filter(product=OuterRef('pk')))
+
+
+def stock_on_hand():
+    """
+    Expression for a product's exact stock on hand: the sum of its slots
+    when it is sharded, else Product.stock_quantity. For reads that cannot
+    wait for sync_stock_totals() (stock replays).
+    """
+    slots = (
+        StockSlot.objects.filter(product=OuterRef('pk')).order_by()
+        .values('product').annotate(total=Sum('quantity')).values('total')
+    )
+    return Coalesce(Subquery(slots), F('stock_quantity'))
+
+
+def slot_levels(product_ids):
+    """
+    {product_id: (exact stock on hand, units reserved)} of sharded products,
+    summed from their slots.
+    """
+    rows = (
+        StockSlot.objects.filter(product_id__in=product_ids)
+        .order_by()
+        .values('product_id')
+        .annotate(total=Sum('quantity'), held=Sum('reserved'))
+        .values_list('product_id', 'total', 'held')
+    )
+    return {pk: (total, held) for pk, total, held in rows}
+
+
+def lock_free_stock(product_ids):
+    """
+    Lock every slot of the sharded `product_ids` in (product, slot) order
+    and return {product_id: units on hand no pending order holds}. For
+    batch confirmation, which checks many orders before moving any stock.
+    """
+    free = {}
+    rows = (
+        StockSlot.objects.select_for_update()
+        .filter(product_id__in=product_ids)
+        .order_by('product_id', 'slot')
+        .values_list('product_id', 'quantity', 'reserved')
+    )
+    for pk, quantity, reserved in rows:
+        free[pk] = free.get(pk, 0) + quantity - reserved
+    return free
+
+
+def _pick_slot(product_id, **condition):
+    """
+    A random slot of the product meeting `condition`. Where the backend
+    supports it the slot is locked with SKIP LOCKED, so concurrent writers
+    spread over the free slots instead of waiting for each other.
+    """
+    slots = StockSlot.objects.filter(product_id=product_id, **condition)
+    if connections[slots.db].features.has_select_for_update_skip_locked:
+        slots = slots.select_for_update(skip_locked=True)
+    return slots.order_by('?').values_list('pk', flat=True).first()
+
+
+def _change_one(product_id, condition, **changes):
+    """
+    Apply `changes` to one random slot meeting `condition` with a guarded
+    UPDATE. Returns False when no slot can take the change alone.
+    """
+    slot = _pick_slot(product_id, **condition)
+    return slot is not None and bool(StockSlot.objects.filter(pk=slot, **condition).update(**changes))
+
+
+def _change_all(product_id, change):
+    """
+    Lock every slot of the product in slot order, let `change` adjust the
+    [pk, quantity, reserved] rows in memory and write back the rows it
+    changed. For changes no single slot can absorb. Returns what `change`
+    returns.
+    """
+    slots = [
+        list(row) for row in
+        StockSlot.objects.select_for_update().filter(product_id=product_id).order_by('slot')
+        .values_list('pk', 'quantity', 'reserved')
+    ]
+    before = [tuple(row) for row in slots]
+    result = change(slots)
+    for old, (pk, quantity, reserved) in zip(before, slots):
+        if old != (pk, quantity, reserved):
+            StockSlot.objects.filter(pk=pk).update(quantity=quantity, reserved=reserved)
+    return result
+
+
+def _unhold(slots, units):
+    for row in slots:
+        taken = min(row[2], units)
+        row[2] -= taken
+        units -= taken
+
+
+def _spend(slots, units, column):
+    """
+    Use `units` of the slots' free stock, taking them off the stock on hand
+    (column 1) or adding them to the reserved counters (column 2).
+    Returns the free stock if it falls short, changing nothing.
+    """
+    free = sum(quantity - reserved for _, quantity, reserved in slots)
+    if free < units:
+        return free
+    for row in slots:
+        used = min(row[1] - row[2], units)
+        row[column] += used if column == 2 else -used
+        units -= used
+    return None
+
+
+def _take(product_id, quantity, held):
+    """
+    Remove `quantity` units from a sharded product, `held` of which the
+    confirming orders had reserved. Returns the free stock if it falls short.
+    """
+    condition = {'reserved__gte': held, 'quantity__gte': F('reserved') + (quantity - held)}
+    if _change_one(product_id, condition, quantity=F('quantity') - quantity, reserved=F('reserved') - held):
+        return None
+
+    def change(slots):
+        _unhold(slots, held)
+        return _spend(slots, quantity, 1)
+    return _change_all(product_id, change)
+
+
+def _add(product_id, quantity):
+    # No slot left: the product was merged since the caller looked
+    if not _change_one(product_id, {}, quantity=F('quantity') + quantity):
+        raise ValueError("Stock changed while the order was being processed. Please try again.")
+
+
+def apply_slot_deltas(deltas, held=None):
+    """
+    Apply signed stock deltas ({product_id: delta}) to sharded products
+    without writing their Product rows. A deduction may use the confirming
+    orders' own holds, `held` ({product_id: units} from
+    consume_reservations()), plus stock no pending order holds.
+    Raises ValueError if any product lacks stock.
+    """
+    held = held or {}
+    for pk in sorted(deltas):
+        if deltas[pk] >= 0:
+            _add(pk, deltas[pk])
+            continue
+        available = _take(pk, -deltas[pk], held.get(pk, 0))
+        if available is not None:
+            name = Product.objects.values_list('name', flat=True).get(pk=pk)
+            raise ValueError(
+                f"Insufficient stock for {name}. Available: {available}, Required: {-deltas[pk]}"
+            )
+
+
+def reserve_slot_stock(quantities):
+    """
+    Hold {product_id: quantity} of sharded products in their slots' reserved
+    counters, checked against the exact free stock of the slots.
+    Returns {product_id: free units} for the products that are short; the
+    caller rolls back.
+    """
+    short = {}
+    for pk in sorted(quantities):
+        quantity = quantities[pk]
+        if _change_one(pk, {'quantity__gte': F('reserved') + quantity}, reserved=F('reserved') + quantity):
+            continue
+        available = _change_all(pk, lambda slots: _spend(slots, quantity, 2))
+        if available is not None:
+            short[pk] = available
+    return short
+
+
+def release_slot_stock(quantities):
+    """
+    Give back {product_id: quantity} held in sharded products' slots.
+    """
+    for pk in sorted(quantities):
+        quantity = quantities[pk]
+        if not _change_one(pk, {'reserved__gte': quantity}, reserved=F('reserved') - quantity):
+            _change_all(pk, lambda slots: _unhold(slots, quantity))
+
+
+def _set_stock_totals(levels):
+    """
+    Store {product_id: (cached stock, new stock, cached reserved, new reserved)}
+    in Product.stock_quantity / reserved_quantity and move the low-stock
+    counter along.
+    """
+    changed = sorted(pk for pk, (old, new, old_held, new_held) in levels.items() if (old, old_held) != (new, new_held))
+    for start in range(0, len(changed), SYNC_BATCH_SIZE):
+        batch = changed[start:start + SYNC_BATCH_SIZE]
+        Product.objects.filter(pk__in=batch).update(
+            stock_quantity=Case(*[When(pk=pk, then=levels[pk][1]) for pk in batch], output_field=models.IntegerField()),
+            reserved_quantity=Case(*[When(pk=pk, then=levels[pk][3]) for pk in batch], output_field=models.IntegerField()),
+        )
+    if changed:
+        counters.bump(low_stock_products=sum(counters.low_stock_delta(*levels[pk][:2]) for pk in changed))
+        bump_version(CATALOGUE)
+        bump_object_versions(Product, changed)
+    return len(changed)
+
+
+def sync_stock_totals(product_ids=None):
+    """
+    Refresh Product.stock_quantity and reserved_quantity of sharded
+    products (default all) from their slots. Schedule it every minute or
+    so; the cached totals feed the list pages, reports and the low-stock
+    count. Returns the number of products whose totals changed.
+    """
+    products = Product.objects.filter(stock_slots__isnull=False)
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    rows = (
+        products.order_by()
+        .values('pk', 'stock_quantity', 'reserved_quantity')
+        .annotate(total=Sum('stock_slots__quantity'), held=Sum('stock_slots__reserved'))
+    )
+    return _set_stock_totals({
+        row['pk']: (row['stock_quantity'], row['total'], row['reserved_quantity'], row['held']) for row in rows
+    })
+
+
+def _merge(product_id):
+    with transaction.atomic():
+        stored, stored_held = (
+            Product.objects.select_for_update().values_list('stock_quantity', 'reserved_quantity').get(pk=product_id)
+        )
+        slots = list(
+            StockSlot.objects.select_for_update().filter(product_id=product_id).values_list('quantity', 'reserved')
+        )
+        if not slots:
+            return stored, stored_held
+        total, held = sum(quantity for quantity, _ in slots), sum(reserved for _, reserved in slots)
+        StockSlot.objects.filter(product_id=product_id).delete()
+        _set_stock_totals({product_id: (stored, total, stored_held, held)})
+        return total, held
+
+
+def merge_stock(product_id):
+    """
+    Fold a product's slots back into Product.stock_quantity and
+    reserved_quantity and return its stock on hand. Products without slots
+    are left alone.
+    """
+    return _merge(product_id)[0]
+
+
+def _spread(product_id, total, reserved, slots):
+    # Both split the same way, so no slot holds more than its quantity
+    share, extra = divmod(total, slots)
+    held_share, held_extra = divmod(min(reserved, total), slots)
+    return [
+        StockSlot(
+            product_id=product_id, slot=slot,
+            quantity=share + (slot < extra), reserved=held_share + (slot < held_extra),
+        )
+        for slot in range(slots)
+    ]
+
+
+def split_stock(product_id, slots):
+    """
+    Spread a product's stock and reservations evenly over `slots`
+    counters, merging any existing slots first. Returns its stock on hand.
+    """
+    if not 2 <= slots <= MAX_SLOTS:
+        raise ValueError(f"A product can be split into 2 to {MAX_SLOTS} slots")
+    with transaction.atomic():
+        total, reserved = _merge(product_id)
+        StockSlot.objects.bulk_create(_spread(product_id, total, reserved, slots))
+    return total
+
+
+def respread_stock(product_ids):
+    """
+    Replace the slots of the sharded products among `product_ids` with an
+    even split of Product.stock_quantity, after it was set by hand
+    (product form, catalogue import). Their reservations stay held.
+    """
+    with transaction.atomic():
+        stock = dict(
+            Product.objects.select_for_update()
+            .filter(pk__in=product_ids)
+            .filter(pk__in=StockSlot.objects.values('product_id'))
+            .order_by('pk')
+            .values_list('pk', 'stock_quantity')
+        )
+        if not stock:
+            return
+        current = (
+            StockSlot.objects.select_for_update().filter(product_id__in=stock).order_by('product_id', 'slot')
+            .values_list('product_id', 'reserved')
+        )
+        counts, held = {}, {}
+        for pk, reserved in current:
+            counts[pk] = counts.get(pk, 0) + 1
+            held[pk] = held.get(pk, 0) + reserved
+        StockSlot.objects.filter(product_id__in=stock).delete()
+        StockSlot.objects.bulk_create(
+            [slot for pk, total in stock.items() for slot in _spread(pk, total, held[pk], counts[pk])]
+        )
@@ -0,0 +1,14 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from orders.models import SalesOrder
+from .reservations import release_reservations
+
+
+@receiver(pre_delete, sender=SalesOrder)
+def release_deleted_order(sender, instance, **kwargs):
+    """
+    Give back the stock a deleted pending order was holding.
+    """
+    if instance.status == SalesOrder.PENDING:
+        release_reservations([instance.pk])
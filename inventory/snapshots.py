@@ -0,0 +1,124 @@
+import datetime
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+
+from core.dates import end_of_day
+from products.models import Product
+from .models import StockMovement, StockSnapshot
+from .sharding import stock_on_hand
+
+
+SNAPSHOT_BATCH_SIZE = 2000
+
+
+def latest_snapshot_date(on_or_before=None):
+    snapshots = StockSnapshot.objects.all()
+    if on_or_before is not None:
+        snapshots = snapshots.filter(date__lte=on_or_before)
+    return snapshots.aggregate(date=Max('date'))['date']
+
+
+def _replay_plan(date, products):
+    """
+    Split `products` into the ones answered from the latest snapshot on or
+    before `date` plus the movements after it, and the ones answered from
+    current stock (summed from the slots of sharded products) minus the
+    movements after `date`. Whichever replay window
+    is shorter wins, so a stale snapshot never means replaying years of
+    movements. Returns (snapshot date or None, forward movements,
+    products replayed back from current stock, backward movements).
+    """
+    end = end_of_day(date)
+    base = latest_snapshot_date(date)
+    if base is not None and end - end_of_day(base) > timezone.now() - end:
+        base = None
+    backward = StockMovement.objects.filter(timestamp__gte=end)
+    if base is None:
+        return None, StockMovement.objects.none(), products, backward
+
+    covered = StockSnapshot.objects.filter(date=base).values('product_id')
+    forward = StockMovement.objects.filter(
+        timestamp__gte=end_of_day(base), timestamp__lt=end, product__in=products.filter(pk__in=covered)
+    )
+    return base, forward, products.exclude(pk__in=covered), backward
+
+
+def _totals_by_product(movements):
+    return movements.order_by().values('product_id').annotate(total=Sum('quantity')).values_list('product_id', 'total')
+
+
+def stock_on(date, products=None):
+    """
+    {product_id: stock on hand at the end of `date`} for `products`
+    (a Product queryset, default all).
+    """
+    products = products if products is not None else Product.objects.all()
+    base, forward, uncovered, backward = _replay_plan(date, products)
+    uncovered = uncovered.annotate(on_hand=stock_on_hand())
+
+    quantities = {}
+    if base is not None:
+        snapshots = StockSnapshot.objects.filter(date=base, product__in=products)
+        quantities.update(snapshots.values_list('product_id', 'quantity').iterator(chunk_size=SNAPSHOT_BATCH_SIZE))
+        for pk, total in _totals_by_product(forward):
+            quantities[pk] += total
+    current = dict(uncovered.values_list('pk', 'on_hand').iterator(chunk_size=SNAPSHOT_BATCH_SIZE))
+    for pk, total in _totals_by_product(backward.filter(product__in=uncovered)):
+        current[pk] -= total
+    quantities.update(current)
+    return quantities
+
+
+def stock_value_on(date, products=None):
+    """
+    Total units and cost value of `products` on hand at the end of `date`,
+    aggregated in the database. Values use today's cost prices.
+    """
+    products = products if products is not None else Product.objects.all()
+    base, forward, uncovered, backward = _replay_plan(date, products)
+
+    def add(totals, queryset, quantity, cost, sign=1):
+        row = queryset.aggregate(
+            units=Sum(quantity),
+            value=Sum(F(quantity) * F(cost), output_field=models.DecimalField(max_digits=20, decimal_places=2)),
+        )
+        totals['units'] += sign * (row['units'] or 0)
+        totals['value'] += sign * (row['value'] or 0)
+
+    totals = {'units': 0, 'value': Decimal('0.00')}
+    if base is not None:
+        add(totals, StockSnapshot.objects.filter(date=base, product__in=products), 'quantity', 'product__cost_price')
+        add(totals, forward, 'quantity', 'product__cost_price')
+    add(totals, uncovered.annotate(on_hand=stock_on_hand()), 'on_hand', 'cost_price')
+    add(totals, backward.filter(product__in=uncovered), 'quantity', 'product__cost_price', sign=-1)
+    # SQLite sums decimals as floats
+    totals['value'] = totals['value'].quantize(Decimal('0.01'))
+    return totals
+
+
+def take_snapshot(date):
+    """
+    Store every product's stock at the end of `date`, replacing any
+    snapshot already taken for it. Builds on the previous snapshot, so
+    daily runs only fold in that day's movements.
+    Returns the number of rows written.
+    """
+    with transaction.atomic():
+        StockSnapshot.objects.filter(date=date).delete()
+        quantities = stock_on(date)
+        rows = (StockSnapshot(product_id=pk, date=date, quantity=quantity) for pk, quantity in quantities.items())
+        StockSnapshot.objects.bulk_create(rows, batch_size=SNAPSHOT_BATCH_SIZE)
+    return len(quantities)
+
+
+def snapshot_dates(through):
+    """
+    Days still missing a snapshot, from the day after the latest one
+    (or just `through` when there is none) up to `through`.
+    """
+    latest = latest_snapshot_date(through)
+    start = latest + datetime.timedelta(days=1) if latest else through
+    return [start + datetime.timedelta(days=n) for n in range((through - start).days + 1)]
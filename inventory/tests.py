@@ -1,3 +1,323 @@
+import datetime
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import transaction
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core.testing import QueryCountMixin, grow_to, make_customers, make_order, make_products, make_user
+from orders.models import SalesOrder
+from orders.services import add_order_items, confirm_orders
+from products.models import Product
+from .models import StockMovement, StockReservation, StockSlot, StockSnapshot
+from .reservations import release_expired, reserve_stock
+from .services import apply_stock_deltas
+from .sharding import merge_stock, split_stock, sync_stock_totals
+from .snapshots import snapshot_dates, stock_on, stock_value_on, take_snapshot
+
+
+class StockMovementListQueryCountTests(QueryCountMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.movements = grow_to(self.create_movements)
+
+    def create_movements(self, count):
+        return [
+            StockMovement.objects.create(product=product, quantity=-1, created_by=self.user)
+            for product in make_products(count)
+        ]
+
+    def test_movement_list(self):
+        # session, user, page count, page rows (product and user joined)
+        self.assertConstantQueries(lambda: reverse("stock_movement_list"), self.movements, expected=4)
+        product_url = lambda: reverse("stock_movement_list") + f"?product={StockMovement.objects.first().product_id}"
+        self.assertConstantQueries(product_url, self.movements, expected=4)
+
+    def test_movement_export(self):
+        # session, user, rows (product and user joined)
+        self.assertConstantQueries(lambda: reverse("stock_movement_export"), self.movements, expected=3)
+
+
+class StockSnapshotTests(QueryCountMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        [cls.product] = make_products(1, stock_quantity=100)
+        cls.today = timezone.localdate()
+        # 108 five days ago, 98 after day -4, 103 after day -2, 100 after today
+        for days_ago, quantity in [(4, -10), (2, 5), (0, -3)]:
+            movement = StockMovement.objects.create(product=cls.product, quantity=quantity)
+            StockMovement.objects.filter(pk=movement.pk).update(
+                timestamp=timezone.now() - datetime.timedelta(days=days_ago)
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def day(self, days_ago):
+        return self.today - datetime.timedelta(days=days_ago)
+
+    def test_replays_back_from_current_stock_without_snapshots(self):
+        self.assertEqual(stock_on(self.day(5)), {self.product.pk: 108})
+        self.assertEqual(stock_on(self.day(3)), {self.product.pk: 98})
+        self.assertEqual(stock_on(self.today), {self.product.pk: 100})
+
+    def test_snapshots_fold_movements_forward(self):
+        take_snapshot(self.day(5))
+        self.assertEqual(snapshot_dates(self.day(1)), [self.day(n) for n in (4, 3, 2, 1)])
+        call_command("snapshot_stock", through=self.day(1).isoformat(), stdout=StringIO())
+        snapshots = dict(StockSnapshot.objects.filter(product=self.product).values_list("date", "quantity"))
+        self.assertEqual(snapshots, {self.day(5): 108, self.day(4): 98, self.day(3): 98, self.day(2): 103, self.day(1): 103})
+
+        # Past dates come from the snapshots, not from current stock
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=0)
+        self.assertEqual(stock_on(self.day(3)), {self.product.pk: 98})
+        self.assertEqual(stock_value_on(self.day(3)), {"units": 98, "value": 98})
+
+    def test_catalogue_import_between_snapshots(self):
+        take_snapshot(self.day(3))
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False, encoding="utf-8") as handle:
+            handle.write(f"sku,name,category,cost_price,selling_price,stock_quantity\n{self.product.sku},Ring,Rings,1,2,150\n")
+        self.addCleanup(os.unlink, handle.name)
+        call_command("import_catalog", "products", handle.name, stdout=StringIO(), stderr=StringIO())
+
+        call_command("snapshot_stock", through=self.today.isoformat(), stdout=StringIO())
+        self.assertEqual(StockSnapshot.objects.get(product=self.product, date=self.today).quantity, 150)
+        self.assertEqual(stock_on(self.day(3)), {self.product.pk: 98})
+
+    def test_sharded_stock_replays_from_its_slots(self):
+        split_stock(self.product.pk, 4)
+        with transaction.atomic():
+            apply_stock_deltas({self.product.pk: -7})
+        # The cached total still says 100 until the next sync
+        self.assertEqual(Product.objects.get(pk=self.product.pk).stock_quantity, 100)
+        self.assertEqual(stock_on(self.today), {self.product.pk: 93})
+        self.assertEqual(stock_on(self.day(3)), {self.product.pk: 98})
+        self.assertEqual(stock_value_on(self.today)["units"], 93)
+
+    def test_stock_on_hand_queries_do_not_grow(self):
+        take_snapshot(self.day(1))
+        grow = grow_to(make_products)
+        url = lambda: reverse("stock_on_hand") + f"?category=Rings&date={self.day(1)}"
+        # session, user, page count, page rows, then per stock_on / stock_value_on:
+        # latest snapshot date, snapshot rows, forward movements, products without
+        # a snapshot and their later movements
+        self.assertConstantQueries(url, grow, expected=14)
+
+        response = self.client.get(reverse("stock_on_hand_api"), {"sku": self.product.sku, "date": self.day(3)})
+        self.assertEqual(response.json()["products"], [{"id": self.product.pk, "sku": self.product.sku, "quantity": 98}])
+
+    def test_product_form_logs_stock_adjustment(self):
+        self.client.post(reverse("product_edit", args=[self.product.pk]), {
+            "sku": self.product.sku, "name": self.product.name, "category": "Rings",
+            "cost_price": "1", "selling_price": "2", "stock_quantity": "90",
+        })
+        self.assertEqual(StockMovement.objects.filter(product=self.product).order_by("-id").first().quantity, -10)
+        self.assertEqual(stock_on(self.day(3)), {self.product.pk: 98})
+
+
+class StockReservationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        [cls.customer] = make_customers(1)
+
+    def setUp(self):
+        [self.ring] = make_products(1, stock_quantity=1)
+        self.client.force_login(self.user)
+
+    def add_ring(self, order):
+        return self.client.post(
+            reverse("order_item_add", args=[order.pk]), {"product_id": self.ring.pk, "quantity": 1}, follow=True
+        )
+
+    def ring_levels(self):
+        return Product.objects.values_list("stock_quantity", "reserved_quantity").get(pk=self.ring.pk)
+
+    def test_last_unit_is_promised_once(self):
+        first, second = make_order(self.customer, self.user), make_order(self.customer, self.user)
+        self.add_ring(first)
+        response = self.add_ring(second)
+        self.assertContains(response, "Only 0 units available")
+        self.assertFalse(second.items.exists())
+        self.assertEqual(self.ring_levels(), (1, 1))
+
+        first.confirm()
+        self.assertEqual(self.ring_levels(), (0, 0))
+        self.assertFalse(StockReservation.objects.exists())
+
+    def test_product_form_cannot_drop_stock_below_holds(self):
+        self.add_ring(make_order(self.customer, self.user))
+        for split in (False, True):
+            if split:
+                split_stock(self.ring.pk, 2)
+            response = self.client.post(reverse("product_edit", args=[self.ring.pk]), {
+                "sku": self.ring.sku, "name": self.ring.name, "category": "Rings",
+                "cost_price": "1", "selling_price": "2", "stock_quantity": "0",
+            }, follow=True)
+            self.assertContains(response, "1 unit(s) are held for pending orders")
+            self.assertEqual(self.ring_levels(), (1, 1))
+            self.assertEqual(StockSlot.objects.filter(product=self.ring).count(), 2 if split else 0)
+        self.assertFalse(StockMovement.objects.filter(product=self.ring).exists())
+
+    def test_unreserved_order_cannot_take_held_stock(self):
+        holder, late = make_order(self.customer, self.user), make_order(self.customer, self.user)
+        self.add_ring(holder)
+        # a line added outside the reservation flow
+        late.items.create(product=self.ring, quantity=1, unit_price=2)
+        with self.assertRaises(ValueError):
+            late.confirm()
+        self.assertEqual(self.ring_levels(), (1, 1))
+
+    def test_removing_lines_and_canceling_release_stock(self):
+        order = make_order(self.customer, self.user)
+        self.add_ring(order)
+        item = order.items.get()
+        self.client.post(reverse("order_item_remove", args=[order.pk, item.pk]))
+        self.assertEqual(self.ring_levels(), (1, 0))
+
+        self.add_ring(order)
+        SalesOrder.objects.get(pk=order.pk).cancel()
+        self.assertEqual(self.ring_levels(), (1, 0))
+
+        order = make_order(self.customer, self.user)
+        self.add_ring(order)
+        order.delete()
+        self.assertEqual(self.ring_levels(), (1, 0))
+
+    def test_sweeper_releases_expired_reservations_in_batches(self):
+        orders = [make_order(self.customer, self.user) for _ in range(3)]
+        Product.objects.filter(pk=self.ring.pk).update(stock_quantity=3)
+        for order in orders:
+            reserve_stock(order.pk, {self.ring.pk: 1})
+        StockReservation.objects.filter(order=orders[2]).update(expires_at=timezone.now() + datetime.timedelta(hours=1))
+        StockReservation.objects.exclude(order=orders[2]).update(expires_at=timezone.now() - datetime.timedelta(minutes=1))
+
+        self.assertEqual(release_expired(batch_size=1), (2, 2))
+        self.assertEqual(self.ring_levels(), (3, 1))
+        out = StringIO()
+        call_command("release_expired_reservations", stdout=out)
+        self.assertIn("Released 0 expired reservation(s)", out.getvalue())
+
+    def test_product_edit_keeps_reservations(self):
+        order = make_order(self.customer, self.user)
+        stale = Product.objects.get(pk=self.ring.pk)
+        reserve_stock(order.pk, {self.ring.pk: 1})
+        stale.stock_quantity = 5
+        stale.save()
+        self.assertEqual(self.ring_levels(), (5, 1))
+
+
+class StockShardingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        [cls.customer] = make_customers(1)
+
+    def setUp(self):
+        [self.ring] = make_products(1, stock_quantity=10)
+        split_stock(self.ring.pk, 4)
+
+    def slots(self):
+        return list(self.ring.stock_slots.order_by("slot").values_list("quantity", flat=True))
+
+    def test_split_and_merge_keep_stock(self):
+        self.assertEqual(self.slots(), [3, 3, 2, 2])
+        self.assertEqual(split_stock(self.ring.pk, 2), 10)
+        self.assertEqual(self.slots(), [5, 5])
+        self.assertEqual(merge_stock(self.ring.pk), 10)
+        self.assertFalse(StockSlot.objects.exists())
+        with self.assertRaises(ValueError):
+            split_stock(self.ring.pk, 1)
+
+    def test_deductions_update_slots_until_synced(self):
+        apply_stock_deltas({self.ring.pk: -2})
+        self.assertEqual(sum(self.slots()), 8)
+        self.assertEqual(Product.objects.get(pk=self.ring.pk).stock_quantity, 10)
+
+        # no single slot holds 7, so the slots are drained in turn
+        apply_stock_deltas({self.ring.pk: -7})
+        self.assertEqual(sum(self.slots()), 1)
+        with self.assertRaisesMessage(ValueError, "Available: 1, Required: 2"):
+            apply_stock_deltas({self.ring.pk: -2})
+
+        self.assertEqual(sync_stock_totals(), 1)
+        self.assertEqual(Product.objects.get(pk=self.ring.pk).stock_quantity, 1)
+        self.assertEqual(sync_stock_totals(), 0)
+
+    def held(self):
+        return sum(self.ring.stock_slots.values_list("reserved", flat=True))
+
+    def test_reservations_are_held_in_slots(self):
+        holder, late = make_order(self.customer, self.user), make_order(self.customer, self.user)
+        # the cached total lags behind the slots
+        Product.objects.filter(pk=self.ring.pk).update(stock_quantity=50)
+        with self.assertRaisesMessage(ValueError, "Only 10 units available"), transaction.atomic():
+            reserve_stock(holder.pk, {self.ring.pk: 11})
+        reserve_stock(holder.pk, {self.ring.pk: 8})
+        self.assertEqual(self.held(), 8)
+        self.assertEqual(Product.objects.values_list("reserved_quantity", flat=True).get(pk=self.ring.pk), 0)
+
+        late.items.create(product=self.ring, quantity=3, unit_price=2)
+        with self.assertRaisesMessage(ValueError, "Available: 2, Required: 3"):
+            late.confirm()
+        holder.items.create(product=self.ring, quantity=8, unit_price=2)
+        holder.confirm()
+        self.assertEqual((sum(self.slots()), self.held()), (2, 0))
+        self.assertFalse(StockReservation.objects.exists())
+
+        sync_stock_totals()
+        self.assertEqual(Product.objects.values_list("stock_quantity", "reserved_quantity").get(pk=self.ring.pk), (2, 0))
+
+    def test_holds_survive_split_merge_and_release(self):
+        order = make_order(self.customer, self.user)
+        reserve_stock(order.pk, {self.ring.pk: 5})
+        split_stock(self.ring.pk, 3)
+        self.assertEqual(list(self.ring.stock_slots.order_by("slot").values_list("quantity", "reserved")),
+                         [(4, 2), (3, 2), (3, 1)])
+        order.cancel()
+        self.assertEqual(self.held(), 0)
+
+        other = make_order(self.customer, self.user)
+        reserve_stock(other.pk, {self.ring.pk: 4})
+        merge_stock(self.ring.pk)
+        self.assertEqual(Product.objects.values_list("stock_quantity", "reserved_quantity").get(pk=self.ring.pk), (10, 4))
+
+    def test_batch_confirm_uses_slot_stock(self):
+        first, second, late = [make_order(self.customer, self.user) for _ in range(3)]
+        add_order_items(first, [(self.ring.sku, 4)])
+        add_order_items(second, [(self.ring.sku, 4)])
+        # a line added outside the reservation flow
+        late.items.create(product=self.ring, quantity=3, unit_price=2)
+
+        results = confirm_orders([first.pk, second.pk, late.pk])
+        self.assertEqual((results[first.pk], results[second.pk]), (None, None))
+        self.assertIn("Available: 2, Required: 3", results[late.pk])
+        self.assertEqual((sum(self.slots()), self.held()), (2, 0))
+
+    def test_product_edit_respreads_slots(self):
+        apply_stock_deltas({self.ring.pk: -4})
+        self.client.force_login(self.user)
+        self.client.post(reverse("product_edit", args=[self.ring.pk]), {
+            "sku": self.ring.sku, "name": self.ring.name, "category": self.ring.category,
+            "cost_price": 1, "selling_price": 2, "stock_quantity": 20,
+        })
+        self.assertEqual(self.slots(), [5, 5, 5, 5])
+        self.assertEqual(StockMovement.objects.filter(product=self.ring).values_list("quantity", flat=True).first(), 14)
 
-# Create your tests here.
+    def test_shard_stock_command(self):
+        out = StringIO()
+        call_command("shard_stock", stdout=out)
+        self.assertIn(f"{self.ring.sku}: 4 slots, 10 in stock", out.getvalue())
+        call_command("shard_stock", self.ring.sku, merge=True, stdout=out)
+        self.assertFalse(StockSlot.objects.exists())
+        call_command("shard_stock", self.ring.sku, slots=8, stdout=out)
+        self.assertEqual(StockSlot.objects.count(), 8)
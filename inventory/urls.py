@@ -4,4 +4,7 @@ from . import views
 
 urlpatterns = [
     path('movements/', views.stock_movement_list, name='stock_movement_list'),
+    path('movements/export/', views.stock_movement_export, name='stock_movement_export'),
+    path('stock-on-hand/', views.stock_on_hand, name='stock_on_hand'),
+    path('stock-on-hand/api/', views.stock_on_hand_api, name='stock_on_hand_api'),
 ]
@@ -1,7 +1,23 @@
+from django.http import JsonResponse
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from core.exports import export_response
+from core.pagination import paginate
+from products.models import Product
 from .models import StockMovement
+from .snapshots import stock_on, stock_value_on
+
+
+def filter_movements(request, movements):
+    """
+    Apply the stock movement filters from the query string.
+    """
+    product = request.GET.get('product')
+    if product and product.isdigit():
+        movements = movements.filter(product_id=product)
+    return movements
 
 
 @login_required
@@ -9,8 +25,73 @@ def stock_movement_list(request):
     """
     Display a list of all stock movements.
     """
-    movements = StockMovement.objects.all()
-    paginator = Paginator(movements, 10)  # Show 10 movements per page
-    page_number = request.GET.get('page')
-    movements = paginator.get_page(page_number)
+    movements = filter_movements(request, StockMovement.objects.select_related('product', 'created_by'))
+    movements = paginate(request, movements, 10, ('-timestamp', '-id'))  # Show 10 movements per page
     return render(request, "inventory/stock_movement_log_list.html", {"movements": movements})
+
+
+
+@login_required
+def stock_movement_export(request):
+    """
+    Export the (filtered) stock movement log as CSV or XLSX.
+    """
+    columns = [
+        ("Date/Time", "timestamp"),
+        ("SKU", "product__sku"),
+        ("Product", "product__name"),
+        ("Quantity", "quantity"),
+        ("User", "created_by__username"),
+    ]
+    movements = filter_movements(request, StockMovement.objects.order_by('-timestamp', '-id'))
+    return export_response(request, "stock_movements", columns, movements)
+
+
+def stock_on_hand_filters(request):
+    """
+    Date (default today) and products selected by ?date=, ?sku= and ?category=.
+    """
+    date = parse_date(request.GET.get('date') or '') or timezone.localdate()
+    products = Product.objects.all()
+    sku = request.GET.get('sku', '').strip()
+    if sku:
+        products = products.filter(sku=sku)
+    category = request.GET.get('category', '').strip()
+    if category:
+        products = products.filter(category=category)
+    return date, products
+
+
+@login_required
+def stock_on_hand(request):
+    """
+    Stock on hand at the end of a past date for a product or category,
+    from the latest snapshot plus the movements after it.
+    """
+    date, products = stock_on_hand_filters(request)
+    page = paginate(request, products, 25, ('name', 'id'))
+    quantities = stock_on(date, Product.objects.filter(pk__in=[product.pk for product in page]))
+    for product in page:
+        product.quantity_on_date = quantities.get(product.pk, 0)
+    return render(request, "inventory/stock_on_hand.html", {
+        "date": date,
+        "products": page,
+        "totals": stock_value_on(date, products),
+    })
+
+
+@login_required
+def stock_on_hand_api(request):
+    """
+    JSON stock on hand at the end of ?date= for ?sku= or ?category=.
+    """
+    date, products = stock_on_hand_filters(request)
+    if not request.GET.get('sku') and not request.GET.get('category'):
+        return JsonResponse({"error": "Pass a sku or a category"}, status=400)
+    quantities = stock_on(date, products)
+    skus = dict(products.values_list('pk', 'sku'))
+    return JsonResponse({
+        "date": date.isoformat(),
+        "products": [{"id": pk, "sku": skus[pk], "quantity": quantity} for pk, quantity in quantities.items()],
+        "total_quantity": sum(quantities.values()),
+    })
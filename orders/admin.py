@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import SalesOrder, SalesOrderItem
+from .models import OrderNumberSequence, SalesOrder, SalesOrderItem
 
 
 @admin.register(SalesOrder)
@@ -7,7 +7,15 @@ class SalesOrderAdmin(admin.ModelAdmin):
     list_display = ("order_number", "customer", "order_date", "status", "total_amount", "created_by")
     list_filter = ("status", "order_date")
     search_fields = ("order_number", "customer__name", "customer__customer_id")
-    readonly_fields = ("order_number", "total_amount", "order_date")
+    # Status changes go through SalesOrder.confirm() / cancel() so stock follows
+    readonly_fields = ("order_number", "total_amount", "order_date", "status")
+    list_select_related = ("customer", "created_by")
+
+    def get_readonly_fields(self, request, obj=None):
+        # Confirmed orders stay with the customer whose ledger they were charged to
+        if obj is not None and obj.status != SalesOrder.PENDING:
+            return self.readonly_fields + ("customer",)
+        return self.readonly_fields
 
 
 
@@ -15,4 +23,11 @@ class SalesOrderAdmin(admin.ModelAdmin):
 class SalesOrderItemAdmin(admin.ModelAdmin):
     list_display = ("sales_order", "product", "quantity", "unit_price", "total_price")
     search_fields = ("sales_order__order_number", "product__name")
-    readonly_fields = ("total_price",)
\ No newline at end of file
+    readonly_fields = ("total_price",)
+    list_select_related = ("sales_order", "product")
+
+
+@admin.register(OrderNumberSequence)
+class OrderNumberSequenceAdmin(admin.ModelAdmin):
+    list_display = ("prefix", "last_value")
+    search_fields = ("prefix",)
\ No newline at end of file
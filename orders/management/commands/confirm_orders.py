@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from orders.models import SalesOrder
+from orders.services import CONFIRM_BATCH_SIZE, confirm_orders
+
+
+class Command(BaseCommand):
+    help = 'Confirm pending orders in batches, by order number or by order date'
+
+    def add_arguments(self, parser):
+        parser.add_argument('order_numbers', nargs='*', help='Order numbers to confirm')
+        parser.add_argument('--date', help='Confirm every pending order dated YYYY-MM-DD')
+        parser.add_argument('--batch-size', type=int, default=CONFIRM_BATCH_SIZE, help='Orders confirmed per transaction')
+        parser.add_argument('--user', help='Username recorded on the stock movements')
+
+    def handle(self, *args, **options):
+        orders = SalesOrder.objects.filter(status=SalesOrder.PENDING)
+        if options['order_numbers']:
+            orders = SalesOrder.objects.filter(order_number__in=options['order_numbers'])
+        elif options['date']:
+            date = parse_date(options['date'])
+            if date is None:
+                raise CommandError(f"Invalid date: {options['date']}")
+            orders = orders.filter(order_date=date)
+        else:
+            raise CommandError('Give order numbers or --date')
+
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Unknown user: {options['user']}")
+
+        numbers = dict(orders.order_by().values_list('pk', 'order_number'))
+        missing = set(options['order_numbers']) - set(numbers.values())
+        for number in sorted(missing):
+            self.stdout.write(self.style.WARNING(f'{number}: not found'))
+
+        results = confirm_orders(numbers, user=user, batch_size=options['batch_size'])
+        failed = {pk: reason for pk, reason in results.items() if reason}
+        for pk, reason in failed.items():
+            self.stdout.write(self.style.WARNING(f'{numbers[pk]}: {reason}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Confirmed {len(results) - len(failed)} order(s), {len(failed) + len(missing)} not confirmed'
+        ))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from orders.models import SalesOrder
+
+
+class Command(BaseCommand):
+    help = 'Check every order total against the sum of its items and repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Orders checked per query')
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without repairing it')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+        expected_total = SalesOrder.items_total()
+
+        checked = drifted = 0
+        last_pk = 0
+        while True:
+            # Keyset over the primary key so each batch is an index range read
+            batch = list(
+                SalesOrder.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .annotate(expected=expected_total)
+                .values_list('pk', 'total_amount', 'expected')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            checked += len(batch)
+
+            wrong = [(pk, stored, expected) for pk, stored, expected in batch if stored != expected]
+            for pk, stored, expected in wrong:
+                self.stdout.write(self.style.WARNING(f'Order #{pk}: stored {stored}, items sum to {expected}'))
+            if wrong and not dry_run:
+                SalesOrder.objects.filter(pk__in=[pk for pk, _, _ in wrong]).update(total_amount=expected_total)
+            drifted += len(wrong)
+
+        action = 'found' if dry_run else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} orders, {action} {drifted} with drifted totals'))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0002_alter_salesorder_total_amount_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderNumberSequence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("prefix", models.CharField(max_length=50, unique=True)),
+                ("last_value", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "verbose_name": "Order Number Sequence",
+                "verbose_name_plural": "Order Number Sequences",
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:54
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customers", "0002_hot_path_indexes"),
+        ("orders", "0003_ordernumbersequence"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="salesorder",
+            options={
+                "ordering": ["-order_date", "-id"],
+                "verbose_name": "Sales Order",
+                "verbose_name_plural": "Sales Orders",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="salesorder",
+            index=models.Index(
+                fields=["-order_date", "-id"],
+                include=("order_number", "customer", "status", "total_amount"),
+                name="salesorder_date_id_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="salesorder",
+            index=models.Index(
+                fields=["status", "-order_date"], name="salesorder_status_date_idx"
+            ),
+        ),
+    ]
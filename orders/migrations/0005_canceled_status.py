@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:33
+
+from django.db import migrations
+
+
+def fix_canceled_status(apps, schema_editor):
+    """
+    The cancel view used to store 'cancelled', which is not one of the
+    status choices ('canceled').
+    """
+    SalesOrder = apps.get_model("orders", "SalesOrder")
+    SalesOrder.objects.filter(status="cancelled").update(status="canceled")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0004_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(fix_canceled_status, migrations.RunPython.noop),
+    ]
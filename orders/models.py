@@ -1,11 +1,123 @@
+import threading
+
 from django.utils import timezone
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.core.validators import MinValueValidator
 
 
+class OrderNumberSequence(models.Model):
+    """
+    One counter row per order number prefix (e.g. SO-20251210).
+    """
+    prefix = models.CharField(max_length=50, unique=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    # Per-process cache of pre-allocated blocks: prefix -> [next_value, last_value]
+    _blocks = {}
+    _blocks_lock = threading.Lock()
+
+
+    def __str__(self):
+        return f"{self.prefix} ({self.last_value})"
+
+
+    class Meta:
+        verbose_name = 'Order Number Sequence'
+        verbose_name_plural = 'Order Number Sequences'
+
+    @classmethod
+    def next_value(cls, prefix):
+        """
+        Return the next sequence number for a prefix.
+        With ORDER_NUMBER_BLOCK_SIZE > 1 each process reserves a block of numbers
+        in one UPDATE and hands them out from memory (numbers stay unique, but
+        may interleave between processes and leave gaps on restart).
+        A block is only kept once its reservation has committed: a rolled back
+        reservation frees the numbers for other processes, so this one must
+        not hand them out again.
+        """
+        block_size = max(1, getattr(settings, 'ORDER_NUMBER_BLOCK_SIZE', 1))
+        if block_size == 1:
+            return cls.reserve_block(prefix, 1)[0]
+        # The lock only guards the cached blocks: the reservation below may
+        # keep the sequence row locked until an outer transaction commits
+        with cls._blocks_lock:
+            block = cls._blocks.get(prefix)
+            if block is not None and block[0] <= block[1]:
+                block[0] += 1
+                return block[0] - 1
+
+        in_transaction = transaction.get_connection().in_atomic_block
+        # Outside a transaction the block commits on its own
+        with transaction.atomic(durable=not in_transaction):
+            first, last = cls.reserve_block(prefix, block_size)
+        block = [first + 1, last]
+        if in_transaction:
+            transaction.on_commit(lambda: cls._keep_block(prefix, block))
+        else:
+            cls._keep_block(prefix, block)
+        return first
+
+    @classmethod
+    def _keep_block(cls, prefix, block):
+        with cls._blocks_lock:
+            # Only the current day's prefix is ever needed again
+            cls._blocks = {prefix: block}
+
+    @classmethod
+    def reserve_block(cls, prefix, size):
+        """
+        Atomically advance the counter by `size` and return the reserved (first, last) range.
+        """
+        with transaction.atomic():
+            updated = cls.objects.filter(prefix=prefix).update(last_value=F('last_value') + size)
+            if not updated:
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(prefix=prefix, last_value=cls._legacy_last_value(prefix) + size)
+                except IntegrityError:
+                    # Another worker created the row first
+                    cls.objects.filter(prefix=prefix).update(last_value=F('last_value') + size)
+            last = cls.objects.filter(prefix=prefix).values_list('last_value', flat=True).get()
+        return last - size + 1, last
+
+    @staticmethod
+    def _legacy_last_value(prefix):
+        """
+        Seed a new counter from orders numbered before the sequence row existed.
+        Runs once per prefix.
+        """
+        last_number = (
+            SalesOrder.objects.filter(order_number__startswith=f'{prefix}-')
+            .order_by('-order_number')
+            .values_list('order_number', flat=True)
+            .first()
+        )
+        return int(last_number.split('-')[-1]) if last_number else 0
+
+
+
+class InvalidTransition(ValueError):
+    """
+    The order is not (or no longer) in a status the requested transition starts from.
+    """
+
 
 class SalesOrder(models.Model):
+    PENDING = 'pending'
+    CONFIRMED = 'confirmed'
+    CANCELED = 'canceled'
+
+    # status -> statuses it may move to
+    TRANSITIONS = {
+        PENDING: {CONFIRMED, CANCELED},
+        CONFIRMED: {CANCELED},
+        CANCELED: set(),
+    }
+
     order_number = models.CharField(max_length=100, unique=True)
     customer = models.ForeignKey('customers.Customer', on_delete=models.CASCADE)
     order_date = models.DateField(auto_now_add=True)
@@ -17,11 +129,12 @@ class SalesOrder(models.Model):
         decimal_places=2,
         validators=[MinValueValidator(0.00)]
     )
+    # Changed only through confirm() / cancel()
     status = models.CharField(max_length=50, choices=[
-        ('pending', 'Pending'),
-        ('confirmed', 'Confirmed'),
-        ('canceled', 'Canceled')
-    ], default='pending')
+        (PENDING, 'Pending'),
+        (CONFIRMED, 'Confirmed'),
+        (CANCELED, 'Canceled')
+    ], default=PENDING)
 
 
     def __str__(self):
@@ -29,26 +142,110 @@ class SalesOrder(models.Model):
 
 
     class Meta:
-        ordering = ['-order_date']
+        ordering = ['-order_date', '-id']
         verbose_name = 'Sales Order'
         verbose_name_plural = 'Sales Orders'
+        indexes = [
+            # Order list and "orders today": covering on PostgreSQL so the list
+            # page is served from the index (non-key columns are ignored on SQLite)
+            models.Index(
+                fields=['-order_date', '-id'],
+                include=['order_number', 'customer', 'status', 'total_amount'],
+                name='salesorder_date_id_idx',
+            ),
+            models.Index(fields=['status', '-order_date'], name='salesorder_status_date_idx'),
+        ]
     
     def save(self, *args, **kwargs):
         """
         Auto-generate order number if not provided.
         """
         if not self.order_number:
-            today = timezone.now().strftime("%Y%m%d")
-            last_order = SalesOrder.objects.filter(order_number__startswith=f'SO-{today}').order_by('order_number').last()
+            prefix = f'SO-{timezone.now().strftime("%Y%m%d")}'
+            new_sequence = OrderNumberSequence.next_value(prefix)
+            self.order_number = f'{prefix}-{new_sequence:04d}'
+        super().save(*args, **kwargs)
 
-            if last_order:
-                last_sequence = int(last_order.order_number.split('-')[-1])
-                new_sequence = last_sequence + 1
-            else:
-                new_sequence = 1
+    def confirm(self):
+        """
+        Pending -> confirmed, deducting stock for every line.
+        """
+        self.transition(self.CONFIRMED)
+
+    def cancel(self):
+        """
+        Pending or confirmed -> canceled, restoring stock taken by a confirmation.
+        """
+        self.transition(self.CANCELED)
+
+    def transition(self, new_status):
+        """
+        Move the order to `new_status` with a compare-and-swap UPDATE on the
+        status this instance holds, then apply the stock side effects and send
+        order_status_changed in the same transaction. A concurrent transition
+        makes the UPDATE match no row, so an order can never be confirmed (or
+        restocked) twice. Leaving pending releases the order's stock
+        reservations, or on confirmation uses them up. Raises
+        InvalidTransition, or ValueError for missing stock; either way
+        nothing is changed.
+        """
+        from inventory.reservations import consume_reservations, release_reservations
+        from inventory.services import deduct_order_stock, restore_order_stock
+        from .signals import order_status_changed
+
+        old_status = self.status
+        if new_status not in self.TRANSITIONS.get(old_status, ()):
+            raise InvalidTransition(f"Order {self.order_number} cannot go from {old_status} to {new_status}.")
+
+        with transaction.atomic():
+            if not SalesOrder.objects.filter(pk=self.pk, status=old_status).update(status=new_status):
+                raise InvalidTransition(f"Order {self.order_number} is no longer {old_status}.")
+            # Line edits move the total with F() updates; listeners need the stored one
+            self.total_amount = SalesOrder.objects.values_list('total_amount', flat=True).get(pk=self.pk)
+            if new_status == self.CONFIRMED:
+                deduct_order_stock(self, held=consume_reservations([self.pk]))
+            elif old_status == self.PENDING:
+                release_reservations([self.pk])
+            elif old_status == self.CONFIRMED:
+                restore_order_stock(self)
+            self.status = new_status
+            order_status_changed.send(sender=SalesOrder, orders=[self], old_status=old_status, new_status=new_status)
+
+    @classmethod
+    def lock_pending(cls, order_id):
+        """
+        Lock a pending order's row before its lines change. Line edits take
+        the order row first and the product rows after it, like transition()
+        and batch confirmation, so they queue behind a concurrent confirm
+        instead of deadlocking with it. Raises InvalidTransition if the order
+        is no longer pending.
+        """
+        if cls.objects.select_for_update().filter(pk=order_id, status=cls.PENDING).values_list('pk').first() is None:
+            raise InvalidTransition("Cannot modify items of a confirmed or canceled order.")
+
+    @staticmethod
+    def adjust_total(order_id, delta):
+        """
+        Add `delta` to an order's total_amount with a single F() UPDATE.
+        """
+        if delta:
+            SalesOrder.objects.filter(pk=order_id).update(total_amount=F('total_amount') + delta)
+
+    @staticmethod
+    def items_total():
+        """
+        Expression for the sum of an order's item totals (0 without items).
+        """
+        item_totals = (
+            SalesOrderItem.objects.filter(sales_order=OuterRef('pk'))
+            .order_by()
+            .values('sales_order')
+            .annotate(total=Sum('total_price'))
+            .values('total')
+        )
+        output_field = models.DecimalField(max_digits=10, decimal_places=2)
+        return Coalesce(Subquery(item_totals), Value(0), output_field=output_field)
 
-            self.order_number = f'SO-{today}-{new_sequence:04d}'
-        super().save(*args, **kwargs)
 
 class SalesOrderItem(models.Model):
     sales_order = models.ForeignKey(SalesOrder, related_name='items', on_delete=models.CASCADE)
@@ -77,6 +274,34 @@ class SalesOrderItem(models.Model):
         verbose_name_plural = 'Sales Order Items'
 
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # What this line currently contributes to its order's total
+        instance._stored_line = (instance.__dict__.get('sales_order_id'), instance.__dict__.get('total_price'))
+        return instance
+
     def save(self, *args, **kwargs):
+        """
+        Save the line and apply the change in its price to the order total
+        as an F() delta in the same transaction.
+        """
         self.total_price = self.quantity * self.unit_price
-        super().save(*args, **kwargs) 
\ No newline at end of file
+        old_order_id, old_total = getattr(self, '_stored_line', (None, None))
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_order_id is not None and old_total is not None:
+                if old_order_id == self.sales_order_id:
+                    SalesOrder.adjust_total(self.sales_order_id, self.total_price - old_total)
+                    self._stored_line = (self.sales_order_id, self.total_price)
+                    return
+                SalesOrder.adjust_total(old_order_id, -old_total)
+            SalesOrder.adjust_total(self.sales_order_id, self.total_price)
+        self._stored_line = (self.sales_order_id, self.total_price)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            SalesOrder.adjust_total(self.sales_order_id, -self.total_price)
+        self._stored_line = (None, None)
+        return result 
\ No newline at end of file
@@ -0,0 +1,205 @@
+from django.db import transaction
+from django.db.models import Sum
+
+from inventory.reservations import consume_reservations, held_quantities, reserve_stock
+from inventory.services import UPDATE_BATCH_SIZE, apply_stock_deltas
+from inventory.sharding import is_sharded, lock_free_stock, sharded_products
+from products.models import Product
+from .models import SalesOrder, SalesOrderItem
+from .signals import order_status_changed
+
+
+# Upper bound on lines per bulk request, keeps the SKU IN (...) list reasonable
+MAX_BULK_LINES = 500
+# Orders confirmed per transaction by confirm_orders()
+CONFIRM_BATCH_SIZE = 500
+
+
+def parse_bulk_lines(text):
+    """
+    Parse "SKU, quantity" lines (comma, tab or space separated) into [(sku, quantity)].
+    Raises ValueError listing every malformed line.
+    """
+    lines, errors = [], []
+    for number, raw in enumerate(text.splitlines(), start=1):
+        raw = raw.strip()
+        if not raw:
+            continue
+        parts = raw.replace(',', ' ').replace('\t', ' ').split()
+        if len(parts) != 2:
+            errors.append(f"Line {number}: expected 'SKU, quantity'")
+            continue
+        sku, quantity = parts
+        try:
+            quantity = int(quantity)
+        except ValueError:
+            errors.append(f"Line {number}: invalid quantity '{quantity}'")
+            continue
+        if quantity <= 0:
+            errors.append(f"Line {number}: quantity must be greater than zero")
+            continue
+        lines.append((sku, quantity))
+
+    if errors:
+        raise ValueError("; ".join(errors))
+    if not lines:
+        raise ValueError("Please enter at least one line")
+    if len(lines) > MAX_BULK_LINES:
+        raise ValueError(f"At most {MAX_BULK_LINES} lines can be added at once")
+    return lines
+
+
+def add_order_items(order, lines):
+    """
+    Add many (sku, quantity) lines to a pending order.
+
+    Products and available stock are checked with one query, the stock is
+    reserved for the order, the items are inserted with one bulk_create and
+    the order total is moved by their sum in one UPDATE.
+    Returns the created items; raises ValueError if any line is invalid.
+    """
+    requested = {}
+    for sku, quantity in lines:
+        requested[sku] = requested.get(sku, 0) + quantity
+
+    products = {
+        product.sku: product
+        for product in Product.objects.filter(sku__in=requested).only(
+            'id', 'sku', 'name', 'selling_price', 'stock_quantity', 'reserved_quantity'
+        ).annotate(sharded=is_sharded())
+    }
+    errors = []
+    for sku, quantity in requested.items():
+        product = products.get(sku)
+        if product is None:
+            errors.append(f"Unknown SKU {sku}")
+        # Sharded products' cached levels may lag; reserve_stock checks their slots
+        elif not product.sharded and product.available_quantity < quantity:
+            errors.append(
+                f"Insufficient stock for {product.name}. Only {product.available_quantity} units available."
+            )
+    if errors:
+        raise ValueError("; ".join(errors))
+
+    items = []
+    for sku, quantity in lines:
+        product = products[sku]
+        items.append(SalesOrderItem(
+            sales_order=order,
+            product=product,
+            quantity=quantity,
+            unit_price=product.selling_price,
+            total_price=quantity * product.selling_price,  # bulk_create skips save()
+        ))
+
+    with transaction.atomic():
+        SalesOrder.lock_pending(order.pk)
+        # Re-checked under the product locks
+        reserve_stock(order.pk, {products[sku].pk: quantity for sku, quantity in requested.items()})
+        SalesOrderItem.objects.bulk_create(items)
+        SalesOrder.adjust_total(order.pk, sum(item.total_price for item in items))
+    return items
+
+
+def confirm_orders(order_ids, user=None, batch_size=CONFIRM_BATCH_SIZE):
+    """
+    Confirm many pending orders, `batch_size` orders per transaction.
+    Returns {order_id: None if confirmed, else why it was not}.
+
+    Each batch locks its orders and then the union of their products, both
+    in primary-key order like a single confirm(), so batches and single
+    confirmations queue behind each other instead of deadlocking. An order
+    may use its own reservations plus stock no other order holds. Stock is
+    moved once per product for the whole batch; its movements are logged
+    under `user`.
+    """
+    results = {}
+    order_ids = sorted(set(order_ids))
+    for start in range(0, len(order_ids), batch_size):
+        batch = order_ids[start:start + batch_size]
+        try:
+            results.update(_confirm_batch(batch, user))
+        except ValueError as e:
+            results.update({pk: str(e) for pk in batch})
+    return results
+
+
+def _confirm_batch(order_ids, user):
+    results = {pk: "Order not found." for pk in order_ids}
+    with transaction.atomic():
+        orders = list(SalesOrder.objects.select_for_update().filter(pk__in=order_ids).order_by('pk'))
+        pending = [order.pk for order in orders if order.status == SalesOrder.PENDING]
+
+        lines = {}
+        rows = (
+            SalesOrderItem.objects.filter(sales_order_id__in=pending)
+            .order_by()
+            .values('sales_order_id', 'product_id')
+            .annotate(total=Sum('quantity'))
+            .values_list('sales_order_id', 'product_id', 'total')
+        )
+        for order_id, product_id, quantity in rows:
+            lines.setdefault(order_id, {})[product_id] = quantity
+
+        product_ids = sorted({pk for quantities in lines.values() for pk in quantities})
+        sharded = sharded_products(product_ids)
+        plain = [pk for pk in product_ids if pk not in sharded]
+        products = {}
+        for start in range(0, len(plain), UPDATE_BATCH_SIZE):
+            products.update(
+                (product.pk, product)
+                for product in Product.objects.select_for_update()
+                .filter(pk__in=plain[start:start + UPDATE_BATCH_SIZE])
+                .order_by('pk')
+                .only('id', 'name', 'stock_quantity', 'reserved_quantity')
+                .annotate(sharded=is_sharded())
+            )
+        if any(product.sharded for product in products.values()):
+            raise ValueError("Stock changed while the orders were being confirmed. Please try again.")
+        available = {pk: product.stock_quantity - product.reserved_quantity for pk, product in products.items()}
+        if sharded:
+            # Their stock lives in the slots, locked instead of the Product rows
+            available.update(lock_free_stock(sorted(sharded)))
+            products.update(Product.objects.only('id', 'name').in_bulk(sharded))
+        held = held_quantities(pending)
+
+        # Accept orders in pk order while the locked stock covers them
+        deltas, confirmed = {}, []
+        for order in orders:
+            quantities = lines.get(order.pk)
+            own = held.get(order.pk, {})
+            short = [
+                pk for pk, quantity in (quantities or {}).items() if available[pk] + own.get(pk, 0) < quantity
+            ]
+            if order.status != SalesOrder.PENDING:
+                results[order.pk] = f"Order {order.order_number} is {order.status}, not pending."
+            elif not quantities:
+                results[order.pk] = f"Order {order.order_number} has no items."
+            elif short:
+                results[order.pk] = (
+                    f"Insufficient stock for {products[short[0]].name}. "
+                    f"Available: {max(available[short[0]] + own.get(short[0], 0), 0)}, "
+                    f"Required: {quantities[short[0]]}"
+                )
+            else:
+                for pk, quantity in quantities.items():
+                    available[pk] -= quantity - own.get(pk, 0)
+                    deltas[pk] = deltas.get(pk, 0) - quantity
+                confirmed.append(order)
+        if not confirmed:
+            return results
+
+        updated = SalesOrder.objects.filter(
+            pk__in=[order.pk for order in confirmed], status=SalesOrder.PENDING
+        ).update(status=SalesOrder.CONFIRMED)
+        if updated != len(confirmed):
+            raise ValueError("Orders changed while they were being confirmed. Please try again.")
+        used = consume_reservations([order.pk for order in confirmed if order.pk in held])
+        apply_stock_deltas(deltas, created_by_id=user.pk if user else None, held=used)
+        for order in confirmed:
+            order.status = SalesOrder.CONFIRMED
+            results[order.pk] = None
+        order_status_changed.send(
+            sender=SalesOrder, orders=confirmed, old_status=SalesOrder.PENDING, new_status=SalesOrder.CONFIRMED
+        )
+    return results
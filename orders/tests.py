@@ -1,3 +1,382 @@
-from django.test import TestCase
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from customers.models import Customer
+from products.models import Product
+from core.testing import QueryCountMixin, grow_to, make_customers, make_order, make_products, make_user
+from inventory.models import StockMovement
+from .models import InvalidTransition, OrderNumberSequence, SalesOrder, SalesOrderItem
+from .services import add_order_items, confirm_orders
+
+
+class OrderViewQueryCountTests(QueryCountMixin, TestCase):
+    """
+    Page query counts must not grow with the number of rows rendered.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        [cls.customer] = make_customers(1)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.orders = grow_to(lambda count: [make_order(self.customer, self.user) for _ in range(count)])
+        self.order = make_order(self.customer, self.user)
+
+    def add_lines(self, count):
+        return [
+            SalesOrderItem.objects.create(sales_order=self.order, product=product, quantity=1, unit_price=2)
+            for product in make_products(count)
+        ]
+
+    def test_order_list(self):
+        # session, user, page count, page rows (customer joined)
+        self.assertConstantQueries(lambda: reverse("order_list"), self.orders, expected=4)
+        self.assertConstantQueries(lambda: reverse("order_list") + "?status=pending", self.orders, expected=4)
+
+    def test_order_detail(self):
+        # session, user, order (customer and creator joined), items (products joined)
+        self.assertConstantQueries(lambda: reverse("order_detail", args=[self.order.pk]), grow_to(self.add_lines), expected=4)
+
+    def test_order_forms(self):
+        # Customers are picked through the lookup endpoint, not rendered into the page
+        customers = grow_to(make_customers)
+        # session, user
+        self.assertConstantQueries(lambda: reverse("order_create"), customers, expected=2)
+        # session, user, order (customer joined)
+        self.assertConstantQueries(lambda: reverse("order_edit", args=[self.order.pk]), customers, expected=3)
+
+    def test_order_item_forms(self):
+        # session, user, order (products are picked through the lookup endpoint)
+        self.assertConstantQueries(
+            lambda: reverse("order_item_add", args=[self.order.pk]), grow_to(make_products), expected=3
+        )
+        self.assertConstantQueries(
+            lambda: reverse("order_items_bulk_add", args=[self.order.pk]), grow_to(make_products), expected=3
+        )
+
+    def test_order_export(self):
+        # session, user, rows (customer and creator joined)
+        self.assertConstantQueries(lambda: reverse("order_export"), self.orders, expected=3)
+
+    def test_bulk_add_does_not_scale_with_lines(self):
+        orders = []
+
+        def new_order(size):
+            orders.append(make_order(self.customer, self.user))
+            self.lines = "\n".join(f"{product.sku}, 1" for product in make_products(size))
+
+        self.assertConstantQueries(
+            lambda: reverse("order_items_bulk_add", args=[orders[-1].pk]), new_order, expected=14,
+            method="post", data=lambda: {"lines": self.lines}, status=302,
+        )
+
+    def test_confirm_and_cancel_do_not_scale_with_lines(self):
+        orders = []
+
+        def new_order(size):
+            orders.append(make_order(self.customer, self.user, lines=size))
+
+        def confirmed_order(size):
+            new_order(size)
+            orders[-1].confirm()
+
+        url = lambda action: lambda: reverse(action, args=[orders[-1].pk])
+        self.assertConstantQueries(url("order_confirm"), new_order, expected=28, method="post", status=302)
+        self.assertConstantQueries(url("order_cancel"), confirmed_order, expected=26, method="post", status=302)
+
+
+class BulkOrderItemTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("admin", password="password", role=User.Roles.ADMIN)
+        cls.customer = Customer.objects.create(
+            customer_id="C001", name="Customer", phone="0100", address="Cairo", email="c@example.com"
+        )
+        cls.products = [
+            Product.objects.create(
+                sku=f"SKU{i:03d}", name=f"Product {i}", category="Rings",
+                cost_price=1, selling_price=i + 1, stock_quantity=5,
+            )
+            for i in range(20)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.order = SalesOrder.objects.create(customer=self.customer, total_amount=0, created_by=self.user)
+        self.url = reverse("order_items_bulk_add", args=[self.order.pk])
+
+    def test_adds_lines_and_updates_total(self):
+        lines = "\n".join(f"{p.sku}, 2" for p in self.products)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(self.url, {"lines": lines})
+        self.assertRedirects(response, reverse("order_detail", args=[self.order.pk]), fetch_redirect_response=False)
+        self.assertEqual(self.order.items.count(), 20)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_amount, sum(2 * (i + 1) for i in range(20)))
+        # Independent of the number of lines
+        self.assertLess(len(context.captured_queries), 16)
+        self.assertEqual(sum(self.order.reservations.values_list("quantity", flat=True)), 40)
+
+    def test_rejects_unknown_sku_and_short_stock(self):
+        response = self.client.post(self.url, {"lines": "SKU000, 3\nSKU000, 3\nNOPE 1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Unknown SKU NOPE")
+        self.assertContains(response, "Insufficient stock for Product 0")
+        self.assertFalse(self.order.items.exists())
+
+    def test_lines_cannot_be_added_after_a_concurrent_confirm(self):
+        stale = SalesOrder.objects.get(pk=self.order.pk)
+        self.order.confirm()
+        with self.assertRaises(InvalidTransition):
+            add_order_items(stale, [("SKU000", 1)])
+        self.assertFalse(self.order.items.exists())
+        self.assertFalse(self.order.reservations.exists())
+        self.assertEqual(SalesOrder.objects.get(pk=self.order.pk).total_amount, 0)
+
+
+class OrderTotalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("admin", password="password", role=User.Roles.ADMIN)
+        cls.customer = Customer.objects.create(
+            customer_id="C001", name="Customer", phone="0100", address="Cairo", email="c@example.com"
+        )
+        cls.product = Product.objects.create(
+            sku="GR001", name="Gold Ring", category="Rings", cost_price=1, selling_price=5, stock_quantity=100
+        )
+
+    def setUp(self):
+        self.order = SalesOrder.objects.create(customer=self.customer, total_amount=0, created_by=self.user)
+
+    def add_item(self, quantity):
+        return SalesOrderItem.objects.create(
+            sales_order=self.order, product=self.product, quantity=quantity, unit_price=5
+        )
+
+    def test_item_writes_apply_deltas(self):
+        first = self.add_item(2)
+        second = self.add_item(3)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_amount, 25)
+
+        second.quantity = 1
+        second.save()
+        first.delete()
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_amount, 5)
+
+    def test_item_save_does_not_scale_with_order_size(self):
+        for _ in range(10):
+            self.add_item(1)
+        # savepoint, insert, total update, release
+        with self.assertNumQueries(4):
+            self.add_item(1)
+
+    def test_verify_order_totals_repairs_drift(self):
+        self.add_item(2)
+        SalesOrder.objects.filter(pk=self.order.pk).update(total_amount=99)
+        call_command("verify_order_totals", "--dry-run", stdout=StringIO())
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_amount, 99)
+
+        out = StringIO()
+        call_command("verify_order_totals", "--batch-size", "1", stdout=out)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_amount, 10)
+        self.assertIn("repaired 1", out.getvalue())
+
+
+class OrderTransitionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        [cls.customer] = make_customers(1)
+
+    def setUp(self):
+        self.order = make_order(self.customer, self.user, lines=1)
+        self.product = self.order.items.get().product
+
+    def stock(self):
+        self.product.refresh_from_db()
+        return self.product.stock_quantity
+
+    def test_stale_instance_cannot_confirm_twice(self):
+        stale = SalesOrder.objects.get(pk=self.order.pk)
+        self.order.confirm()
+        with self.assertRaises(InvalidTransition):
+            stale.confirm()
+        self.assertEqual(self.stock(), 99)
+        self.assertEqual(SalesOrder.objects.get(pk=self.order.pk).status, SalesOrder.CONFIRMED)
+
+    def test_cancel_restores_confirmed_stock(self):
+        self.order.confirm()
+        self.order.cancel()
+        self.assertEqual(self.stock(), 100)
+        self.assertEqual(SalesOrder.objects.get(pk=self.order.pk).status, SalesOrder.CANCELED)
+        with self.assertRaises(InvalidTransition):
+            self.order.confirm()
+
+    def test_failed_confirmation_changes_nothing(self):
+        Product.objects.filter(pk=self.product.pk).update(stock_quantity=0)
+        with self.assertRaises(ValueError):
+            self.order.confirm()
+        self.assertEqual(self.order.status, SalesOrder.PENDING)
+        self.assertEqual(SalesOrder.objects.get(pk=self.order.pk).status, SalesOrder.PENDING)
+
+    def test_save_does_not_read_the_stored_status(self):
+        # the UPDATE only
+        with self.assertNumQueries(1):
+            self.order.save(update_fields=["customer"])
+
+
+class BatchConfirmTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        [cls.customer] = make_customers(1)
+        [cls.product] = make_products(1, stock_quantity=5)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def order(self, quantity):
+        order = make_order(self.customer, self.user)
+        SalesOrderItem.objects.create(sales_order=order, product=self.product, quantity=quantity, unit_price=2)
+        return order
+
+    def test_accepts_orders_while_stock_lasts(self):
+        first, second, third = self.order(2), self.order(2), self.order(2)
+        empty = make_order(self.customer, self.user)
+        canceled = self.order(1)
+        canceled.cancel()
+
+        results = confirm_orders([third.pk, second.pk, first.pk, empty.pk, canceled.pk], user=self.user, batch_size=2)
+
+        self.assertEqual([results[first.pk], results[second.pk]], [None, None])
+        self.assertIn("Insufficient stock", results[third.pk])
+        self.assertIn("no items", results[empty.pk])
+        self.assertIn("not pending", results[canceled.pk])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 1)
+        # first and second share a batch: one movement per product
+        self.assertEqual(list(StockMovement.objects.values_list("quantity", flat=True)), [-4])
+        self.assertEqual(
+            list(SalesOrder.objects.filter(status=SalesOrder.CONFIRMED).order_by("pk")), [first, second]
+        )
+        self.assertEqual(self.customer.ledger_entries.count(), 2)
+
+    def test_list_action_and_command(self):
+        first, second = self.order(1), self.order(10)
+        response = self.client.post(reverse("order_bulk_confirm"), {"orders": [first.pk, second.pk]}, follow=True)
+        self.assertContains(response, "Confirmed 1 order(s)")
+        self.assertContains(response, "1 order(s) were not confirmed")
+
+        third = self.order(1)
+        out = StringIO()
+        call_command("confirm_orders", "--date", str(third.order_date), stdout=out)
+        self.assertIn("Confirmed 1 order(s), 1 not confirmed", out.getvalue())
+        self.assertEqual(SalesOrder.objects.get(pk=third.pk).status, SalesOrder.CONFIRMED)
+
+
+@override_settings(ORDER_NUMBER_BLOCK_SIZE=10)
+class OrderNumberSequenceTests(TestCase):
+    def setUp(self):
+        OrderNumberSequence._blocks = {}
+        self.addCleanup(setattr, OrderNumberSequence, "_blocks", {})
+
+    def last_value(self):
+        return OrderNumberSequence.objects.filter(prefix="SO-T").values_list("last_value", flat=True).first()
+
+    def test_committed_block_is_handed_out_from_memory(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(OrderNumberSequence.next_value("SO-T"), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(OrderNumberSequence.next_value("SO-T"), 2)
+        self.assertEqual(self.last_value(), 10)
+        # Another process gets the next block
+        OrderNumberSequence._blocks = {}
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(OrderNumberSequence.next_value("SO-T"), 11)
+
+    def test_block_is_reserved_outside_the_process_lock(self):
+        reserve_block = OrderNumberSequence.reserve_block.__func__
+
+        def reserve(cls, prefix, size):
+            # Holding it here could deadlock with a thread waiting on the row
+            self.assertFalse(OrderNumberSequence._blocks_lock.locked())
+            return reserve_block(cls, prefix, size)
+
+        with mock.patch.object(OrderNumberSequence, "reserve_block", classmethod(reserve)):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(OrderNumberSequence.next_value("SO-T"), 1)
+            with override_settings(ORDER_NUMBER_BLOCK_SIZE=1):
+                self.assertEqual(OrderNumberSequence.next_value("SO-U"), 1)
+
+    def test_rolled_back_block_is_dropped(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                self.assertEqual(OrderNumberSequence.next_value("SO-T"), 1)
+                raise RuntimeError
+        self.assertIsNone(self.last_value())
+        # The numbers went back to the counter, so they are reserved again
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(OrderNumberSequence.next_value("SO-T"), 1)
+        self.assertEqual(self.last_value(), 10)
+
+
+@override_settings(ORDER_NUMBER_BLOCK_SIZE=10)
+class OrderNumberAutocommitTests(TransactionTestCase):
+    def setUp(self):
+        OrderNumberSequence._blocks = {}
+        self.addCleanup(setattr, OrderNumberSequence, "_blocks", {})
+
+    def test_block_reserved_outside_a_transaction_is_kept(self):
+        self.assertEqual(OrderNumberSequence.next_value("SO-T"), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(OrderNumberSequence.next_value("SO-T"), 2)
+        self.assertEqual(OrderNumberSequence.objects.get(prefix="SO-T").last_value, 10)
+
+
+class OrderExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("admin", password="password", role=User.Roles.ADMIN)
+        cls.customer = Customer.objects.create(
+            customer_id="C001", name="Customer", phone="0100", address="Cairo", email="c@example.com"
+        )
+        cls.pending = SalesOrder.objects.create(customer=cls.customer, total_amount=10, created_by=cls.user)
+        cls.confirmed = SalesOrder.objects.create(
+            customer=cls.customer, total_amount=20, created_by=cls.user, status="confirmed"
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_csv_export_streams_filtered_rows(self):
+        response = self.client.get(reverse("order_export"), {"status": "confirmed"})
+        self.assertTrue(response.streaming)
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(rows[0], "Order #,Date,Customer ID,Customer,Status,Total,Created By")
+        self.assertEqual(len(rows), 2)
+        self.assertIn(self.confirmed.order_number, rows[1])
+
+    def test_formula_like_text_is_exported_as_text(self):
+        Customer.objects.filter(pk=self.customer.pk).update(name='=HYPERLINK("http://x","y")')
+        response = self.client.get(reverse("order_export"), {"status": "confirmed"})
+        row = b"".join(response.streaming_content).decode().splitlines()[1]
+        self.assertIn('"\'=HYPERLINK(""http://x"",""y"")"', row)
+
+        response = self.client.get(reverse("order_export"), {"status": "confirmed", "format": "xlsx"})
+        sheet = openpyxl.load_workbook(BytesIO(b"".join(response.streaming_content))).active
+        cell = sheet.cell(row=2, column=4)
+        self.assertEqual((cell.value, cell.data_type), ('=HYPERLINK("http://x","y")', "s"))
@@ -1,23 +1,60 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import SalesOrder, SalesOrderItem
+from django.db import transaction
+from .models import InvalidTransition, SalesOrder, SalesOrderItem
+from .services import add_order_items, confirm_orders, parse_bulk_lines
 from products.models import Product
 from customers.models import Customer
-from django.core.paginator import Paginator
+from core.exports import export_response
+from core.pagination import paginate
+from inventory.reservations import release_reservations, reserve_stock
 from accounts.decorators import admin_required
 
 
+ORDER_EXPORT_COLUMNS = [
+    ("Order #", "order_number"),
+    ("Date", "order_date"),
+    ("Customer ID", "customer__customer_id"),
+    ("Customer", "customer__name"),
+    ("Status", "status"),
+    ("Total", "total_amount"),
+    ("Created By", "created_by__username"),
+]
+
+
+def customer_exists(customer_id):
+    return bool(customer_id) and str(customer_id).isdigit() and Customer.objects.filter(pk=customer_id).exists()
+
+
+def filter_orders(request, orders):
+    """
+    Apply the order list filters from the query string.
+    """
+    status = request.GET.get('status')
+    if status:
+        orders = orders.filter(status=status)
+    return orders
+
+
 @login_required
 def order_list(request):
     """
     Display a list of all sales orders, ordered by date (newest first).
     """
-    orders = SalesOrder.objects.all().order_by('-order_date', '-id')
-    paginator = Paginator(orders, 10)  # Show 10 orders per page
-    page_number = request.GET.get('page')
-    orders = paginator.get_page(page_number)
-    return render(request, "orders/order_list.html", {"orders": orders})
+    orders = filter_orders(request, SalesOrder.objects.select_related('customer'))
+    orders = paginate(request, orders, 10, ('-order_date', '-id'))  # Show 10 orders per page
+    statuses = SalesOrder._meta.get_field('status').choices
+    return render(request, "orders/order_list.html", {"orders": orders, "statuses": statuses})
+
+
+@login_required
+def order_export(request):
+    """
+    Export the (filtered) order list as CSV or XLSX.
+    """
+    orders = filter_orders(request, SalesOrder.objects.order_by('-order_date', '-id'))
+    return export_response(request, "orders", ORDER_EXPORT_COLUMNS, orders)
 
 
 @login_required
@@ -25,8 +62,10 @@ def order_detail(request, pk):
     """
     Display details of a specific sales order.
     """
-    order = get_object_or_404(SalesOrder, pk=pk)
-    return render(request, "orders/order_detail.html", {"order": order})
+    order = get_object_or_404(SalesOrder.objects.select_related('customer', 'created_by'), pk=pk)
+    # Evaluated once by the template; product names come from the same query
+    items = order.items.select_related('product').order_by('id')
+    return render(request, "orders/order_detail.html", {"order": order, "items": items})
 
 
 @login_required
@@ -37,6 +76,9 @@ def order_create(request):
     """
     if request.method == "POST":
         customer_id = request.POST.get("customer_id")
+        if not customer_exists(customer_id):
+            messages.error(request, "Please select a customer")
+            return redirect("order_create")
         
         # Create order with created_by set to current user
         order = SalesOrder.objects.create(
@@ -48,8 +90,8 @@ def order_create(request):
         messages.success(request, f"Order {order.order_number} created successfully!")
         return redirect("order_detail", pk=order.pk)
 
-    customers = Customer.objects.all()
-    return render(request, "orders/order_form.html", {"customers": customers})
+    # Customers are picked through the customer_lookup typeahead
+    return render(request, "orders/order_form.html")
 
 
 @admin_required
@@ -57,24 +99,35 @@ def order_edit(request, pk):
     """
     Edit an existing sales order. Only admin can edit.
     """
-    order = get_object_or_404(SalesOrder, pk=pk)
+    order = get_object_or_404(SalesOrder.objects.select_related('customer'), pk=pk)
+
+    # Confirmed orders are charged to their customer's ledger and sales
+    # rollups; moving them would leave the charge with the old customer
+    if order.status != 'pending':
+        messages.error(request, "Only pending orders can be moved to another customer.")
+        return redirect("order_detail", pk=order.pk)
 
     if request.method == "POST":
         customer_id = request.POST.get("customer_id")
-        order.customer_id = customer_id
-        order.save()
+        if not customer_exists(customer_id):
+            messages.error(request, "Please select a customer")
+            return redirect("order_edit", pk=order.pk)
+        # Only the customer, and only while still pending: a full save could
+        # write back a stale status, and the order may have been confirmed since
+        if not SalesOrder.objects.filter(pk=order.pk, status=SalesOrder.PENDING).update(customer_id=customer_id):
+            messages.error(request, "Only pending orders can be moved to another customer.")
+            return redirect("order_detail", pk=order.pk)
         messages.success(request, "Order updated successfully!")
         return redirect("order_detail", pk=order.pk)
 
-    customers = Customer.objects.all()
-    return render(request, "orders/order_form.html", {"order": order, "customers": customers})
+    return render(request, "orders/order_form.html", {"order": order})
 
 
 @admin_required
 def order_confirm(request, pk):
     """
     Confirm an order. Only admin can confirm.
-    This will trigger stock reduction via signals.
+    Stock is deducted in the same transaction.
     """
     order = get_object_or_404(SalesOrder, pk=pk)
     
@@ -83,33 +136,55 @@ def order_confirm(request, pk):
         messages.error(request, "Cannot confirm an order with no items. Please add items first.")
         return redirect("order_detail", pk=order.pk)
     
-    if order.status == 'pending':
-        try:
-            order.status = 'confirmed'
-            order.save()
-            messages.success(request, f"Order {order.order_number} confirmed! Stock has been updated.")
-        except ValueError as e:
-            messages.error(request, str(e))
-    else:
+    try:
+        order.confirm()
+        messages.success(request, f"Order {order.order_number} confirmed! Stock has been updated.")
+    except InvalidTransition:
         messages.warning(request, "Only pending orders can be confirmed.")
+    except ValueError as e:
+        messages.error(request, str(e))
     
     return redirect("order_detail", pk=order.pk)
 
 
+@admin_required
+def order_bulk_confirm(request):
+    """
+    Confirm the pending orders selected on the order list in one batch.
+    Only admin can confirm.
+    """
+    if request.method != "POST":
+        return redirect("order_list")
+    order_ids = [int(pk) for pk in request.POST.getlist("orders") if pk.isdigit()]
+    if not order_ids:
+        messages.warning(request, "Select at least one order to confirm.")
+        return redirect("order_list")
+
+    results = confirm_orders(order_ids, user=request.user)
+    failures = [reason for reason in results.values() if reason]
+    confirmed = len(results) - len(failures)
+    if confirmed:
+        messages.success(request, f"Confirmed {confirmed} order(s). Stock has been updated.")
+    if failures:
+        shown = "; ".join(failures[:5])
+        more = f" (and {len(failures) - 5} more)" if len(failures) > 5 else ""
+        messages.error(request, f"{len(failures)} order(s) were not confirmed: {shown}{more}")
+    return redirect("order_list")
+
+
 @admin_required
 def order_cancel(request, pk):
     """
     Cancel an order. Only admin can cancel.
-    This will trigger stock restoration via signals if order was confirmed.
+    Stock taken by a confirmed order is restored.
     """
     order = get_object_or_404(SalesOrder, pk=pk)
     
-    if order.status != 'cancelled':
-        order.status = 'cancelled'
-        order.save()
-        messages.success(request, f"Order {order.order_number} cancelled.")
-    else:
-        messages.warning(request, "Order is already cancelled.")
+    try:
+        order.cancel()
+        messages.success(request, f"Order {order.order_number} canceled.")
+    except InvalidTransition:
+        messages.warning(request, "Order is already canceled.")
     
     return redirect("order_detail", pk=order.pk)
 
@@ -121,9 +196,9 @@ def order_item_add(request, order_pk):
     """
     order = get_object_or_404(SalesOrder, pk=order_pk)
     
-    # Can't modify confirmed or cancelled orders
+    # Can't modify confirmed or canceled orders
     if order.status != 'pending':
-        messages.error(request, "Cannot modify items of a confirmed or cancelled order.")
+        messages.error(request, "Cannot modify items of a confirmed or canceled order.")
         return redirect("order_detail", pk=order.pk)
 
     if request.method == "POST":
@@ -147,24 +222,22 @@ def order_item_add(request, order_pk):
             
             product = get_object_or_404(Product, pk=product_id)
             
-            # Check stock availability
-            if product.stock_quantity < quantity:
-                messages.warning(request, 
-                    f"Insufficient stock for {product.name}. Only {product.stock_quantity} units available.")
+            # Hold the stock for this order, then create the order item
+            # (the order total is updated by the item's save)
+            try:
+                with transaction.atomic():
+                    SalesOrder.lock_pending(order.pk)
+                    reserve_stock(order.pk, {product.pk: quantity})
+                    SalesOrderItem.objects.create(
+                        sales_order=order,
+                        product=product,
+                        quantity=quantity,
+                        unit_price=product.selling_price,
+                    )
+            except ValueError as e:
+                messages.warning(request, str(e))
                 return redirect("order_item_add", order_pk=order.pk)
             
-            # Create order item
-            item = SalesOrderItem.objects.create(
-                sales_order=order,
-                product=product,
-                quantity=quantity,
-                unit_price=product.selling_price,
-            )
-            
-            # Recalculate total amount
-            order.total_amount = sum(item.total_price for item in order.items.all())
-            order.save()
-            
             messages.success(request, f"Added {product.name} to order.")
             return redirect("order_detail", pk=order.pk)
             
@@ -172,8 +245,34 @@ def order_item_add(request, order_pk):
             messages.error(request, f"Error adding item: {str(e)}")
             return redirect("order_item_add", order_pk=order.pk)
 
-    products = Product.objects.all()
-    return render(request, "orders/order_item_form.html", {"order": order, "products": products})
+    # Products are picked through the product_lookup endpoint
+    return render(request, "orders/order_item_form.html", {"order": order})
+
+
+@login_required
+def order_items_bulk_add(request, order_pk):
+    """
+    Add many items to a sales order at once from "SKU, quantity" lines.
+    """
+    order = get_object_or_404(SalesOrder, pk=order_pk)
+
+    # Can't modify confirmed or canceled orders
+    if order.status != 'pending':
+        messages.error(request, "Cannot modify items of a confirmed or canceled order.")
+        return redirect("order_detail", pk=order.pk)
+
+    lines_text = ""
+    if request.method == "POST":
+        lines_text = request.POST.get("lines", "")
+        try:
+            items = add_order_items(order, parse_bulk_lines(lines_text))
+            messages.success(request, f"Added {len(items)} items to order.")
+            return redirect("order_detail", pk=order.pk)
+        except ValueError as e:
+            # Re-render with the submitted lines so they don't have to be retyped
+            messages.error(request, str(e))
+
+    return render(request, "orders/order_item_bulk_form.html", {"order": order, "lines": lines_text})
 
 
 @login_required
@@ -184,16 +283,20 @@ def order_item_remove(request, order_pk, item_pk):
     order = get_object_or_404(SalesOrder, pk=order_pk)
     item = get_object_or_404(SalesOrderItem, pk=item_pk, sales_order=order)
     
-    # Can't modify confirmed or cancelled orders
+    # Can't modify confirmed or canceled orders
     if order.status != 'pending':
-        messages.error(request, "Cannot modify items of a confirmed or cancelled order.")
+        messages.error(request, "Cannot modify items of a confirmed or canceled order.")
         return redirect("order_detail", pk=order.pk)
     
-    item.delete()
-    
-    # Recalculate total amount
-    order.total_amount = sum(item.total_price for item in order.items.all())
-    order.save()
+    # Deleting the item also subtracts it from the order total
+    try:
+        with transaction.atomic():
+            SalesOrder.lock_pending(order.pk)
+            item.delete()
+            release_reservations([order.pk], {item.product_id: item.quantity})
+    except InvalidTransition as e:
+        messages.error(request, str(e))
+        return redirect("order_detail", pk=order.pk)
     
     messages.success(request, "Item removed from order.")
     return redirect("order_detail", pk=order.pk)
@@ -6,4 +6,5 @@ from .models import Product
 class ProductAdmin(admin.ModelAdmin):
     list_display = ("sku", "name", "category", "cost_price", "selling_price")
     search_fields = ("sku", "name", "category")
-    list_filter = ("category",)
\ No newline at end of file
+    list_filter = ("category",)
+    readonly_fields = ("reserved_quantity",)
\ No newline at end of file
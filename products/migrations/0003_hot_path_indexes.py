@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "products",
+            "0002_alter_product_cost_price_alter_product_selling_price_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="product",
+            options={
+                "ordering": ["name", "id"],
+                "permissions": [
+                    ("view_product_details", "Can view product details"),
+                    ("edit_product", "Can edit product information"),
+                ],
+                "verbose_name": "Product",
+                "verbose_name_plural": "Products",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["name", "id"], name="product_name_id_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["category", "name"], name="product_category_name_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                condition=models.Q(("stock_quantity__lt", 10)),
+                fields=["stock_quantity"],
+                name="product_low_stock_idx",
+            ),
+        ),
+    ]
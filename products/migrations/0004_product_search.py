@@ -0,0 +1,83 @@
+from django.db import migrations
+
+# Kept in sync with products.search.PG_DOCUMENT
+PG_DOCUMENT = (
+    "setweight(to_tsvector('simple', sku), 'A') || "
+    "setweight(to_tsvector('simple', name), 'B') || "
+    "setweight(to_tsvector('simple', category), 'C')"
+)
+
+SQLITE_FORWARD = [
+    # External-content table: stores only the index, rows stay in products_product.
+    # prefix='2 3' keeps short prefix queries ("21*") off a full term scan.
+    """
+    CREATE VIRTUAL TABLE products_product_fts USING fts5(
+        sku, name, category,
+        content='products_product', content_rowid='id', prefix='2 3'
+    )
+    """,
+    # Triggers also cover bulk_create(), update() and upserts, which skip signals
+    """
+    CREATE TRIGGER products_product_fts_insert AFTER INSERT ON products_product BEGIN
+        INSERT INTO products_product_fts(rowid, sku, name, category)
+        VALUES (new.id, new.sku, new.name, new.category);
+    END
+    """,
+    """
+    CREATE TRIGGER products_product_fts_delete AFTER DELETE ON products_product BEGIN
+        INSERT INTO products_product_fts(products_product_fts, rowid, sku, name, category)
+        VALUES ('delete', old.id, old.sku, old.name, old.category);
+    END
+    """,
+    """
+    CREATE TRIGGER products_product_fts_update AFTER UPDATE OF sku, name, category ON products_product BEGIN
+        INSERT INTO products_product_fts(products_product_fts, rowid, sku, name, category)
+        VALUES ('delete', old.id, old.sku, old.name, old.category);
+        INSERT INTO products_product_fts(rowid, sku, name, category)
+        VALUES (new.id, new.sku, new.name, new.category);
+    END
+    """,
+    "INSERT INTO products_product_fts(products_product_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS products_product_fts_insert",
+    "DROP TRIGGER IF EXISTS products_product_fts_delete",
+    "DROP TRIGGER IF EXISTS products_product_fts_update",
+    "DROP TABLE IF EXISTS products_product_fts",
+]
+
+POSTGRES_FORWARD = [
+    f"CREATE INDEX IF NOT EXISTS product_search_idx ON products_product USING gin (({PG_DOCUMENT}))",
+]
+
+POSTGRES_REVERSE = ["DROP INDEX IF EXISTS product_search_idx"]
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        connection = schema_editor.connection
+        if connection.vendor == "sqlite":
+            # SQLite builds without FTS5 fall back to icontains search
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM pragma_module_list WHERE name = 'fts5'")
+                if cursor.fetchone() is None:
+                    return
+        for statement in statements.get(connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0003_hot_path_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            run({"sqlite": SQLITE_REVERSE, "postgresql": POSTGRES_REVERSE}),
+        ),
+    ]
@@ -0,0 +1,31 @@
+import importlib
+
+from django.db import migrations, models
+
+# SQLite adds the column by rebuilding products_product, which drops the
+# search triggers created by 0004; put them back and resync the index.
+product_search = importlib.import_module("products.migrations.0004_product_search")
+SQLITE_TRIGGERS = [
+    statement.replace("CREATE TRIGGER ", "CREATE TRIGGER IF NOT EXISTS ")
+    for statement in product_search.SQLITE_FORWARD
+    if "CREATE VIRTUAL TABLE" not in statement
+]
+restore_search_triggers = product_search.run({"sqlite": SQLITE_TRIGGERS})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_product_search"),
+    ]
+
+    operations = [
+        # Reversing the AddField rebuilds the table again
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name="product",
+            name="reserved_quantity",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
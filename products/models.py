@@ -1,7 +1,11 @@
 from django.db import models
+from django.db.models import Q
 from django.core.validators import MinValueValidator
 
 
+# Products below this quantity are flagged as low stock on the dashboard
+LOW_STOCK_THRESHOLD = 10
+
 
 class Product(models.Model):
     sku = models.CharField(max_length=100, unique=True)
@@ -20,17 +24,61 @@ class Product(models.Model):
     )
     # Current stock quantity, ensuring it cannot be negative
     stock_quantity = models.PositiveIntegerField(default=0)
+    # Units held by pending orders (inventory.StockReservation), maintained
+    # by inventory.reservations
+    reserved_quantity = models.PositiveIntegerField(default=0)
 
 
 
     def __str__(self):
         return f"{self.name} ({self.sku})"
+
+    @property
+    def available_quantity(self):
+        """
+        Available to promise: stock on hand not held by pending orders.
+        """
+        return max(self.stock_quantity - self.reserved_quantity, 0)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored quantity so saves can tell how stock changed
+        instance._loaded_stock_quantity = instance.__dict__.get('stock_quantity')
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Updates never write reserved_quantity: it only moves by F() updates
+        in inventory.reservations, which a form loaded earlier would undo.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname != 'reserved_quantity'
+            ]
+        super().save(*args, **kwargs)
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_stock_quantity = self.__dict__.get('stock_quantity')
     
 
     class Meta:
-        ordering = ['name']
+        ordering = ['name', 'id']
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
+        indexes = [
+            # Product list: ORDER BY name, id
+            models.Index(fields=['name', 'id'], name='product_name_id_idx'),
+            models.Index(fields=['category', 'name'], name='product_category_name_idx'),
+            # Dashboard low-stock count only ever touches the few low rows
+            models.Index(
+                fields=['stock_quantity'],
+                condition=Q(stock_quantity__lt=LOW_STOCK_THRESHOLD),
+                name='product_low_stock_idx',
+            ),
+        ]
 
         permissions = [
             ("view_product_details", "Can view product details"),
@@ -0,0 +1,179 @@
+import re
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+
+from core.cache import CATALOGUE, cache_timeout, record_access, versioned_key
+from .models import Product
+
+
+# Ranked matches kept per search; users refine the query rather than page past this
+SEARCH_RESULT_LIMIT = 500
+MAX_TERMS = 8
+
+# Maintained by migration 0004_product_search
+FTS_TABLE = "products_product_fts"
+# Must match the expression of the GIN index created by 0004_product_search
+PG_DOCUMENT = (
+    "setweight(to_tsvector('simple', sku), 'A') || "
+    "setweight(to_tsvector('simple', name), 'B') || "
+    "setweight(to_tsvector('simple', category), 'C')"
+)
+
+_fts_tables = {}
+
+
+def search_terms(query):
+    """
+    Lower-cased alphanumeric words of a query ("21K chain" -> ['21k', 'chain']).
+    Only these reach the search syntax, so user input cannot inject operators.
+    """
+    return re.findall(r"[^\W_]+", query.lower())[:MAX_TERMS]
+
+
+def _has_fts_table(connection):
+    key = (connection.alias, connection.settings_dict["NAME"])
+    if key not in _fts_tables:
+        _fts_tables[key] = FTS_TABLE in connection.introspection.table_names()
+    return _fts_tables[key]
+
+
+def _restriction(queryset, column):
+    if queryset is None or not queryset.query.where:
+        return "", []
+    sql, params = queryset.order_by().values("pk").query.sql_with_params()
+    return f" AND {column} IN ({sql})", list(params)
+
+
+def _icontains(products, terms):
+    for term in terms:
+        products = products.filter(Q(sku__icontains=term) | Q(name__icontains=term) | Q(category__icontains=term))
+    return products
+
+
+def search_product_ids(query, queryset=None, limit=SEARCH_RESULT_LIMIT):
+    """
+    Return ids of products whose SKU, name or category contain words
+    starting with every term of `query`, best match first. `queryset`
+    optionally restricts the candidates (e.g. a category filter).
+
+    Uses the FTS5 index on SQLite and the tsvector GIN index on
+    PostgreSQL; other databases fall back to icontains scans.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    connection = connections[queryset.db if queryset is not None else "default"]
+
+    if connection.vendor == "sqlite" and _has_fts_table(connection):
+        match = " ".join(f'"{term}"*' for term in terms)
+        # "+rowid" keeps SQLite from probing the FTS index once per restricted id
+        restriction, params = _restriction(queryset, "+rowid")
+        # bm25() is lower for better matches; SKU hits outrank name, then category
+        sql = (
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s{restriction} "
+            f"ORDER BY bm25({FTS_TABLE}, 10.0, 5.0, 1.0), rowid LIMIT %s"
+        )
+        params = [match, *params, limit]
+    elif connection.vendor == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        restriction, params = _restriction(queryset, "id")
+        sql = (
+            f"SELECT id FROM products_product WHERE ({PG_DOCUMENT}) @@ to_tsquery('simple', %s){restriction} "
+            f"ORDER BY ts_rank({PG_DOCUMENT}, to_tsquery('simple', %s)) DESC, id LIMIT %s"
+        )
+        params = [tsquery, *params, tsquery, limit]
+    else:
+        products = queryset if queryset is not None else Product.objects.all()
+        return list(_icontains(products, terms).order_by("name", "id").values_list("pk", flat=True)[:limit])
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def filter_search(queryset, query):
+    """
+    Restrict `queryset` to every product matching `query`, unranked and
+    without a limit (exports), through the same index as
+    search_product_ids(), as a subquery.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    connection = connections[queryset.db]
+    if connection.vendor == "sqlite" and _has_fts_table(connection):
+        match = " ".join(f'"{term}"*' for term in terms)
+        return queryset.filter(pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]))
+    if connection.vendor == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT id FROM products_product WHERE ({PG_DOCUMENT}) @@ to_tsquery('simple', %s)", [tsquery]
+        ))
+    return _icontains(queryset, terms)
+
+
+def search_page(request, queryset, query, per_page):
+    """
+    One page of ranked search results for the list views.
+    Pages over the ranked ids and only loads the products shown.
+    """
+    page = Paginator(search_product_ids(query, queryset), per_page).get_page(request.GET.get("page"))
+    products = queryset.in_bulk(page.object_list)
+    page.object_list = [products[pk] for pk in page.object_list if pk in products]
+    return page
+
+
+LOOKUP_PAGE_SIZE = 20
+LOOKUP_FIELDS = ("id", "sku", "name", "selling_price", "stock_quantity")
+LOOKUP_CACHE_TIMEOUT = 300
+
+
+def lookup_products(query="", category="", in_stock=False, page=1):
+    """
+    One page of product picker results as plain dicts of LOOKUP_FIELDS
+    plus the available-to-promise quantity (no model instances). With a query the best matches come first,
+    otherwise products are listed by name.
+
+    Results are cached per catalogue version: any product or stock
+    change starts a fresh set of entries.
+    """
+    params = {"q": query, "category": category, "in_stock": in_stock, "page": page}
+    key = versioned_key(CATALOGUE, "product_lookup", params)
+    result = cache.get(key)
+    record_access("product_lookup", result is not None)
+    if result is None:
+        result = _lookup_products(query, category, in_stock, page)
+        cache.set(key, result, cache_timeout(LOOKUP_CACHE_TIMEOUT))
+    return result
+
+
+def _lookup_products(query, category, in_stock, page):
+    products = Product.objects.all()
+    if category:
+        products = products.filter(category=category)
+    offset = (page - 1) * LOOKUP_PAGE_SIZE
+
+    if search_terms(query):
+        ids = search_product_ids(query, products)
+        candidates = Product.objects.filter(pk__in=ids)
+        if in_stock:
+            candidates = candidates.filter(stock_quantity__gt=F("reserved_quantity"))
+        rows = {row["id"]: row for row in candidates.values(*LOOKUP_FIELDS, "reserved_quantity")}
+        ranked = [rows[pk] for pk in ids if pk in rows]
+        rows = ranked[offset:offset + LOOKUP_PAGE_SIZE + 1]
+    else:
+        if in_stock:
+            products = products.filter(stock_quantity__gt=F("reserved_quantity"))
+        rows = list(products.order_by("name", "id").values(*LOOKUP_FIELDS, "reserved_quantity")[offset:offset + LOOKUP_PAGE_SIZE + 1])
+
+    results = []
+    for row in rows[:LOOKUP_PAGE_SIZE]:
+        row["selling_price"] = str(row["selling_price"])
+        row["label"] = f"{row['name']} ({row['sku']})"
+        row["available_quantity"] = max(row["stock_quantity"] - row.pop("reserved_quantity"), 0)
+        results.append(row)
+    return {"results": results, "page": page, "has_next": len(rows) > LOOKUP_PAGE_SIZE}
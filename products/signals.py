@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import CATALOGUE, bump_object_versions, bump_version
+from .models import Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalogue(sender, instance, **kwargs):
+    bump_version(CATALOGUE)
+    bump_object_versions(Product, [instance.pk])
@@ -1,3 +1,235 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from core.cache import OBJECT_CACHE_TIMEOUT, cache_stats, cache_timeout, reset_cache_stats
+from core.testing import QueryCountMixin, grow_to, make_products, make_user
+from inventory.services import apply_stock_deltas
+from .models import Product
+from .search import LOOKUP_PAGE_SIZE, lookup_products, search_product_ids
+
+
+class ProductViewQueryCountTests(QueryCountMixin, TestCase):
+    """
+    Page query counts must not grow with the number of products.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        [cls.product] = make_products(1)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.products = grow_to(make_products)
+
+    def test_product_list(self):
+        # session, user, page count, page rows
+        self.assertConstantQueries(lambda: reverse("product_list"), self.products, expected=4)
+        self.assertConstantQueries(lambda: reverse("product_list") + "?category=Rings", self.products, expected=4)
+        self.assertConstantQueries(lambda: reverse("product_list") + "?cursor=", self.products, expected=4)
+
+    def test_product_pages(self):
+        cache.clear()
+        self.client.get(reverse("product_detail", args=[self.product.pk]))
+        # session, user (product served from the cache)
+        self.assertConstantQueries(lambda: reverse("product_detail", args=[self.product.pk]), self.products, expected=2)
+        # session, user, product
+        self.assertConstantQueries(lambda: reverse("product_edit", args=[self.product.pk]), self.products, expected=3)
+        # session, user
+        self.assertConstantQueries(lambda: reverse("product_create"), self.products, expected=2)
+
+    def test_product_export(self):
+        # session, user, rows
+        self.assertConstantQueries(lambda: reverse("product_export"), self.products, expected=3)
+
+
+class ProductSearchTests(QueryCountMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        cls.chain = Product.objects.create(
+            sku="NK-021", name="Twisted Chain 21K", category="Gold Necklaces",
+            cost_price=1, selling_price=2, stock_quantity=5,
+        )
+        cls.ring = Product.objects.create(
+            sku="RG-018", name="Solitaire Ring 18K", category="Gold Rings",
+            cost_price=1, selling_price=2, stock_quantity=5,
+        )
+        cls.bracelet = Product.objects.create(
+            sku="BR-021", name="Charm Bracelet", category="21K Chains",
+            cost_price=1, selling_price=2, stock_quantity=5,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_prefix_terms_must_all_match(self):
+        self.assertEqual(set(search_product_ids("21k chain")), {self.chain.pk, self.bracelet.pk})
+        self.assertEqual(search_product_ids("solit"), [self.ring.pk])
+        self.assertEqual(search_product_ids("rg-018"), [self.ring.pk])
+        self.assertEqual(search_product_ids("platinum"), [])
+        self.assertEqual(search_product_ids(" -*\" "), [])
+
+    def test_name_matches_outrank_category_matches(self):
+        self.assertEqual(search_product_ids("chain"), [self.chain.pk, self.bracelet.pk])
+
+    def test_index_follows_writes(self):
+        self.ring.name = "Halo Ring 18K"
+        self.ring.save()
+        self.assertEqual(search_product_ids("solitaire"), [])
+        self.assertEqual(search_product_ids("halo"), [self.ring.pk])
+        Product.objects.filter(pk=self.ring.pk).update(category="Platinum Rings")
+        self.assertEqual(search_product_ids("platinum"), [self.ring.pk])
+        self.ring.delete()
+        self.assertEqual(search_product_ids("halo"), [])
+
+    def test_search_respects_filters(self):
+        necklaces = Product.objects.filter(category="Gold Necklaces")
+        self.assertEqual(search_product_ids("21k", necklaces), [self.chain.pk])
+
+    def test_list_view_search(self):
+        response = self.client.get(reverse("product_list"), {"q": "21k chain"})
+        self.assertEqual([p.pk for p in response.context["products"]], [self.chain.pk, self.bracelet.pk])
+        response = self.client.get(reverse("product_export"), {"q": "bracelet"})
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(rows), 2)
+
+    def test_export_and_ranking_cover_every_match(self):
+        Product.objects.bulk_create([
+            Product(sku=f"CH-{i}", name=f"Chain {i}", category="Gold Chains", cost_price=1, selling_price=2)
+            # more than the search keeps, and than it used to rank
+            for i in range(2100)
+        ])
+        # the best match was written last
+        ring = Product.objects.create(
+            sku="GOLD-1", name="Gold Band", category="Gold Rings", cost_price=1, selling_price=2,
+        )
+        self.assertEqual(search_product_ids("gold")[0], ring.pk)
+        response = self.client.get(reverse("product_export"), {"q": "gold"})
+        rows = b"".join(response.streaming_content).decode().splitlines()
+        # header, the chain and ring set up above, the new products
+        self.assertEqual(len(rows), 1 + 2 + 2100 + 1)
+
+    def test_search_query_count(self):
+        search_product_ids("warm")
+        # session, user, ranked ids, page rows
+        self.assertConstantQueries(
+            lambda: reverse("product_list") + "?q=product", grow_to(make_products), expected=4
+        )
+
+
+class ProductLookupTests(QueryCountMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        cls.chain = Product.objects.create(
+            sku="NK-021", name="Twisted Chain 21K", category="Necklaces",
+            cost_price=1, selling_price="150.00", stock_quantity=5,
+        )
+        cls.sold_out = Product.objects.create(
+            sku="NK-022", name="Rope Chain 21K", category="Necklaces",
+            cost_price=1, selling_price="90.00", stock_quantity=0,
+        )
+        cls.ring = Product.objects.create(
+            sku="RG-018", name="Chain Ring", category="Rings",
+            cost_price=1, selling_price="40.00", stock_quantity=3,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def ids(self, **params):
+        return {row["id"] for row in lookup_products(**params)["results"]}
+
+    def test_filters(self):
+        self.assertEqual(self.ids(query="chain"), {self.chain.pk, self.sold_out.pk, self.ring.pk})
+        self.assertEqual(self.ids(query="chain", in_stock=True), {self.chain.pk, self.ring.pk})
+        self.assertEqual(self.ids(query="chain", category="Rings"), {self.ring.pk})
+        self.assertEqual(self.ids(category="Necklaces", in_stock=True), {self.chain.pk})
+
+    def test_endpoint_returns_projection(self):
+        response = self.client.get(reverse("product_lookup"), {"q": "twisted"})
+        data = response.json()
+        self.assertFalse(data["has_next"])
+        self.assertEqual(data["results"], [{
+            "id": self.chain.pk, "sku": "NK-021", "name": "Twisted Chain 21K", "selling_price": "150.00",
+            "stock_quantity": 5, "label": "Twisted Chain 21K (NK-021)", "available_quantity": 5,
+        }])
+
+    def test_pages(self):
+        make_products(LOOKUP_PAGE_SIZE + 5)
+        first = lookup_products(category="Rings")
+        second = lookup_products(category="Rings", page=2)
+        self.assertTrue(first["has_next"])
+        self.assertFalse(second["has_next"])
+        self.assertEqual(len(first["results"]) + len(second["results"]), LOOKUP_PAGE_SIZE + 6)
+
+    def test_cached_until_catalogue_changes(self):
+        self.assertEqual(self.ids(query="chain", in_stock=True), {self.chain.pk, self.ring.pk})
+        with self.assertNumQueries(0):
+            self.ids(query="chain", in_stock=True)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_stock_deltas({self.ring.pk: -3}, created_by_id=self.user.pk)
+        self.assertEqual(self.ids(query="chain", in_stock=True), {self.chain.pk})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.sold_out.stock_quantity = 4
+            self.sold_out.save()
+        self.assertEqual(self.ids(query="chain", in_stock=True), {self.chain.pk, self.sold_out.pk})
+
+    def test_lookup_query_count(self):
+        def grow(size):
+            make_products(size)
+            cache.clear()
+
+        search_product_ids("warm")
+        # session, user, ranked ids, projected rows
+        self.assertConstantQueries(lambda: reverse("product_lookup") + "?q=product&in_stock=1", grow, expected=4)
+
+
+class ProductDetailCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        [cls.product] = make_products(1)
+
+    def setUp(self):
+        cache.clear()
+        reset_cache_stats()
+        self.client.force_login(self.user)
+        self.url = reverse("product_detail", args=[self.product.pk])
+
+    def test_read_through_and_invalidation(self):
+        # session, user, product
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertContains(response, "Product 0")
+        self.assertIn(("products.product", 1, 1), cache_stats())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = "Renamed Ring"
+            self.product.save()
+        self.assertContains(self.client.get(self.url), "Renamed Ring")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            apply_stock_deltas({self.product.pk: -7}, created_by_id=self.user.pk)
+        self.assertEqual(self.client.get(self.url).context["product"].stock_quantity, 93)
+
+    def test_max_age_caps_entries_under_locmem(self):
+        with override_settings(CACHE_MAX_AGE=30):
+            self.assertEqual(cache_timeout(OBJECT_CACHE_TIMEOUT), 30)
+        with override_settings(CACHE_MAX_AGE=None):
+            self.assertEqual(cache_timeout(OBJECT_CACHE_TIMEOUT), OBJECT_CACHE_TIMEOUT)
+        # Another process's write would not be seen: nothing is kept at all
+        with override_settings(CACHE_MAX_AGE=0):
+            for _ in range(2):
+                with self.assertNumQueries(3):
+                    self.client.get(self.url)
+
+    def test_missing_product_is_404(self):
+        self.assertEqual(self.client.get(reverse("product_detail", args=[999])).status_code, 404)
@@ -6,6 +6,8 @@ urlpatterns = [
     path("", views.product_list, name="product_list"),
     path("<int:pk>/", views.product_detail, name="product_detail"),
     path("create/", views.product_create, name="product_create"),
+    path("export/", views.product_export, name="product_export"),
+    path("lookup/", views.product_lookup, name="product_lookup"),
     path("<int:pk>/edit/", views.product_edit, name="product_edit"),
     path("<int:pk>/delete/", views.product_delete, name="product_delete"),
 ]
\ No newline at end of file
@@ -1,31 +1,92 @@
+from django.db import transaction
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from .models import Product
-from django.core.paginator import Paginator
+from .search import filter_search, lookup_products, search_page
+from core.cache import OBJECT_CACHE_TIMEOUT, cache_timeout, cached_object
+from core.exports import export_response
+from core.pagination import paginate
+from inventory.services import record_stock_adjustment
+from inventory.sharding import respread_stock, slot_levels
 from accounts.decorators import admin_required
 from django.contrib import messages
 
 
+PRODUCT_EXPORT_COLUMNS = [
+    ("SKU", "sku"),
+    ("Name", "name"),
+    ("Category", "category"),
+    ("Cost Price", "cost_price"),
+    ("Selling Price", "selling_price"),
+    ("Stock", "stock_quantity"),
+]
+
+
+def filter_products(request, products):
+    """
+    Apply the product list filters from the query string.
+    """
+    category = request.GET.get("category", "").strip()
+    if category:
+        products = products.filter(category=category)
+    return products
+
+
 @login_required
 def product_list(request):
     """
     Display a list of all products.
     """
-    products = Product.objects.all()
-    paginator = Paginator(products, 10)  # Show 10 products per page
-    page_number = request.GET.get('page')
-    products = paginator.get_page(page_number)
+    products = filter_products(request, Product.objects.all())
+    query = request.GET.get("q", "").strip()
+    if query:
+        # Search mode: best matches first
+        products = search_page(request, products, query, 10)
+    else:
+        products = paginate(request, products, 10, ('name', 'id'))  # Show 10 products per page
     return render(request, "products/product_list.html", {"products": products})
 
 
+@login_required
+def product_export(request):
+    """
+    Export the (filtered) product list as CSV or XLSX.
+    """
+    products = filter_products(request, Product.objects.order_by('name', 'id'))
+    query = request.GET.get("q", "").strip()
+    if query:
+        products = filter_search(products, query)
+    return export_response(request, "products", PRODUCT_EXPORT_COLUMNS, products)
+
+
+@login_required
+def product_lookup(request):
+    """
+    JSON product picker: ?q= search, ?category=, ?in_stock=1 and ?page=.
+    """
+    try:
+        page = max(1, int(request.GET.get("page", 1)))
+    except ValueError:
+        page = 1
+    return JsonResponse(lookup_products(
+        query=request.GET.get("q", "").strip(),
+        category=request.GET.get("category", "").strip(),
+        in_stock=request.GET.get("in_stock") == "1",
+        page=page,
+    ))
+
+
 @login_required
 def product_detail(request, pk):
     """
     Display details of a specific product.
     """
-    product = get_object_or_404(Product, pk=pk)
-    return render(request, "products/product_detail.html", {"product": product})
+    product, version = cached_object(Product, pk)
+    return render(request, "products/product_detail.html", {
+        "product": product, "cache_version": version, "cache_timeout": cache_timeout(OBJECT_CACHE_TIMEOUT),
+    })
 
 
 @admin_required
@@ -58,14 +119,16 @@ def product_create(request):
                 messages.error(request, "Invalid price or quantity format")
                 return redirect("product_create")
             
-            product = Product.objects.create(
-                sku=sku,
-                name=name,
-                category=category,
-                cost_price=cost_price,
-                selling_price=selling_price,
-                stock_quantity=stock_quantity,
-            )
+            with transaction.atomic():
+                product = Product.objects.create(
+                    sku=sku,
+                    name=name,
+                    category=category,
+                    cost_price=cost_price,
+                    selling_price=selling_price,
+                    stock_quantity=stock_quantity,
+                )
+                record_stock_adjustment(product.pk, stock_quantity, request.user.pk)
             messages.success(request, "Product created successfully")
             return redirect("product_detail", pk=product.pk)
             
@@ -114,8 +177,20 @@ def product_edit(request, pk):
             product.category = category
             product.cost_price = cost_price
             product.selling_price = selling_price
-            product.stock_quantity = stock_quantity
-            product.save()
+            with transaction.atomic():
+                # Log the change against the stored level, which orders may have moved since the form loaded
+                stored = Product.objects.select_for_update().values_list(
+                    'stock_quantity', 'reserved_quantity'
+                ).get(pk=product.pk)
+                # Sharded stock lives in its slots; the stored totals may lag behind
+                stored, reserved = slot_levels([product.pk]).get(product.pk, stored)
+                if stock_quantity < reserved:
+                    messages.error(request, f"{reserved} unit(s) are held for pending orders; stock cannot go below that")
+                    return redirect("product_edit", pk=product.pk)
+                product.stock_quantity = stock_quantity
+                product.save()
+                record_stock_adjustment(product.pk, stock_quantity - stored, request.user.pk)
+                respread_stock([product.pk])
             
             messages.success(request, "Product updated successfully")
             return redirect("product_detail", pk=product.pk)
@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.db import models
+
+
+class SalesRollup(models.Model):
+    """
+    Confirmed sales for one day (the order date) and one key, kept up to
+    date as orders are confirmed or leave the confirmed state (reports.rollups).
+    """
+    date = models.DateField()
+    orders = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DailyProductSales(SalesRollup):
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        verbose_name = 'Daily Product Sales'
+        verbose_name_plural = 'Daily Product Sales'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='daily_product_sales_uniq'),
+        ]
+
+
+class DailyCategorySales(SalesRollup):
+    category = models.CharField(max_length=100)
+
+    class Meta:
+        verbose_name = 'Daily Category Sales'
+        verbose_name_plural = 'Daily Category Sales'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'category'], name='daily_category_sales_uniq'),
+        ]
+
+
+class DailySalespersonSales(SalesRollup):
+    # Orders without a creator are left out of this rollup
+    salesperson = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        verbose_name = 'Daily Salesperson Sales'
+        verbose_name_plural = 'Daily Salesperson Sales'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'salesperson'], name='daily_salesperson_sales_uniq'),
+        ]
+
+
+class DailyCustomerSales(SalesRollup):
+    customer = models.ForeignKey('customers.Customer', on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        verbose_name = 'Daily Customer Sales'
+        verbose_name_plural = 'Daily Customer Sales'
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'customer'], name='daily_customer_sales_uniq'),
+        ]
@@ -0,0 +1,195 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.db import connection, models, transaction
+from django.db.models import Case, Count, F, Sum, When
+
+from inventory.services import UPDATE_BATCH_SIZE
+from orders.models import SalesOrderItem
+from .models import DailyCategorySales, DailyCustomerSales, DailyProductSales, DailySalespersonSales
+
+
+# (rollup model, key field, SalesOrderItem lookup for the key)
+ROLLUPS = [
+    (DailyProductSales, 'product_id', 'product_id'),
+    (DailyCategorySales, 'category', 'product__category'),
+    (DailySalespersonSales, 'salesperson_id', 'sales_order__created_by_id'),
+    (DailyCustomerSales, 'customer_id', 'sales_order__customer_id'),
+]
+
+CENT = Decimal('0.01')
+
+
+def _order_deltas(orders):
+    """
+    {date: {model: {key: [orders, quantity, revenue]}}} contributed by
+    `orders`, from a single per-order, per-product aggregate of their lines.
+    """
+    by_pk = {order.pk: order for order in orders}
+    lines = (
+        SalesOrderItem.objects.filter(sales_order_id__in=by_pk)
+        .order_by()
+        .values('sales_order_id', 'product_id', 'product__category')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('total_price'))
+    )
+    deltas, counted = {}, set()
+    for line in lines:
+        order = by_pk[line['sales_order_id']]
+        day = deltas.setdefault(order.order_date, {model: {} for model, _, _ in ROLLUPS})
+        line_keys = {
+            DailyProductSales: line['product_id'],
+            DailyCategorySales: line['product__category'],
+            DailySalespersonSales: order.created_by_id,
+            DailyCustomerSales: order.customer_id,
+        }
+        for model, key in line_keys.items():
+            if key is None:
+                continue
+            totals = day[model].setdefault(key, [0, 0, Decimal('0')])
+            if (model, key, order.pk) not in counted:
+                counted.add((model, key, order.pk))
+                totals[0] += 1
+            totals[1] += line['quantity']
+            totals[2] += Decimal(line['revenue']).quantize(CENT)
+    return deltas
+
+
+def _apply(model, field, date, deltas, sign):
+    """
+    Add signed deltas to the rollup rows for `date`: missing rows are
+    inserted empty, then every row is incremented in one conditional
+    UPDATE, so concurrent orders never overwrite each other's totals.
+    """
+    keys = list(deltas)
+    for start in range(0, len(keys), UPDATE_BATCH_SIZE):
+        batch = keys[start:start + UPDATE_BATCH_SIZE]
+        model.objects.bulk_create([model(date=date, **{field: key}) for key in batch], ignore_conflicts=True)
+
+        def increment(name, index, output_field):
+            return Case(
+                *[When(**{field: key}, then=F(name) + sign * deltas[key][index]) for key in batch],
+                output_field=output_field,
+            )
+        model.objects.filter(date=date, **{f'{field}__in': batch}).update(
+            orders=increment('orders', 0, models.IntegerField()),
+            quantity=increment('quantity', 1, models.IntegerField()),
+            revenue=increment('revenue', 2, models.DecimalField(max_digits=14, decimal_places=2)),
+        )
+
+
+def record_orders(orders, sign):
+    """
+    Add (sign=1) or remove (sign=-1) confirmed orders' lines in every
+    rollup, dated by their order dates. A batch of orders costs the same
+    few statements per day as a single one.
+    """
+    deltas = _order_deltas(orders)
+    with transaction.atomic(savepoint=False):
+        for date, day in deltas.items():
+            for model, field, _ in ROLLUPS:
+                _apply(model, field, date, day[model], sign)
+
+
+def _aggregate(start, end):
+    """
+    Rollup rows for confirmed orders dated start..end, computed from the
+    order lines with one GROUP BY per rollup.
+    """
+    items = SalesOrderItem.objects.filter(
+        sales_order__status='confirmed', sales_order__order_date__range=(start, end)
+    ).order_by()
+    rows = {}
+    for model, field, lookup in ROLLUPS:
+        grouped = (
+            items.exclude(**{f'{lookup}__isnull': True})
+            .values('sales_order__order_date', lookup)
+            .annotate(orders=Count('sales_order_id', distinct=True), quantity=Sum('quantity'), revenue=Sum('total_price'))
+        )
+        rows[model] = [
+            model(
+                date=row['sales_order__order_date'], orders=row['orders'], quantity=row['quantity'],
+                # SQLite sums decimals as floats
+                revenue=Decimal(row['revenue']).quantize(CENT), **{field: row[lookup]},
+            )
+            for row in grouped.iterator(chunk_size=2000)
+        ]
+    return rows
+
+
+def _aggregate_in_thread(chunk):
+    try:
+        return _aggregate(*chunk)
+    finally:
+        # Each worker thread opened its own connection
+        connection.close()
+
+
+def date_chunks(start, end, days):
+    while start <= end:
+        chunk_end = min(start + datetime.timedelta(days=days - 1), end)
+        yield start, chunk_end
+        start = chunk_end + datetime.timedelta(days=1)
+
+
+def rebuild_rollups(start, end, chunk_days=7, workers=1, progress=None):
+    """
+    Recompute every rollup for start..end from the order lines. Chunks of
+    `chunk_days` are aggregated by `workers` threads in parallel while this
+    thread replaces each finished chunk's rows in its own transaction.
+    Orders confirmed in the range during a rebuild may be counted twice or
+    missed; run it while the range is quiet.
+    Returns the number of rows written.
+    """
+    chunks = list(date_chunks(start, end, chunk_days))
+    pool = ThreadPoolExecutor(workers) if workers > 1 else None
+    results = pool.map(_aggregate_in_thread, chunks) if pool else (_aggregate(*chunk) for chunk in chunks)
+    written = 0
+    try:
+        for (chunk_start, chunk_end), rows in zip(chunks, results):
+            with transaction.atomic():
+                for model, instances in rows.items():
+                    model.objects.filter(date__range=(chunk_start, chunk_end)).delete()
+                    model.objects.bulk_create(instances, batch_size=1000)
+                    written += len(instances)
+            if progress:
+                progress(chunk_start, chunk_end)
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    return written
+
+
+# Report groupings: rollup model and the columns identifying each group
+SUMMARY_GROUPS = {
+    'day': (DailyCustomerSales, ['date']),
+    'product': (DailyProductSales, ['product__sku', 'product__name']),
+    'category': (DailyCategorySales, ['category']),
+    'salesperson': (DailySalespersonSales, ['salesperson__username']),
+    'customer': (DailyCustomerSales, ['customer__customer_id', 'customer__name']),
+}
+
+
+def sales_summary(start, end, group='day'):
+    """
+    Confirmed orders, units and revenue for start..end per `group` (a key
+    of SUMMARY_GROUPS), read from the rollups. Days are listed in date
+    order, other groups by revenue.
+    """
+    model, columns = SUMMARY_GROUPS[group]
+    rows = (
+        model.objects.filter(date__range=(start, end))
+        .values(*columns)
+        .annotate(total_orders=Sum('orders'), total_quantity=Sum('quantity'), total_revenue=Sum('revenue'))
+        .filter(total_orders__gt=0)
+    )
+    rows = rows.order_by('date') if group == 'day' else rows.order_by('-total_revenue', *columns)
+    return [
+        {
+            'group': ' - '.join(str(row[column]) for column in columns),
+            'orders': row['total_orders'],
+            'quantity': row['total_quantity'],
+            'revenue': Decimal(row['total_revenue']).quantize(CENT),
+        }
+        for row in rows
+    ]
@@ -0,0 +1,26 @@
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from orders.models import SalesOrder
+from orders.signals import order_status_changed
+from .rollups import record_orders
+
+
+@receiver(order_status_changed)
+def roll_up_orders(sender, orders, old_status, new_status, **kwargs):
+    """
+    Count orders in the sales rollups while they are confirmed.
+    """
+    if new_status == 'confirmed':
+        record_orders(orders, 1)
+    elif old_status == 'confirmed':
+        record_orders(orders, -1)
+
+
+@receiver(pre_delete, sender=SalesOrder)
+def unroll_deleted_order(sender, instance, **kwargs):
+    """
+    Take a confirmed order out of the rollups while its lines still exist.
+    """
+    if instance.status == 'confirmed':
+        record_orders([instance], -1)
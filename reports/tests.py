@@ -0,0 +1,125 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core.testing import QueryCountMixin, grow_to, make_customers, make_order, make_products, make_user
+from orders.models import SalesOrder
+from products.models import Product
+from .models import DailyCategorySales, DailyCustomerSales, DailyProductSales, DailySalespersonSales
+from .rollups import rebuild_rollups, sales_summary
+from .valuation import inventory_valuation
+
+
+class InventoryValuationTests(QueryCountMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        Product.objects.create(
+            sku="GR001", name="Gold Ring", category="Rings", cost_price="100.00", selling_price="150.00", stock_quantity=3,
+        )
+        Product.objects.create(
+            sku="SN001", name="Silver Necklace", category="Necklaces", cost_price="20.50", selling_price="20.50", stock_quantity=4,
+        )
+        Product.objects.create(
+            sku="SN002", name="Sold Out Necklace", category="Necklaces", cost_price="10.00", selling_price="30.00", stock_quantity=0,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_breakdown_by_category(self):
+        report = inventory_valuation()
+        necklaces, rings = report["categories"]
+        self.assertEqual(
+            (necklaces["category"], necklaces["products"], necklaces["units"], necklaces["cost_value"], necklaces["margin"]),
+            ("Necklaces", 2, 4, Decimal("82.00"), Decimal("0.00")),
+        )
+        self.assertEqual((rings["cost_value"], rings["retail_value"], rings["margin_percent"]),
+                         (Decimal("300.00"), Decimal("450.00"), Decimal("33.3")))
+        self.assertEqual((report["totals"]["units"], report["totals"]["cost_value"], report["totals"]["margin"]),
+                         (7, Decimal("382.00"), Decimal("150.00")))
+
+    def test_cached_until_catalogue_changes(self):
+        inventory_valuation()
+        with self.assertNumQueries(0):
+            inventory_valuation()
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(sku="GR001").get().delete()
+        self.assertEqual(inventory_valuation()["totals"]["units"], 4)
+
+    def test_report_queries_do_not_grow(self):
+        add_products = grow_to(make_products)
+
+        def grow(size):
+            add_products(size)
+            cache.clear()  # on_commit version bumps never run inside TestCase
+
+        # session, user, one GROUP BY
+        self.assertConstantQueries(lambda: reverse("valuation_report"), grow, expected=3)
+
+    def test_export(self):
+        response = self.client.get(reverse("valuation_export"), {"format": "csv"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "Category,Products,Units,Cost Value,Retail Value,Potential Margin,Margin %")
+        self.assertEqual(lines[-1], "Total,3,7,382.00,532.00,150.00,28.2")
+
+
+class SalesRollupTests(QueryCountMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user()
+        cls.customers = make_customers(2)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def confirm(self, order):
+        self.client.post(reverse("order_confirm", args=[order.pk]))
+
+    def rollup_rows(self):
+        return {
+            model.__name__: sorted(model.objects.filter(orders__gt=0).values_list("orders", "quantity", "revenue"))
+            for model in (DailyProductSales, DailyCategorySales, DailySalespersonSales, DailyCustomerSales)
+        }
+
+    def test_confirm_and_cancel_update_rollups(self):
+        first = make_order(self.customers[0], self.user, lines=2)
+        second = make_order(self.customers[1], self.user, lines=1)
+        self.confirm(first)
+        self.confirm(second)
+
+        today = first.order_date
+        self.assertEqual(
+            sales_summary(today, today, "category"),
+            [{"group": "Rings", "orders": 2, "quantity": 3, "revenue": Decimal("6.00")}],
+        )
+        self.assertEqual([row["orders"] for row in sales_summary(today, today, "customer")], [1, 1])
+
+        self.client.post(reverse("order_cancel", args=[first.pk]))
+        self.assertEqual(
+            sales_summary(today, today, "salesperson"),
+            [{"group": "admin", "orders": 1, "quantity": 1, "revenue": Decimal("2.00")}],
+        )
+
+    def test_rebuild_matches_incremental_updates(self):
+        for customer in self.customers:
+            self.confirm(make_order(customer, self.user, lines=2))
+        make_order(self.customers[0], self.user, lines=1)  # pending: not counted
+        incremental = self.rollup_rows()
+
+        today = SalesOrder.objects.first().order_date
+        # 4 products, 1 category, 1 salesperson, 2 customers
+        self.assertEqual(rebuild_rollups(today, today), 8)
+        self.assertEqual(self.rollup_rows(), incremental)
+
+    def test_sales_report_queries_do_not_grow(self):
+        def grow(size):
+            while DailyProductSales.objects.count() < size:
+                self.confirm(make_order(self.customers[0], self.user, lines=1))
+
+        # session, user, one aggregate over the rollup rows
+        for group in ("day", "product", "category", "salesperson", "customer"):
+            self.assertConstantQueries(lambda: reverse("sales_report") + f"?group={group}", grow, expected=3)
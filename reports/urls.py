@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+
+urlpatterns = [
+    path('valuation/', views.valuation_report, name='valuation_report'),
+    path('valuation/export/', views.valuation_export, name='valuation_export'),
+    path('sales/', views.sales_report, name='sales_report'),
+    path('sales/export/', views.sales_export, name='sales_export'),
+]
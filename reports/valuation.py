@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import models
+from django.db.models import Count, F, Sum
+
+from core.cache import CATALOGUE, cache_timeout, record_access, versioned_key
+from products.models import Product
+
+
+# Entries are keyed by catalogue version, so the timeout only bounds memory use
+VALUATION_CACHE_TIMEOUT = 60 * 60 * 24
+CENT = Decimal("0.01")
+
+_MONEY = models.DecimalField(max_digits=20, decimal_places=2)
+
+
+def _money(value):
+    # SQLite sums decimals as floats
+    return (value or Decimal("0")).quantize(CENT)
+
+
+def _with_margin(row):
+    row["margin"] = row["retail_value"] - row["cost_value"]
+    row["margin_percent"] = (
+        (row["margin"] * 100 / row["retail_value"]).quantize(Decimal("0.1")) if row["retail_value"] else None
+    )
+    return row
+
+
+def _valuation():
+    rows = (
+        Product.objects.order_by()
+        .values("category")
+        .annotate(
+            products=Count("id"),
+            units=Sum("stock_quantity"),
+            cost_value=Sum(F("cost_price") * F("stock_quantity"), output_field=_MONEY),
+            retail_value=Sum(F("selling_price") * F("stock_quantity"), output_field=_MONEY),
+        )
+        .order_by("category")
+    )
+    categories = []
+    totals = {"products": 0, "units": 0, "cost_value": Decimal("0.00"), "retail_value": Decimal("0.00")}
+    for row in rows:
+        row["units"] = row["units"] or 0
+        row["cost_value"] = _money(row["cost_value"])
+        row["retail_value"] = _money(row["retail_value"])
+        for field in totals:
+            totals[field] += row[field]
+        categories.append(_with_margin(row))
+    return {"categories": categories, "totals": _with_margin(totals)}
+
+
+def inventory_valuation():
+    """
+    Stock valued at cost and at selling price, with the potential margin,
+    per category and in total:
+    {"categories": [{category, products, units, cost_value, retail_value,
+    margin, margin_percent}, ...], "totals": {...}}.
+
+    One GROUP BY over the product table, cached per catalogue version, so
+    any product or stock change is reflected on the next request.
+    """
+    key = versioned_key(CATALOGUE, "inventory_valuation", {})
+    report = cache.get(key)
+    record_access("inventory_valuation", report is not None)
+    if report is None:
+        report = _valuation()
+        cache.set(key, report, cache_timeout(VALUATION_CACHE_TIMEOUT))
+    return report
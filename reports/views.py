@@ -0,0 +1,76 @@
+from accounts.decorators import admin_required
+from core.exports import export_rows
+from django.shortcuts import render
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from .rollups import SUMMARY_GROUPS, sales_summary
+from .valuation import inventory_valuation
+
+
+VALUATION_EXPORT_HEADER = [
+    "Category", "Products", "Units", "Cost Value", "Retail Value", "Potential Margin", "Margin %",
+]
+
+
+@admin_required
+def valuation_report(request):
+    """
+    Inventory value at cost and selling price per category, accessible only for admin-user.
+    """
+    return render(request, "reports/valuation_report.html", {"report": inventory_valuation()})
+
+
+@admin_required
+def valuation_export(request):
+    """
+    Export the inventory valuation report as CSV or XLSX.
+    """
+    report = inventory_valuation()
+    fields = ["category", "products", "units", "cost_value", "retail_value", "margin", "margin_percent"]
+    rows = [[row[field] for field in fields] for row in report["categories"]]
+    rows.append(["Total"] + [report["totals"][field] for field in fields[1:]])
+    return export_rows(request, "inventory_valuation", VALUATION_EXPORT_HEADER, rows)
+
+
+def sales_report_filters(request):
+    """
+    Date range (?start=&end=, default: this month) and ?group= for the sales report.
+    """
+    today = timezone.localdate()
+    start = parse_date(request.GET.get("start") or "") or today.replace(day=1)
+    end = parse_date(request.GET.get("end") or "") or today
+    if start > end:
+        start, end = end, start
+    group = request.GET.get("group")
+    return start, end, group if group in SUMMARY_GROUPS else "day"
+
+
+@admin_required
+def sales_report(request):
+    """
+    Confirmed sales by day, product, category, salesperson or customer, read
+    from the daily rollups. Accessible only for admin-user.
+    """
+    start, end, group = sales_report_filters(request)
+    rows = sales_summary(start, end, group)
+    return render(request, "reports/sales_report.html", {
+        "start": start,
+        "end": end,
+        "group": group,
+        "groups": list(SUMMARY_GROUPS),
+        "rows": rows,
+        "totals": {
+            "quantity": sum(row["quantity"] for row in rows),
+            "revenue": sum(row["revenue"] for row in rows),
+        },
+    })
+
+
+@admin_required
+def sales_export(request):
+    """
+    Export the sales report as CSV or XLSX.
+    """
+    start, end, group = sales_report_filters(request)
+    rows = [[row["group"], row["orders"], row["quantity"], row["revenue"]] for row in sales_summary(start, end, group)]
+    return export_rows(request, f"sales_by_{group}", [group.title(), "Orders", "Units", "Revenue"], rows)